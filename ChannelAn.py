@@ -1,8 +1,41 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
+import ingestion
+
+
+def channel_filters(channel_data, sales_cube):
+    """Date range, city and category filters answered by rolling up the cached sales cube"""
+    months = sales_cube.values("year_month")
+
+    f1, f2, f3 = st.columns([2, 1.5, 1.5])
+    with f1:
+        month_range = None
+        if len(months) > 1:
+            month_range = st.select_slider("Date Range", options=months, value=(months[0], months[-1]))
+    with f2:
+        cities = st.multiselect("City", sales_cube.values("city"), placeholder="All cities")
+    with f3:
+        categories = st.multiselect("Category", sales_cube.values("category"), placeholder="All categories")
+
+    full_range = month_range is None or tuple(month_range) == (months[0], months[-1])
+    if full_range and not cities and not categories:
+        return channel_data
+
+    filtered = sales_cube.filter(
+        month_range=None if full_range else tuple(month_range),
+        cities=cities,
+        categories=categories
+    )
+    if filtered.cells.empty:
+        return None
+    return filtered.channel_summary()
+
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("channel")
+
     # Check if data has been processed
     if not st.session_state.get('channel_processed', False):
         st.warning("⚠️ Please upload both returns and sales data first using the 'Ingest Data' page to see channel performance analytics.")
@@ -17,6 +50,14 @@ def show():
     with col2:
         st.success("● System Active")
 
+    # Filters (served from the pre-aggregated cube, no re-run of the processor)
+    sales_cube = channel_data.get('sales_cube')
+    if sales_cube is not None:
+        channel_data = channel_filters(channel_data, sales_cube)
+        if channel_data is None:
+            st.warning("⚠️ No sales match the selected filters.")
+            return
+
     # KPI Layout
     k1, k2, k3, k4 = st.columns(4)
     
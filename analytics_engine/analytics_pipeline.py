@@ -0,0 +1,329 @@
+import importlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from columns import read_table
+from result_cache import dataset_fingerprint
+
+# name -> (module, class, display label, inputs). "both" processors need the
+# returns and sales files, "sales" processors only the sales file.
+PROCESSORS = {
+    "geospatial": ("geospatial_processor", "GeospatialProcessor", "Geospatial", "both"),
+    "weather": ("weather_processor", "WeatherProcessor", "Weather", "both"),
+    "demand": ("demand_processor", "DemandProcessor", "Demand Matching", "both"),
+    "channel": ("channel_processor", "ChannelProcessor", "Channel", "both"),
+    "forecast": ("smart_forecast_processor", "SmartForecastProcessor", "Smart Forecast", "both"),
+    "segmentation": ("segmentation_processor", "SegmentationProcessor", "Segmentation", "both"),
+    "lifecycle": ("product_lifecycle_processor", "ProductLifecycleProcessor", "Product Lifecycle", "sales"),
+    "sensitivity": ("price_sensitivity_processor", "PriceSensitivityProcessor", "Price Sensitivity", "sales"),
+    "viability": ("manual_viability_processor", "ManualViabilityProcessor", "Manual Viability", "sales"),
+}
+
+# Pages an analyst usually opens next; their processors are prefetched in the
+# background after the current page's processor finishes.
+PREFETCH = {
+    "geospatial": ["demand"],
+    "demand": ["geospatial"],
+    "weather": ["forecast"],
+    "forecast": ["lifecycle"],
+    "channel": ["forecast"],
+    "segmentation": ["geospatial"],
+    "lifecycle": ["sensitivity"],
+    "sensitivity": ["lifecycle"],
+    "viability": ["geospatial"],
+}
+
+
+class AnalyticsPipeline:
+    def __init__(self, returns_df=None, sales_df=None, profiler=None, prefetch_workers=1,
+                 cache=None, fingerprint=None):
+        self.returns_df = returns_df
+        self.sales_df = sales_df
+        self.profiler = profiler
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self._sql_engine = None
+        self.features = None    # FeatureStore set at ingestion; built from the staged sales otherwise
+        self.weather = None     # WeatherStore set at ingestion; loaded and extended with the staged files otherwise
+        self.results = {}
+        self._futures = {}
+        self._backtests = {}    # backtest key -> future of a run started in the background
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix="prefetch")
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backtest")
+
+    @classmethod
+    def stage(cls, returns_file=None, sales_file=None, profiler=None, cache=None):
+        """Read the uploaded files once; processors run later, on demand.
+
+        With a shared cache, files already staged by another session (same
+        content fingerprint) are reused instead of being parsed again.
+        """
+        fingerprint = dataset_fingerprint(returns_file, sales_file) if cache is not None else None
+
+        def read_files():
+            returns_df = sales_df = None
+
+            if returns_file is not None:
+                if profiler:
+                    with profiler.stage("Ingestion", "load", step="stage_returns"):
+                        returns_df = read_table(returns_file)
+                else:
+                    returns_df = read_table(returns_file)
+
+            if sales_file is not None:
+                if profiler:
+                    with profiler.stage("Ingestion", "load", step="stage_sales"):
+                        sales_df = read_table(sales_file)
+                else:
+                    sales_df = read_table(sales_file)
+
+            return returns_df, sales_df
+
+        if cache is not None:
+            returns_df, sales_df = cache.get_or_compute((fingerprint, "staged"), read_files)
+        else:
+            returns_df, sales_df = read_files()
+
+        print(f"✅ Staged data: {0 if returns_df is None else len(returns_df)} returns, "
+              f"{0 if sales_df is None else len(sales_df)} sales")
+        return cls(returns_df, sales_df, profiler=profiler, cache=cache, fingerprint=fingerprint)
+
+    def available(self, name):
+        """Whether the staged files are enough to run this processor"""
+        inputs = PROCESSORS[name][3]
+        if inputs == "sales":
+            return self.sales_df is not None
+        return self.returns_df is not None and self.sales_df is not None
+
+    def is_ready(self, name):
+        return name in self.results
+
+    def run(self, name):
+        """Return the processor's result, computing it on first use (memoized)"""
+        with self._lock:
+            if name in self.results:
+                return self.results[name]
+            future = self._futures.get(name)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[name] = future
+
+        if owner:
+            self._execute(name, future)
+        return future.result()
+
+    def prefetch(self, name):
+        """Warm the processors of the pages likely to be opened after `name`"""
+        for target in PREFETCH.get(name, []):
+            if not self.available(target):
+                continue
+            with self._lock:
+                if target in self._futures:
+                    continue
+                future = Future()
+                self._futures[target] = future
+            print(f"🔮 Prefetching {PROCESSORS[target][2]} in background")
+            self._executor.submit(self._execute, target, future)
+
+    def sql(self, query_name):
+        """Run one of the all_SQL_queries files on the staged frames (local DuckDB)"""
+        if self.cache is not None:
+            return self.cache.get_or_compute((self.fingerprint, f"sql:{query_name}"),
+                                             lambda: self._run_sql(query_name))
+        return self._run_sql(query_name)
+
+    def heatmap(self, size=256, sigma=2.0):
+        """Sales/return density rasters of the staged data, cached per dataset"""
+        def build():
+            from heatmap_raster import build_heatmaps
+            return build_heatmaps(self.returns_df, self.sales_df, size=size, sigma=sigma)
+
+        if self.cache is not None:
+            return self.cache.get_or_compute((self.fingerprint, f"heatmap:{size}:{sigma}"), build)
+        with self._lock:
+            key = ("heatmap", size, sigma)
+            if key not in self.results:
+                self.results[key] = build()
+            return self.results[key]
+
+    def demand_matrix(self):
+        """Daily (product, category, city) x days demand of the staged sales, built once per ingestion.
+
+        With a dataset fingerprint the matrix is written under run_reports and
+        served memory-mapped, so every processor and session shares one buffer.
+        """
+        def build():
+            from demand_matrix import DEMAND_MATRIX_DIR, KEYS, DemandMatrix
+            if self.fingerprint is None:
+                matrix = DemandMatrix.from_sales(self.sales_df)
+            else:
+                path = os.path.join(DEMAND_MATRIX_DIR, f"{self.fingerprint}-{'-'.join(KEYS)}")
+                matrix = DemandMatrix.load(path)
+                if matrix is None:
+                    DemandMatrix.from_sales(self.sales_df).save(path)
+                    matrix = DemandMatrix.load(path)
+            print(f"✅ Demand matrix: {matrix.values.shape[0]} product/city series x {matrix.values.shape[1]} days")
+            return matrix
+
+        if self.sales_df is None:
+            return None
+        if self.cache is not None:
+            return self.cache.get_or_compute((self.fingerprint, "demand_matrix"), build)
+        with self._lock:
+            if "demand_matrix" not in self.results:
+                self.results["demand_matrix"] = build()
+            return self.results["demand_matrix"]
+
+    def weather_store(self):
+        """Observed weather per city/day (see weather_store.WeatherStore) used to fill missing weather"""
+        with self._lock:
+            if self.weather is None:
+                from weather_store import WeatherStore
+                store = WeatherStore.load() or WeatherStore().load_history_file()
+                self.weather = store.observe(self.sales_df).observe(self.returns_df)
+            return self.weather
+
+    def feature_store(self):
+        """Rolling velocity features (see feature_store.FeatureStore) the processors look up"""
+        if self.sales_df is None:
+            return None
+        weather = self.weather_store()
+        with self._lock:
+            if self.features is None:
+                from feature_store import FeatureStore
+                self.features = FeatureStore().apply(self.sales_df, source=self.fingerprint, weather_store=weather)
+            return self.features
+
+    def weather_uplift(self):
+        """Learned category x weather/season demand multipliers of the staged sales, built once per dataset"""
+        if self.sales_df is None:
+            return None
+        weather = self.weather_store()
+
+        def build():
+            from weather_uplift import WeatherUplift
+            return WeatherUplift.from_sales(self.sales_df, weather)
+
+        if self.cache is not None:
+            return self.cache.get_or_compute((self.fingerprint, weather.version(), "weather_uplift"), build)
+        with self._lock:
+            if "weather_uplift" not in self.results:
+                self.results["weather_uplift"] = build()
+            return self.results["weather_uplift"]
+
+    def backtest(self, config=None):
+        """Rolling-origin forecast backtest of the staged sales, cached per dataset.
+
+        Waits for a background run of the same config (see backtest_in_background)
+        instead of starting a second one.
+        """
+        if self.sales_df is None:
+            return None
+        key = f"backtest:{sorted((config or {}).items())}"
+        with self._lock:
+            future = self._backtests.get(key)
+        if future is not None:
+            return future.result()
+        return self._backtest(key, config)
+
+    def backtest_in_background(self, config=None):
+        """Start the backtest on a background thread (once per config) and return its future"""
+        if self.sales_df is None:
+            return None
+        key = f"backtest:{sorted((config or {}).items())}"
+        with self._lock:
+            if key not in self._backtests:
+                self._backtests[key] = self._background.submit(self._backtest, key, config)
+            return self._backtests[key]
+
+    def _backtest(self, key, config):
+        from demand_matrix import DEMAND_MATRIX_DIR, SKU_KEYS, DemandMatrix
+        matrix = self.demand_matrix().by(*SKU_KEYS)
+        if self.fingerprint is not None:
+            # SKU roll-up kept next to the full matrix, so backtest workers memory-map it
+            path = os.path.join(DEMAND_MATRIX_DIR, f"{self.fingerprint}-{'-'.join(SKU_KEYS)}")
+            if DemandMatrix.load(path) is None:
+                matrix.save(path)
+            matrix = DemandMatrix.load(path)
+
+        def build():
+            from forecast_backtest import backtest
+            if self.profiler:
+                with self.profiler.stage("Forecast Backtest", "backtest", step="rolling_origin"):
+                    return backtest(matrix, config)
+            return backtest(matrix, config)
+
+        if self.cache is not None:
+            return self.cache.get_or_compute((self.fingerprint, key), build)
+        with self._lock:
+            if key in self.results:
+                return self.results[key]
+        result = build()    # outside the lock: pages keep running while a background backtest scores
+        with self._lock:
+            return self.results.setdefault(key, result)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        self._background.shutdown(wait=False)
+        if self._sql_engine is not None:
+            self._sql_engine.close()
+
+    def _execute(self, name, future):
+        try:
+            result = self._compute(name)
+        except Exception as e:
+            print(f"⚠️ {PROCESSORS[name][2]} processing failed: {e}")
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self.results[name] = result
+        future.set_result(result)
+
+    def store_version(self):
+        """Content versions of the weather and feature stores the processors read"""
+        features = self.feature_store()
+        return self.weather_store().version(), None if features is None else features.version()
+
+    def _compute(self, name):
+        if self.cache is not None:
+            # Same files give different results once the weather history or features move on
+            return self.cache.get_or_compute((self.fingerprint, self.store_version(), name),
+                                             lambda: self._run_processor(name))
+        return self._run_processor(name)
+
+    def _run_processor(self, name):
+        module_name, class_name, label, inputs = PROCESSORS[name]
+        processor = getattr(importlib.import_module(module_name), class_name)()
+        if hasattr(processor, "demand_matrix"):
+            processor.demand_matrix = self.demand_matrix()
+        if hasattr(processor, "feature_store"):
+            processor.feature_store = self.feature_store()
+        if hasattr(processor, "weather_store"):
+            processor.weather_store = self.weather_store()
+        if hasattr(processor, "weather_uplift"):
+            processor.weather_uplift = self.weather_uplift()
+        if self.profiler:
+            self.profiler.instrument(processor, label)
+
+        if name == "viability":
+            return processor if processor.load_and_train_models(self.sales_df) else None
+
+        returns_df = self.returns_df if inputs == "both" else None
+        return processor.load_and_process_data(returns_df, self.sales_df) or None
+
+    def _run_sql(self, query_name):
+        with self._lock:
+            if self._sql_engine is None:
+                from sql_engine import SQLEngine
+                self._sql_engine = SQLEngine(self.returns_df, self.sales_df)
+
+        if self.profiler:
+            with self.profiler.stage("SQL", "query", step=query_name) as record:
+                result = self._sql_engine.run_file(query_name)
+                record["output_rows"] = len(result)
+            return result
+        return self._sql_engine.run_file(query_name)
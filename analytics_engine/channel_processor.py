@@ -1,20 +1,23 @@
 import pandas as pd
 import numpy as np
 
+from columns import load_table
+from sales_cube import SalesCube
+from weather_store import attach_weather
+
 class ChannelProcessor:
-    def __init__(self):
+    def __init__(self, weather_store=None):
         self.returns_df = None
         self.sales_df = None
         self.processed_data = {}
+        self.weather_store = weather_store
 
     def load_and_process_data(self, returns_file=None, sales_file=None):
         """Load and process data using combined logic from near.py, near1.py, near2.py, near3.py, near8.py"""
 
         # Load data
-        if returns_file:
-            self.returns_df = pd.read_excel(returns_file) if returns_file.endswith('.xlsx') else pd.read_csv(returns_file)
-        if sales_file:
-            self.sales_df = pd.read_excel(sales_file) if sales_file.endswith('.xlsx') else pd.read_csv(sales_file)
+        self.returns_df = load_table(returns_file, self.returns_df)
+        self.sales_df = load_table(sales_file, self.sales_df)
 
         if self.returns_df is None or self.sales_df is None:
             return None
@@ -116,6 +119,10 @@ class ChannelProcessor:
 
                 df.drop(columns=["unit_price"], errors="ignore", inplace=True)
 
+        # Missing weather: as-of join on each city's observed weather history
+        if "weather" in df.columns:
+            df = attach_weather(df, self.weather_store)
+
         # Ensure weather and category are strings, handle return_date
         df["weather"] = df.get("weather", "").astype(str).str.title()
         df["category"] = df.get("category", "").astype(str).str.title()
@@ -161,30 +168,9 @@ class ChannelProcessor:
                     df.rename(columns={possible_name: standard_col}, inplace=True)
                     break
 
-        # near3.py logic: Handle weather data imputation
+        # Missing weather: as-of join on each city's observed weather history
         if "weather" in df.columns:
-            df["weather"] = df["weather"].replace("", np.nan)
-
-            if "brand" in df.columns and "qty" in df.columns:
-                # Fill missing weather based on brand's most selling weather pattern
-                brand_weather_qty = (
-                    df.dropna(subset=["weather"])
-                      .groupby(["brand", "weather"], as_index=False)["qty"]
-                      .sum()
-                )
-
-                top_weather_per_brand = (
-                    brand_weather_qty
-                      .sort_values(by=["brand", "qty"], ascending=[True, False])
-                      .drop_duplicates(subset=["brand"])
-                      .rename(columns={"weather": "top_weather"})
-                      [["brand", "top_weather"]]
-                )
-
-                df = df.merge(top_weather_per_brand, on="brand", how="left")
-                df["weather"] = df["weather"].fillna(df["top_weather"])
-                df["weather"] = df["weather"].fillna("Unknown")
-                df.drop(columns=["top_weather"], inplace=True, errors="ignore")
+            df = attach_weather(df, self.weather_store)
 
         # Ensure required columns exist
         if "qty" not in df.columns:
@@ -220,77 +206,17 @@ class ChannelProcessor:
         return df
 
     def _channel_performance_analysis(self):
-        """Channel performance analysis logic from near8.py"""
+        """Channel performance analysis logic from near8.py, rolled up from the sales cube"""
         if self.returns_df is None or self.sales_df is None:
             return None
 
-        returns_df = self.returns_df.copy()
-        sales_df = self.sales_df.copy()
-
-        # =================================================
-        # 📊 TOP METRICS (HEADER CARDS)
-        # =================================================
-
-        # TOTAL RETURNS
-        total_returns = len(returns_df)
-
-        # TOTAL REVENUE BY CHANNEL
-        sales_df["revenue"] = sales_df["order_value"] * (1 - sales_df["commission_rate"])
-        revenue_by_channel = sales_df.groupby("platform")["revenue"].sum()
-
-        top_channel = revenue_by_channel.idxmax() if not revenue_by_channel.empty else "N/A"
-
-        # AVG COMMISSION
-        avg_commission = (sales_df["commission_rate"].mean() * 100).round(2)
-
-        # RETURN RATE (from dataset)
-        return_rate = (sales_df["return_rate"].mean() * 100).round(2)
-
-        # =================================================
-        # 📈 REVENUE BY CHANNEL (MONTHLY TREND)
-        # =================================================
-        revenue_trend = (
-            sales_df.groupby(["month", "platform"])["revenue"]
-            .sum()
-            .reset_index()
-            .sort_values(["month", "platform"])
-        )
-
-        # =================================================
-        # 🥧 MARKET SHARE
         # =================================================
-        market_share = (
-            revenue_by_channel / revenue_by_channel.sum() * 100
-        ).round(2).reset_index(name="market_share")
-
-        # =================================================
-        # 📋 PLATFORM PERFORMANCE METRICS (TABLE)
+        # 🧊 SALES CUBE (month x platform x city x category x weather)
         # =================================================
-        platform_metrics = (
-            sales_df.groupby("platform")
-            .agg(
-                delivery_speed=("delivery_time_min", "mean"),
-                conversion=("conversion_rate", "mean"),
-                rtn_rate=("return_rate", "mean"),
-                rating=("rating", "mean")
-            )
-            .reset_index()
-        )
+        # Header cards, monthly revenue trend, market share and platform
+        # metrics are all roll-ups of the cube; pages reuse it for filtering
+        sales_cube = SalesCube.build(self.sales_df, self.returns_df)
 
-        platform_metrics["delivery_speed"] = platform_metrics["delivery_speed"].round(0)
-        platform_metrics["conversion"] = (platform_metrics["conversion"] * 100).round(2)
-        platform_metrics["rtn_rate"] = (platform_metrics["rtn_rate"] * 100).round(2)
-        platform_metrics["rating"] = platform_metrics["rating"].round(1)
-
-        return {
-            "header_metrics": {
-                "total_returns": total_returns,
-                "total_revenue": revenue_by_channel.sum().round(2),
-                "top_channel": top_channel,
-                "avg_commission_percent": avg_commission,
-                "return_rate_percent": return_rate
-            },
-            "revenue_trend": revenue_trend,
-            "market_share": market_share,
-            "platform_metrics": platform_metrics
-        }
\ No newline at end of file
+        results = sales_cube.channel_summary(total_returns=len(self.returns_df))
+        results["sales_cube"] = sales_cube
+        return results
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# Column aliases, same variations the sales cleaners accept
+SALES_COLUMNS = {
+    "product_name": ["product_name", "product name", "product"],
+    "category": ["category"],
+    "city": ["city"],
+    "platform": ["platform", "app", "channel"],
+    "weather": ["weather", "weather condition", "weather_condition"],
+    "qty": ["qty", "quantity", "sales_count"],
+    "sale_date": ["sale_date", "sale date", "date", "order_date"],
+}
+
+# Label columns every derived table groups by
+LABELS = ["product_name", "category", "city", "platform", "weather"]
+
+
+def rename_columns(df, aliases=SALES_COLUMNS):
+    """Copy with lower-cased columns, the first alias found of each standard name renamed to it"""
+    df = df.copy()
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    for standard, names in aliases.items():
+        found = next((n for n in names if n in df.columns), None)
+        if found is not None and found != standard:
+            df = df.rename(columns={found: standard})
+    return df
+
+
+def clean_labels(df, labels=LABELS):
+    """Label columns as text with "Unknown" for gaps; category and weather title-cased like the processors do"""
+    for col in labels:
+        values = df[col] if col in df.columns else pd.Series("Unknown", index=df.index)
+        df[col] = values.fillna("Unknown").astype(str)
+    for col in ("category", "weather"):
+        if col in labels:
+            df[col] = df[col].str.title()
+    return df
+
+
+def clean_sales(df):
+    """Renamed sales (see rename_columns) with numeric qty (1 per row when absent), parsed dates and clean labels"""
+    df["qty"] = pd.to_numeric(df["qty"], errors="coerce").fillna(0) if "qty" in df.columns else 1
+    df["sale_date"] = pd.to_datetime(df.get("sale_date"), errors="coerce")
+    return clean_labels(df)
+
+
+def read_table(source, name=None):
+    """Read a CSV/XLSX file from a path or an uploaded file object"""
+    name = name or getattr(source, "name", None) or str(source)
+    if name.lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(source)
+    return pd.read_csv(source)
+
+
+def load_table(source, current=None):
+    """Processor input: a staged DataFrame as is, a file read with read_table, `current` when none is given"""
+    if isinstance(source, pd.DataFrame):
+        return source
+    if not source:
+        return current
+    return read_table(source)
+
+
+def save_columns(df, path):
+    """Columnar .npz of a frame: one array per column (text as fixed-width unicode, no pickling)"""
+    arrays = {col: (df[col].to_numpy() if df[col].dtype.kind in "biufM" else df[col].astype(str).to_numpy(dtype=str))
+              for col in df.columns}
+    np.savez(path, **arrays)
+
+
+def load_columns(path):
+    with np.load(path) as data:
+        return pd.DataFrame({col: data[col] for col in data.files})
@@ -0,0 +1,131 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from columns import clean_sales, rename_columns
+
+DEMAND_MATRIX_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "run_reports", "demand_matrix")
+KEYS = ("product_name", "category", "city")   # finest grain; coarser levels are roll-ups (by)
+SKU_KEYS = ("product_name", "category")
+
+def first_sale(matrix):
+    """Index of each row's first non-zero period (series start)"""
+    started = matrix > 0
+    return np.where(started.any(axis=1), started.argmax(axis=1), matrix.shape[1])
+
+
+def _standardize(sales_df):
+    """Product/category/city/qty/date columns under their standard names, cleaned like the processors do"""
+    return clean_sales(rename_columns(sales_df))
+
+
+class DemandMatrix:
+    """Zero-filled products x periods demand on a calendar axis.
+
+    `values[i, t]` is the units of product `index.iloc[i]` sold in period
+    `periods[t]` (days, or calendar months keyed by year-month). Built once
+    per ingestion from the daily grain; monthly views, per-product rows and
+    the arrays the forecasting and lifecycle code work on are derived from
+    the same buffer, which can be saved and memory-mapped back.
+    """
+
+    def __init__(self, values, index, periods, freq="D"):
+        self.values = values
+        self.index = index.reset_index(drop=True)
+        self.periods = pd.DatetimeIndex(periods)
+        self.freq = freq
+        self.path = None    # set when the values are memory-mapped from disk
+
+    @classmethod
+    def from_sales(cls, sales_df, keys=KEYS):
+        """Daily matrix of a (raw or cleaned) sales frame"""
+        keys = list(keys)
+        sales = _standardize(sales_df).dropna(subset=["sale_date"])
+        if sales.empty:
+            return cls(np.zeros((0, 0)), pd.DataFrame(columns=keys), pd.DatetimeIndex([]))
+
+        day = sales["sale_date"].dt.normalize()
+        periods = pd.date_range(day.min(), day.max(), freq="D")
+        row_codes, index = pd.MultiIndex.from_frame(sales[keys]).factorize()
+        day_codes = (day - periods[0]).dt.days.to_numpy()
+
+        values = np.zeros((len(index), len(periods)))
+        qty = pd.to_numeric(sales["qty"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        np.add.at(values, (row_codes, day_codes), qty)
+        return cls(values, index.to_frame(index=False, name=keys), periods)
+
+    @property
+    def labels(self):
+        """Period keys: YYYY-MM-DD for days, YYYY-MM for months"""
+        return self.periods.strftime("%Y-%m" if self.freq == "MS" else "%Y-%m-%d")
+
+    def monthly(self):
+        """Calendar-month totals (years kept apart), zero-filled between first and last month"""
+        if self.freq == "MS" or not len(self.periods):
+            return self
+        months = self.periods.to_period("M")
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+        values = np.add.reduceat(self.values, starts, axis=1) if len(self.index) else self.values[:, :len(starts)]
+        return DemandMatrix(values, self.index, months[starts].to_timestamp(), freq="MS")
+
+    def by(self, *keys):
+        """Rows summed per subset of the index keys (e.g. per product across categories), sorted"""
+        codes, groups = pd.MultiIndex.from_frame(self.index[list(keys)]).factorize(sort=True)
+        values = np.zeros((len(groups), self.values.shape[1]))
+        np.add.at(values, codes, self.values)
+        return DemandMatrix(values, groups.to_frame(index=False, name=list(keys)), self.periods, self.freq)
+
+    def active(self):
+        """Mask of the periods from each row's first sale onwards"""
+        return np.arange(self.values.shape[1])[None, :] >= first_sale(self.values)[:, None]
+
+    def slopes(self):
+        """Least-squares trend per row over its active periods (NaN with fewer than two)"""
+        active = self.active()
+        n = active.sum(axis=1)
+        x = np.where(active, np.cumsum(active, axis=1) - 1, 0).astype(float)
+        y = np.where(active, self.values, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            x_mean = x.sum(axis=1) / n
+            y_mean = y.sum(axis=1) / n
+            cov = (x * y).sum(axis=1) - n * x_mean * y_mean
+            var = (x * x).sum(axis=1) - n * x_mean ** 2
+            return np.where(n >= 2, cov / var, np.nan)
+
+    def mean_over(self, periods_mask):
+        """Mean demand per row over the selected periods it was active in (NaN if none)"""
+        selected = self.active() & np.asarray(periods_mask)[None, :]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(selected, self.values, 0.0).sum(axis=1) / selected.sum(axis=1)
+
+    def to_frame(self, key="product_name"):
+        """Periods x products table (e.g. for trend charts)"""
+        return pd.DataFrame(self.values.T, index=self.labels, columns=self.index[key].values)
+
+    def save(self, path):
+        """Write `<path>.npy` (values) and `<path>.json` (index, periods)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.save(f"{path}.npy", self.values)
+        meta = {
+            "freq": self.freq,
+            "periods": [p.isoformat() for p in self.periods],
+            "index": self.index.astype(str).to_dict("list"),
+        }
+        with open(f"{path}.json.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Saved matrix with its values memory-mapped (read-only), or None if missing"""
+        if not (os.path.exists(f"{path}.npy") and os.path.exists(f"{path}.json")):
+            return None
+        with open(f"{path}.json") as f:
+            meta = json.load(f)
+        values = np.load(f"{path}.npy", mmap_mode=mmap_mode)
+        matrix = cls(values, pd.DataFrame(meta["index"]), pd.to_datetime(meta["periods"]), meta["freq"])
+        matrix.path = path
+        return matrix
@@ -1,21 +1,26 @@
 import pandas as pd
-import numpy as np
-from math import radians, cos, sin, asin, sqrt
+
+from columns import load_table
+from spatial_join import spatial_join
+from weather_store import attach_weather
+
+DEFAULT_K = 5      # number of nearest neighbors shown by default
+MAX_K = 20         # neighbour lists are kept this deep for the K control
+EVIDENCE_COLUMNS = ["sale_date", "platform", "distance_km", "weather", "qty"]
 
 class DemandProcessor:
-    def __init__(self):
+    def __init__(self, weather_store=None):
         self.returns_df = None
         self.sales_df = None
         self.processed_data = {}
+        self.weather_store = weather_store
 
     def load_and_process_data(self, returns_file=None, sales_file=None):
         """Load and process data using combined logic from near.py, near1.py, near2.py, near3.py, near7.py"""
 
         # Load data
-        if returns_file:
-            self.returns_df = pd.read_excel(returns_file) if returns_file.endswith('.xlsx') else pd.read_csv(returns_file)
-        if sales_file:
-            self.sales_df = pd.read_excel(sales_file) if sales_file.endswith('.xlsx') else pd.read_csv(sales_file)
+        self.returns_df = load_table(returns_file, self.returns_df)
+        self.sales_df = load_table(sales_file, self.sales_df)
 
         if self.returns_df is None or self.sales_df is None:
             return None
@@ -117,6 +122,10 @@ class DemandProcessor:
 
                 df.drop(columns=["unit_price"], errors="ignore", inplace=True)
 
+        # Missing weather: as-of join on each city's observed weather history
+        if "weather" in df.columns:
+            df = attach_weather(df, self.weather_store)
+
         # Ensure weather and category are strings, handle return_date
         df["weather"] = df.get("weather", "").astype(str).str.title()
         df["category"] = df.get("category", "").astype(str).str.title()
@@ -155,30 +164,9 @@ class DemandProcessor:
                     df.rename(columns={possible_name: standard_col}, inplace=True)
                     break
 
-        # near3.py logic: Handle weather data imputation
+        # Missing weather: as-of join on each city's observed weather history
         if "weather" in df.columns:
-            df["weather"] = df["weather"].replace("", np.nan)
-
-            if "brand" in df.columns and "qty" in df.columns:
-                # Fill missing weather based on brand's most selling weather pattern
-                brand_weather_qty = (
-                    df.dropna(subset=["weather"])
-                      .groupby(["brand", "weather"], as_index=False)["qty"]
-                      .sum()
-                )
-
-                top_weather_per_brand = (
-                    brand_weather_qty
-                      .sort_values(by=["brand", "qty"], ascending=[True, False])
-                      .drop_duplicates(subset=["brand"])
-                      .rename(columns={"weather": "top_weather"})
-                      [["brand", "top_weather"]]
-                )
-
-                df = df.merge(top_weather_per_brand, on="brand", how="left")
-                df["weather"] = df["weather"].fillna(df["top_weather"])
-                df["weather"] = df["weather"].fillna("Unknown")
-                df.drop(columns=["top_weather"], inplace=True, errors="ignore")
+            df = attach_weather(df, self.weather_store)
 
         # Ensure required columns exist
         if "qty" not in df.columns:
@@ -233,62 +221,35 @@ class DemandProcessor:
         ]].reset_index(drop=True)
 
         # 2. DEMAND MATCHING ANALYSIS (KNN)
-        K = 5  # number of nearest neighbors
-        ui_results = []
-
-        for idx, r in recent_returns.iterrows():
-            # Step 1: Filter similar category
-            candidates = sales_df[sales_df["category"] == r["category"]].copy()
-            if candidates.empty:
-                # Create empty result for items with no matches
-                ui_results.append({
-                    "id": idx,
-                    "product_name": r["product_name"],
-                    "category": r["category"],
-                    "city": r["city"],
-                    "lat": r["return_lat"],
-                    "lon": r["return_lon"],
-                    "weather": r["weather"],
-                    "local_similar_sales": 0,
-                    "avg_distance_km": 0.0,
-                    "resale_viability": "None",
-                    "evidence": pd.DataFrame()  # Empty dataframe
-                })
-                continue
+        # Neighbour lists are kept up to MAX_K (sorted by distance), so any K <= MAX_K
+        # is a truncation of the same lists (see demand_matches)
+        K = DEFAULT_K
+        pairs = spatial_join(recent_returns, sales_df, on="category", k=MAX_K)
+        neighbors = sales_df.iloc[pairs["right"].values][["sale_date", "platform", "weather", "qty"]].assign(
+            left=pairs["left"].values,
+            distance_km=pairs["distance_km"].values
+        )
 
-            # Step 2: Compute distance (KNN core)
-            candidates["distance_km"] = candidates.apply(
-                lambda s: haversine(
-                    r["return_lat"], r["return_lon"],
-                    s["lat"], s["lon"]
-                ),
-                axis=1
-            )
-
-            # Step 3: Get K nearest neighbors
-            knn_neighbors = candidates.sort_values("distance_km").head(K)
-
-            # Step 4: Metrics for Demand Matching Analysis
-            local_similar_sales = len(knn_neighbors)
-            avg_distance = round(knn_neighbors["distance_km"].mean(), 2) if not knn_neighbors.empty else 0.0
-
-            # Step 5: Resale viability logic (business rules)
-            if local_similar_sales >= 5 and avg_distance <= 5:
-                resale_viability = "High"
-            elif local_similar_sales >= 3:
-                resale_viability = "Medium"
-            else:
-                resale_viability = "Low"
-
-            # Prepare evidence data for UI
-            evidence_df = knn_neighbors[[
-                "sale_date", "platform", "distance_km", "weather", "qty"
-            ]].copy()
-
-            # Format sale_date for display
-            if "sale_date" in evidence_df.columns:
-                evidence_df["sale_date"] = evidence_df["sale_date"].astype(str)
+        return {
+            "recent_returns": recent_returns,
+            "neighbors": neighbors,
+            "k": K,
+            "max_k": MAX_K,
+            "demand_matching_results": demand_matches(recent_returns, neighbors, K)
+        }
+
+
+def demand_matches(recent_returns, neighbors, k=None):
+    """Demand matching results using the k nearest same-category sales per return"""
+    k = min(k or DEFAULT_K, MAX_K)
+    neighbors_by_return = {idx: rows for idx, rows in neighbors.groupby("left", sort=False)}
+    ui_results = []
 
+    for idx, r in recent_returns.iterrows():
+        # Step 1: Returns with no same-category sale get an empty result
+        knn_pairs = neighbors_by_return.get(idx)
+        if knn_pairs is None:
+            # Create empty result for items with no matches
             ui_results.append({
                 "id": idx,
                 "product_name": r["product_name"],
@@ -297,22 +258,47 @@ class DemandProcessor:
                 "lat": r["return_lat"],
                 "lon": r["return_lon"],
                 "weather": r["weather"],
-                "local_similar_sales": local_similar_sales,
-                "avg_distance_km": avg_distance,
-                "resale_viability": resale_viability,
-                "evidence": evidence_df
+                "local_similar_sales": 0,
+                "avg_distance_km": 0.0,
+                "resale_viability": "None",
+                "evidence": pd.DataFrame()  # Empty dataframe
             })
+            continue
 
-        return {
-            "recent_returns": recent_returns,
-            "demand_matching_results": ui_results
-        }
+        # Step 2-3: K nearest neighbors = first k of the distance-sorted list (KNN core)
+        knn_neighbors = knn_pairs.head(k)
 
-# Utility function
-def haversine(lat1, lon1, lat2, lon2):
-    """Calculate haversine distance between two points"""
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    return 6371 * 2 * asin(sqrt(a))
\ No newline at end of file
+        # Step 4: Metrics for Demand Matching Analysis
+        local_similar_sales = len(knn_neighbors)
+        avg_distance = round(knn_neighbors["distance_km"].mean(), 2) if not knn_neighbors.empty else 0.0
+
+        # Step 5: Resale viability logic (business rules)
+        if local_similar_sales >= 5 and avg_distance <= 5:
+            resale_viability = "High"
+        elif local_similar_sales >= 3:
+            resale_viability = "Medium"
+        else:
+            resale_viability = "Low"
+
+        # Prepare evidence data for UI
+        evidence_df = knn_neighbors[EVIDENCE_COLUMNS].copy()
+
+        # Format sale_date for display
+        if "sale_date" in evidence_df.columns:
+            evidence_df["sale_date"] = evidence_df["sale_date"].astype(str)
+
+        ui_results.append({
+            "id": idx,
+            "product_name": r["product_name"],
+            "category": r["category"],
+            "city": r["city"],
+            "lat": r["return_lat"],
+            "lon": r["return_lon"],
+            "weather": r["weather"],
+            "local_similar_sales": local_similar_sales,
+            "avg_distance_km": avg_distance,
+            "resale_viability": resale_viability,
+            "evidence": evidence_df
+        })
+
+    return ui_results
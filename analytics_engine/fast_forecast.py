@@ -0,0 +1,102 @@
+import numpy as np
+
+from demand_matrix import first_sale
+
+# Vectorised forecasting tier: every SKU is forecast at once from a SKU x day matrix
+FAST_FORECAST_CONFIG = {
+    "horizon": 30,                   # days ahead
+    "season": 7,                     # weekly seasonality for the seasonal-naive method
+    "ses_alpha": 0.3,                # exponential smoothing factor
+    "croston_alpha": 0.1,            # Croston smoothing factor (sizes and intervals)
+    "intermittent_zero_share": 0.5,  # share of zero days from which a series counts as intermittent
+}
+
+
+def seasonal_naive(matrix, horizon, season):
+    """Repeat the last full season"""
+    last = matrix[:, -season:]
+    reps = int(np.ceil(horizon / season))
+    return np.tile(last, reps)[:, :horizon]
+
+
+def ses(matrix, alpha, start=None):
+    """Simple exponential smoothing level at the end of each series (started at `start`)"""
+    n, T = matrix.shape
+    start = np.zeros(n, dtype=int) if start is None else start
+    level = np.zeros(n)
+    for t in range(T):
+        y = matrix[:, t]
+        level = np.where(start == t, y, np.where(start < t, alpha * y + (1 - alpha) * level, level))
+    return level
+
+
+def croston(matrix, alpha, start=None):
+    """Croston's method: smoothed demand size / smoothed inter-demand interval, per day"""
+    n, T = matrix.shape
+    start = np.zeros(n, dtype=int) if start is None else start
+    # Intervals start at each series' average gap between demands (active days / demand days)
+    active = np.arange(T)[None, :] >= start[:, None]
+    mean_interval = (T - start) / np.maximum(((matrix > 0) & active).sum(axis=1), 1)
+
+    size = np.zeros(n)
+    interval = np.ones(n)
+    since_last = np.ones(n)
+    seen = np.zeros(n, dtype=bool)
+
+    for t in range(T):
+        y = matrix[:, t]
+        demand = (y > 0) & (start <= t)
+        first = demand & ~seen
+        update = demand & seen
+
+        size = np.where(first, y, np.where(update, size + alpha * (y - size), size))
+        interval = np.where(first, mean_interval, np.where(update, interval + alpha * (since_last - interval), interval))
+        seen |= demand
+        since_last = np.where(demand, 1.0, since_last + seen)
+
+    return np.where(seen, size / interval, 0.0)
+
+
+def classify(matrix, start, config=None):
+    """Method per SKU: croston for intermittent demand, seasonal naive with >= 2 seasons, else SES"""
+    config = {**FAST_FORECAST_CONFIG, **(config or {})}
+    T = matrix.shape[1]
+    active_days = T - start
+    active = np.arange(T)[None, :] >= start[:, None]
+    zero_share = ((matrix == 0) & active).sum(axis=1) / np.maximum(active_days, 1)
+
+    return np.select(
+        [active_days == 0, zero_share >= config["intermittent_zero_share"], active_days >= 2 * config["season"]],
+        ["none", "croston", "seasonal_naive"],
+        "ses"
+    )
+
+
+def fast_forecast(matrix, index, config=None):
+    """Daily forecasts for every SKU of a daily matrix, tagged with the method used"""
+    config = {**FAST_FORECAST_CONFIG, **(config or {})}
+    horizon = config["horizon"]
+    n = matrix.shape[0]
+
+    start = first_sale(matrix)
+    method = classify(matrix, start, config)
+    paths = np.zeros((n, horizon))
+
+    # Each method runs once, vectorised over the SKUs it was chosen for
+    rows = method == "seasonal_naive"
+    if rows.any():
+        paths[rows] = seasonal_naive(matrix[rows], horizon, config["season"])
+    rows = method == "ses"
+    if rows.any():
+        paths[rows] = ses(matrix[rows], config["ses_alpha"], start[rows])[:, None]
+    rows = method == "croston"
+    if rows.any():
+        paths[rows] = croston(matrix[rows], config["croston_alpha"], start[rows])[:, None]
+
+    result = index.copy()
+    result["method"] = method
+    result["history_days"] = matrix.shape[1] - start
+    result["total_qty"] = matrix.sum(axis=1)
+    result["forecast_daily"] = paths.mean(axis=1).round(2)
+    result[f"forecast_{horizon}d"] = paths.sum(axis=1).round(1)
+    return result, paths
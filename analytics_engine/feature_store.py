@@ -0,0 +1,159 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from columns import clean_sales, load_columns, rename_columns, save_columns
+from result_cache import frame_fingerprint
+from weather_store import attach_weather
+
+FEATURE_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "run_reports", "feature_store")
+WINDOWS = (7, 14, 28, 90)     # rolling windows in days, ending at the latest sale date
+
+# Storage grain, and the entity levels features are kept for
+GRAIN = ["product_name", "category", "city", "platform", "weather"]
+LEVELS = {
+    "product": ["product_name", "category"],
+    "category": ["category"],
+    "city": ["city"],
+    "platform": ["platform"],
+    "product_weather": ["product_name", "category", "weather"],
+}
+
+def _standardize(sales_df, weather_store=None):
+    """Sales at the storage grain: missing weather from the observed history, labels cleaned like the processors'"""
+    df = clean_sales(attach_weather(rename_columns(sales_df), weather_store))
+    df["sale_date"] = df["sale_date"].dt.normalize()
+    return df
+
+
+class FeatureStore:
+    """Rolling demand velocity per product, category, city and platform.
+
+    Keeps daily sums for the last max(WINDOWS) days plus all-time totals at
+    the (product, category, city, platform, weather) grain. Each load only
+    aggregates its own rows into that state, then the per-level feature
+    tables (sums and daily means over 7/14/28/90 days) are recomputed from
+    the bounded daily state. Readers look features up by key.
+    """
+
+    def __init__(self, daily=None, totals=None, as_of=None, sources=None, updated_at=None):
+        self.daily = daily if daily is not None else pd.DataFrame(columns=GRAIN + ["sale_date", "qty", "orders"])
+        self.totals = totals if totals is not None else pd.DataFrame(columns=GRAIN + ["qty", "orders"])
+        self.as_of = as_of
+        self.sources = list(sources or [])
+        self.updated_at = updated_at
+        self.features = {}
+        if not self.totals.empty:
+            self._build_features()
+
+    def apply(self, sales_df, source=None, weather_store=None):
+        """Add one batch of sales; a file whose fingerprint was already counted is skipped"""
+        if source is not None and source in self.sources:
+            print("ℹ️ Feature store: sales file already counted, skipped")
+            return self
+        if sales_df is None or sales_df.empty:
+            return self
+
+        sales = _standardize(sales_df, weather_store).assign(orders=1)
+        totals = sales.groupby(GRAIN, sort=False)[["qty", "orders"]].sum().reset_index()
+        self.totals = (pd.concat([self.totals, totals], ignore_index=True)
+                       .groupby(GRAIN, sort=False)[["qty", "orders"]].sum().reset_index())
+
+        dated = sales.dropna(subset=["sale_date"])
+        if not dated.empty:
+            latest = dated["sale_date"].max()
+            self.as_of = latest if self.as_of is None else max(pd.Timestamp(self.as_of), latest)
+            daily = dated.groupby(GRAIN + ["sale_date"], sort=False)[["qty", "orders"]].sum().reset_index()
+            daily = pd.concat([self.daily, daily], ignore_index=True)
+            daily["sale_date"] = pd.to_datetime(daily["sale_date"])
+            daily = daily[daily["sale_date"] > self.as_of - pd.Timedelta(days=max(WINDOWS))]
+            self.daily = daily.groupby(GRAIN + ["sale_date"], sort=False)[["qty", "orders"]].sum().reset_index()
+
+        if source is not None:
+            self.sources.append(source)
+        self.updated_at = datetime.now().isoformat(timespec="seconds")
+        self._build_features()
+        print(f"✅ Feature store updated: {len(self.totals):,} series, as of {pd.Timestamp(self.as_of).date()}")
+        return self
+
+    def _build_features(self):
+        """Per-level rolling sums/means from the bounded daily state"""
+        daily = self.daily.copy()
+        daily[["qty", "orders"]] = daily[["qty", "orders"]].astype(float)
+        age = ((pd.Timestamp(self.as_of) - pd.to_datetime(daily["sale_date"])).dt.days.to_numpy()
+               if self.as_of is not None else np.full(len(daily), np.inf))
+        for w in WINDOWS:
+            in_window = age < w
+            daily[f"qty_{w}d"] = daily["qty"].where(in_window, 0.0)
+            daily[f"orders_{w}d"] = daily["orders"].where(in_window, 0.0)
+        window_cols = [f"{m}_{w}d" for w in WINDOWS for m in ("qty", "orders")]
+
+        self.features = {}
+        for level, keys in LEVELS.items():
+            table = self.totals.groupby(keys)[["qty", "orders"]].sum().astype(float)
+            table.columns = ["qty_total", "orders_total"]
+            table = table.join(daily.groupby(keys)[window_cols].sum()).fillna(0.0)
+            for w in WINDOWS:
+                table[f"qty_mean_{w}d"] = table[f"qty_{w}d"] / w
+            with np.errstate(invalid="ignore", divide="ignore"):
+                table["momentum"] = table["qty_mean_7d"] / table["qty_mean_28d"].replace(0, np.nan)
+            self.features[level] = table
+        return self.features
+
+    def table(self, level):
+        """Feature table of a level, indexed by its keys"""
+        return self.features.get(level, pd.DataFrame())
+
+    def get(self, level, key):
+        """Features of one entity (dict), or None when it has never sold"""
+        table = self.table(level)
+        key = key if len(LEVELS[level]) > 1 else (key[0] if isinstance(key, tuple) else key)
+        if table.empty or key not in table.index:
+            return None
+        return table.loc[key].to_dict()
+
+    def is_empty(self):
+        return self.totals.empty
+
+    def version(self):
+        """Content hash of the state; results built on this store are cached under it"""
+        return frame_fingerprint(self.totals, self.daily)
+
+    def save(self, directory=FEATURE_STORE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        save_columns(self.daily, os.path.join(directory, "daily.npz"))
+        save_columns(self.totals, os.path.join(directory, "totals.npz"))
+        for level, table in self.features.items():
+            save_columns(table.reset_index(), os.path.join(directory, f"features_{level}.npz"))
+        meta = {
+            "as_of": None if self.as_of is None else pd.Timestamp(self.as_of).isoformat(),
+            "sources": self.sources,
+            "updated_at": self.updated_at,
+        }
+        tmp_path = os.path.join(directory, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(directory, "meta.json"))
+        return directory
+
+    @classmethod
+    def load(cls, directory=FEATURE_STORE_DIR):
+        """Persisted store (features read back as stored), or None when nothing was saved"""
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        store = cls(as_of=pd.Timestamp(meta["as_of"]) if meta.get("as_of") else None,
+                    sources=meta.get("sources"), updated_at=meta.get("updated_at"))
+        store.daily = load_columns(os.path.join(directory, "daily.npz"))
+        store.totals = load_columns(os.path.join(directory, "totals.npz"))
+        for level, keys in LEVELS.items():
+            path = os.path.join(directory, f"features_{level}.npz")
+            if os.path.exists(path):
+                store.features[level] = load_columns(path).set_index(keys)
+        return store
@@ -0,0 +1,270 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from demand_matrix import DemandMatrix, first_sale
+from fast_forecast import FAST_FORECAST_CONFIG, classify, croston, seasonal_naive, ses
+
+# Rolling-origin evaluation: each fold trains on everything before its origin
+# and is scored on the next `horizon` days
+BACKTEST_CONFIG = {
+    "folds": 4,
+    "horizon": 14,              # days scored per fold
+    "min_train_days": 28,       # origins need at least this much history
+    "chunk_size": 2000,         # SKUs per fast-tier task
+    "workers": None,            # fast-tier process pool size (None = CPU count), fixed when the pool starts
+    "time_budget_s": 60,        # tasks not finished by then are cancelled and reported
+}
+
+# Per-process state of the pool workers: the memory-mapped matrix and the
+# training windows already derived from it, keyed by fold origin
+_WORKER = {"path": None, "matrix": None, "windows": {}}
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _fast_pool(workers=None):
+    """Process pool for the fast-tier tasks, started once per server process.
+
+    Spawned rather than forked: the server is multi-threaded, and forking it
+    copies whatever locks its other threads hold.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+
+def fold_origins(n_days, config=None):
+    """Day indices where each fold's test window starts, oldest first"""
+    config = {**BACKTEST_CONFIG, **(config or {})}
+    origins = [n_days - config["horizon"] * k for k in range(config["folds"], 0, -1)]
+    return [o for o in origins if o >= config["min_train_days"]]
+
+
+def _matrix(path):
+    if _WORKER["path"] != path:
+        _WORKER.update(path=path, matrix=DemandMatrix.load(path), windows={})
+    return _WORKER["matrix"]
+
+
+def _window(path, origin):
+    """Cached training window of a fold (where each SKU's series starts), shared by its tasks"""
+    matrix = _matrix(path)
+    if origin not in _WORKER["windows"]:
+        _WORKER["windows"][origin] = {"start": first_sale(matrix.values[:, :origin])}
+    return _WORKER["windows"][origin]
+
+
+def _season_avg(train, start, periods, origin, horizon):
+    """Mean daily units over past days of the same season as each test day (the seasonal label signal)"""
+    from smart_forecast_processor import get_season
+
+    seasons = np.array([get_season(p.month) for p in periods[:origin + horizon]])
+    active = np.arange(origin)[None, :] >= start[:, None]
+    forecast = np.full((train.shape[0], horizon), np.nan)
+    for season in np.unique(seasons[origin:]):
+        selected = active & (seasons[:origin] == season)[None, :]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(selected, train, 0.0).sum(axis=1) / selected.sum(axis=1)
+        forecast[:, seasons[origin:] == season] = mean[:, None]
+    return forecast
+
+
+def _score(rows, origin, method, forecast, actual):
+    """Error sums of one method on one fold; rows without a forecast are left out"""
+    valid = np.isfinite(forecast).all(axis=1)
+    forecast, actual, rows = forecast[valid], actual[valid], rows[valid]
+    error = np.abs(forecast - actual)
+    sold = actual > 0
+    return pd.DataFrame({
+        "row": rows,
+        "origin": origin,
+        "method": method,
+        "abs_error": error.sum(axis=1),
+        "total_error": np.abs(forecast.sum(axis=1) - actual.sum(axis=1)),
+        "actual": actual.sum(axis=1),
+        "ape_sum": np.where(sold, error / np.where(sold, actual, 1), 0).sum(axis=1),
+        "ape_days": sold.sum(axis=1),
+    })
+
+
+def _evaluate_fast(path, rows, origin, horizon):
+    """Every fast-tier method (and the seasonal average) for a chunk of SKUs on one fold"""
+    matrix = _matrix(path)
+    window = _window(path, origin)
+    start = window["start"][rows]
+    has_history = start < origin
+    rows, start = rows[has_history], start[has_history]
+
+    train = np.asarray(matrix.values[rows, :origin])
+    actual = np.asarray(matrix.values[rows, origin:origin + horizon])
+    config = FAST_FORECAST_CONFIG
+    forecasts = {
+        "seasonal_naive": seasonal_naive(train, horizon, config["season"]),
+        "ses": np.repeat(ses(train, config["ses_alpha"], start)[:, None], horizon, axis=1),
+        "croston": np.repeat(croston(train, config["croston_alpha"], start)[:, None], horizon, axis=1),
+        "season_avg": _season_avg(train, start, matrix.periods, origin, horizon),
+    }
+    return pd.concat([_score(rows, origin, method, f, actual) for method, f in forecasts.items()],
+                     ignore_index=True)
+
+
+def _score_prophet(matrix, row, origin, horizon, result):
+    """Score one Prophet fit returned by the warm pool"""
+    if result["forecast"] is None:
+        raise ValueError(f"Prophet fit failed for row {row}")
+    forecast = np.asarray(result["forecast"]["yhat"][:horizon])[None, :]
+    actual = np.asarray(matrix.values[row:row + 1, origin:origin + horizon])
+    return _score(np.array([row]), origin, "prophet", forecast, actual)
+
+
+def summarize(scores):
+    """WAPE of the horizon totals, daily WAPE and MAPE (mean over selling days) of a score table.
+
+    The headline WAPE compares each SKU's forecast and actual units over the
+    whole horizon, the grain stock is planned at; daily WAPE also charges
+    every mistimed unit of an intermittent series.
+    """
+    totals = scores[["abs_error", "total_error", "actual", "ape_sum", "ape_days"]].sum()
+    return pd.Series({
+        "wape_pct": round(totals["total_error"] / totals["actual"] * 100, 1) if totals["actual"] else np.nan,
+        "daily_wape_pct": round(totals["abs_error"] / totals["actual"] * 100, 1) if totals["actual"] else np.nan,
+        "mape_pct": round(totals["ape_sum"] / totals["ape_days"] * 100, 1) if totals["ape_days"] else np.nan,
+        "series": int(len(scores)),
+    })
+
+
+def _report(scores, matrix, chosen):
+    scores = scores.merge(matrix.index[["category"]], left_on="row", right_index=True)
+    key = pd.MultiIndex.from_arrays([scores["row"], scores["origin"]])
+    scores["chosen"] = scores["method"].values == chosen.reindex(key).values
+    production = scores[scores["chosen"]]
+
+    by_method = scores.groupby("method").apply(summarize).reset_index().astype({"series": int})
+    by_category = production.groupby("category").apply(summarize).reset_index().astype({"series": int})
+    by_method_category = scores.groupby(["method", "category"]).apply(summarize).reset_index().astype({"series": int})
+    overall = summarize(production)
+    return scores, by_method, by_category, by_method_category, overall
+
+
+def backtest(matrix, config=None):
+    """Rolling-origin backtest of the forecast tiers over every SKU of a daily DemandMatrix.
+
+    Fast-tier methods are scored for all SKUs in chunks, Prophet for the SKUs
+    the processor would fit it for; tasks run on a process pool sharing the
+    memory-mapped matrix. Work still pending when the time budget runs out is
+    cancelled and reported as incomplete. The production tier of each SKU
+    (what SmartForecastProcessor would use) gives the headline WAPE, scored
+    on each SKU's horizon total.
+    """
+    from prophet_pool import shared_pool
+    from smart_forecast_processor import PROPHET_CONFIG, prophet_candidates
+
+    config = {**BACKTEST_CONFIG, **(config or {})}
+    started = time.perf_counter()
+    origins = fold_origins(matrix.values.shape[1], config)
+    if not origins or not len(matrix.index):
+        print("⚠️ Backtest skipped: not enough history for a single fold")
+        return None
+
+    # Workers open the matrix memory-mapped; an in-memory one is written to a
+    # temporary directory that is removed once this run's tasks are over
+    scratch = None
+    path = matrix.path
+    if path is None:
+        scratch = tempfile.TemporaryDirectory(prefix="backtest_")
+        path = matrix.save(os.path.join(scratch.name, "matrix"))
+
+    # Tier each SKU would have been given at each origin; Prophet overrides the fast tier
+    horizon, n = config["horizon"], len(matrix.index)
+    fast_tier, prophet_rows, tasks, prophet_series = {}, {}, [], []
+    for origin in origins:
+        train = matrix.values[:, :origin]
+        start = first_sale(train)
+        fast_tier.update(zip(((row, origin) for row in range(n)), classify(train, start)))
+        candidates = prophet_candidates(train)
+        prophet_rows[origin] = candidates
+        for lo in range(0, n, config["chunk_size"]):
+            tasks.append((path, np.arange(lo, min(lo + config["chunk_size"], n)), origin, horizon))
+        prophet_series += [
+            (int(row), origin, pd.DataFrame({"ds": matrix.periods[start[row]:origin],
+                                             "y": np.asarray(train[row, start[row]:])}))
+            for row in candidates
+        ]
+
+    # Fast tasks go to the fast-tier pool, Prophet fits to the warm Prophet workers;
+    # an exhausted budget therefore mostly costs Prophet folds
+    results, failed = [], 0
+    deadline = started + config["time_budget_s"]
+    executor = _fast_pool(config["workers"])
+    prophet_pool = shared_pool()
+    pending, prophet_futures = set(), {}
+    try:
+        pending = {executor.submit(_evaluate_fast, *task) for task in tasks}
+        prophet_futures = {prophet_pool.submit(ts, PROPHET_CONFIG): (row, origin) for row, origin, ts in prophet_series}
+        pending |= set(prophet_futures)
+        while pending and time.perf_counter() < deadline:
+            done, pending = wait(pending, timeout=deadline - time.perf_counter(), return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    if future in prophet_futures:
+                        results.append(_score_prophet(matrix, *prophet_futures[future], horizon, future.result()))
+                    else:
+                        results.append(future.result())
+                except Exception as e:
+                    failed += 1
+                    print(f"⚠️ Backtest task failed: {e}")
+    finally:
+        for future in pending:
+            future.cancel()
+        if scratch is not None:
+            # fast tasks already running still read the file
+            wait([f for f in pending if f not in prophet_futures and not f.cancelled()])
+            scratch.cleanup()
+
+    if not results:
+        print("⚠️ Backtest produced no scores within the time budget")
+        return None
+
+    # SKUs whose Prophet fold did not finish are judged on their fast tier
+    scores = pd.concat(results, ignore_index=True)
+    fitted = set(zip(*scores.loc[scores["method"] == "prophet", ["row", "origin"]].values.T))
+    chosen = pd.Series(fast_tier)
+    for origin, rows in prophet_rows.items():
+        for row in rows:
+            if (row, origin) in fitted:
+                chosen[(row, origin)] = "prophet"
+
+    scores, by_method, by_category, by_method_category, overall = _report(scores, matrix, chosen)
+    elapsed = time.perf_counter() - started
+    total = len(tasks) + len(prophet_series)
+    finished = total - len(pending) - failed
+    print(f"✅ Backtest: {n} SKUs x {len(origins)} folds in {elapsed:.1f}s, "
+          f"{finished}/{total} tasks, WAPE {overall['wape_pct']}%")
+
+    return {
+        "scores": scores,
+        "by_method": by_method,
+        "by_category": by_category,
+        "by_method_category": by_method_category,
+        "wape_pct": overall["wape_pct"],
+        "daily_wape_pct": overall["daily_wape_pct"],
+        "mape_pct": overall["mape_pct"],
+        "skus": n,
+        "folds": len(origins),
+        "horizon": horizon,
+        "tasks_done": finished,
+        "tasks_total": total,
+        "complete": not pending and not failed,
+        "elapsed_s": round(elapsed, 2),
+    }
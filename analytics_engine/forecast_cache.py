@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+FORECAST_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "run_reports", "forecast_cache.json")
+
+# Caches of every session write the same file: merges are serialized per process
+_SAVE_LOCK = threading.Lock()
+
+
+def series_fingerprint(ts, config=None):
+    """Content hash of one (ds, y) series plus the model configuration that would fit it"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(config or {}, sort_keys=True, default=str).encode())
+    digest.update(pd.to_datetime(ts["ds"]).values.astype("datetime64[ns]").astype(np.int64).tobytes())
+    digest.update(np.asarray(ts["y"], dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def series_key(*parts):
+    """Stable string key of a series, e.g. (product_name, category)"""
+    return "|".join(str(p) for p in parts)
+
+
+class ForecastCache:
+    """Fitted forecasts per series, reused until the series or model configuration changes.
+
+    Entries are keyed by series (product, category) and carry the fingerprint
+    they were fitted on; a new ingestion only refits series whose fingerprint
+    differs. Stored as one JSON file, loaded on first use; saving merges this
+    cache's refits into whatever other sessions wrote meanwhile.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._entries = None
+        self._updated = set()   # keys refit since the last save
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def path(self):
+        # Resolved late so a FORECAST_CACHE_PATH from .env is honoured
+        return self._path or os.getenv("FORECAST_CACHE_PATH", FORECAST_CACHE_PATH)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Forecast cache unreadable, starting empty: {e}")
+            return {}
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def get(self, key, fingerprint):
+        """Stored forecast of `key` if it was fitted on exactly this series, else None"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.get("fingerprint") == fingerprint:
+                self.hits += 1
+                return entry["forecast"]
+            self.misses += 1
+            return None
+
+    def put(self, key, fingerprint, forecast):
+        with self._lock:
+            self.entries[key] = {
+                "fingerprint": fingerprint,
+                "forecast": forecast,
+                "fitted_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._updated.add(key)
+
+    def get_or_fit(self, key, ts, fit, config=None):
+        """Cached forecast of a series, calling `fit(ts)` only when its fingerprint changed"""
+        fingerprint = series_fingerprint(ts, config)
+        forecast = self.get(key, fingerprint)
+        if forecast is None:
+            forecast = fit(ts)
+            if forecast is not None:
+                self.put(key, fingerprint, forecast)
+        return forecast
+
+    def get_or_fit_many(self, series, fit_many, config=None):
+        """Cached forecasts of {key: ts}; series whose fingerprint changed go to `fit_many({key: ts})` together"""
+        fingerprints = {key: series_fingerprint(ts, config) for key, ts in series.items()}
+        forecasts = {key: self.get(key, fingerprint) for key, fingerprint in fingerprints.items()}
+        stale = {key: series[key] for key, forecast in forecasts.items() if forecast is None}
+        if stale:
+            for key, forecast in fit_many(stale).items():
+                if forecast is not None:
+                    self.put(key, fingerprints[key], forecast)
+                forecasts[key] = forecast
+        return forecasts
+
+    def save(self):
+        """Write the cache back if anything was refit, keeping entries other writers added meanwhile"""
+        with self._lock, _SAVE_LOCK:
+            if not self._updated:
+                return None
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            entries = self._read()
+            entries.update({key: self._entries[key] for key in self._updated})
+            with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as f:
+                json.dump(entries, f, default=lambda v: v.item() if isinstance(v, np.generic) else str(v))
+            os.replace(f.name, self.path)
+            self._entries = entries
+            self._updated.clear()
+        return self.path
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reuse_pct": round(self.hits / total * 100, 1) if total else 0.0,
+        }
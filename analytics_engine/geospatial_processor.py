@@ -1,22 +1,43 @@
 import pandas as pd
 import numpy as np
-from math import radians, cos, sin, asin, sqrt
-from collections import defaultdict
+
+from columns import load_table
+from spatial_buckets import SpatialBuckets
+from spatial_join import spatial_join
+from weather_store import attach_weather
+
+# Sell-Near-Me scoring (near4.py); override per run via GeospatialProcessor(config=...)
+SELL_NEAR_ME_CONFIG = {
+    "max_distance_km": 15,
+    "min_total_qty": 5,
+    "yes_threshold": 70,
+    "maybe_threshold": 40,
+    "demand_saturation_qty": 30,       # nearby units at which demand_score reaches 1
+    "weights": {"distance": 0.5, "demand": 0.3, "platform": 0.2},
+    "platform_weight": {
+        "Blinkit": 1.0,
+        "Swiggy Instamart": 0.9,
+        "Zepto": 0.8
+    },
+    "default_platform_weight": 0.7,
+    "sweep_max_km": 50,                # neighbour lists are kept up to this radius for the radius control
+}
+
 
 class GeospatialProcessor:
-    def __init__(self):
+    def __init__(self, config=None, weather_store=None):
         self.returns_df = None
         self.sales_df = None
         self.processed_data = {}
+        self.config = {**SELL_NEAR_ME_CONFIG, **(config or {})}
+        self.weather_store = weather_store
 
     def load_and_process_data(self, returns_file=None, sales_file=None):
         """Load and process data using combined logic from near.py, near1.py, near2.py, near3.py, near4.py"""
 
         # Load data
-        if returns_file:
-            self.returns_df = pd.read_excel(returns_file) if returns_file.endswith('.xlsx') else pd.read_csv(returns_file)
-        if sales_file:
-            self.sales_df = pd.read_excel(sales_file) if sales_file.endswith('.xlsx') else pd.read_csv(sales_file)
+        self.returns_df = load_table(returns_file, self.returns_df)
+        self.sales_df = load_table(sales_file, self.sales_df)
 
         if self.returns_df is None and self.sales_df is None:
             return None
@@ -145,30 +166,9 @@ class GeospatialProcessor:
                     df.rename(columns={possible_name: standard_col}, inplace=True)
                     break
 
-        # near3.py logic: Handle weather data imputation
+        # Missing weather: as-of join on each city's observed weather history
         if "weather" in df.columns:
-            df["weather"] = df["weather"].replace("", np.nan)
-
-            if "brand" in df.columns and "qty" in df.columns:
-                # Fill missing weather based on brand's most selling weather pattern
-                brand_weather_qty = (
-                    df.dropna(subset=["weather"])
-                      .groupby(["brand", "weather"], as_index=False)["qty"]
-                      .sum()
-                )
-
-                top_weather_per_brand = (
-                    brand_weather_qty
-                      .sort_values(by=["brand", "qty"], ascending=[True, False])
-                      .drop_duplicates(subset=["brand"])
-                      .rename(columns={"weather": "top_weather"})
-                      [["brand", "top_weather"]]
-                )
-
-                df = df.merge(top_weather_per_brand, on="brand", how="left")
-                df["weather"] = df["weather"].fillna(df["top_weather"])
-                df["weather"] = df["weather"].fillna("Unknown")
-                df.drop(columns=["top_weather"], inplace=True, errors="ignore")
+            df = attach_weather(df, self.weather_store)
 
         # Ensure qty column exists
         if "qty" not in df.columns:
@@ -179,21 +179,10 @@ class GeospatialProcessor:
         return df
 
     def _geospatial_demand_analysis(self):
-        """Geospatial demand analysis logic from near4.py"""
+        """Geospatial demand analysis logic from near4.py, scored as one columnar pass"""
         if self.returns_df is None or self.sales_df is None:
             return None
 
-        MAX_DISTANCE_KM = 15
-        MIN_TOTAL_QTY = 5
-        YES_THRESHOLD = 70
-        MAYBE_THRESHOLD = 40
-
-        PLATFORM_WEIGHT = {
-            "Blinkit": 1.0,
-            "Swiggy Instamart": 0.9,
-            "Zepto": 0.8
-        }
-
         # Ensure required columns exist
         returns_required = ["product_name", "return_lat", "return_lon"]
         sales_required = ["product_name", "lat", "lon", "platform", "qty"]
@@ -209,110 +198,158 @@ class GeospatialProcessor:
                 return None
 
         # Clean data
-        returns_df = self.returns_df.dropna(subset=["product_name", "return_lat", "return_lon"]).copy()
-        sales_df = self.sales_df.dropna(subset=["product_name", "lat", "lon", "platform"]).copy()
-
-        # Regional summary storage
-        regional_summary = defaultdict(lambda: {"returns": 0, "sales": 0})
-        analysis_results = []
-
-        for _, ret in returns_df.iterrows():
-            order_id = ret.get("order_id", f"RET-{len(analysis_results)+1}")
-            product = ret["product_name"]
-            city = ret.get("city", "Unknown")
-            r_lat = ret["return_lat"]
-            r_lon = ret["return_lon"]
-
-            matched_sales = sales_df[sales_df["product_name"] == product].copy()
-
-            if matched_sales.empty:
-                decision = "NO"
-                confidence = 0
-                reason = "No instant-delivery sales history"
-                regional_summary[city]["returns"] += 1
-            else:
-                matched_sales.loc[:, "distance_km"] = matched_sales.apply(
-                    lambda row: haversine(r_lat, r_lon, row["lat"], row["lon"]),
-                    axis=1
-                )
+        returns_df = self.returns_df.dropna(subset=["product_name", "return_lat", "return_lon"]).reset_index(drop=True)
+        sales_df = self.sales_df.dropna(subset=["product_name", "lat", "lon", "platform"]).reset_index(drop=True)
+
+        # (return, nearby-sale) pairs at the widest radius; any smaller radius is a truncation
+        order_ids = (returns_df["order_id"] if "order_id" in returns_df.columns
+                     else pd.Series([f"RET-{i+1}" for i in range(len(returns_df))]))
+        cities = returns_df["city"] if "city" in returns_df.columns else pd.Series(["Unknown"] * len(returns_df))
+        sweep = SellNearMeSweep(
+            pd.DataFrame({
+                "order_id": order_ids.values,
+                "product": returns_df["product_name"].values,
+                "city": cities.values,
+                "lat": returns_df["return_lat"].values,
+                "lon": returns_df["return_lon"].values,
+            }),
+            self._nearby_pairs(returns_df, sales_df, max(self.config["max_distance_km"], self.config["sweep_max_km"])),
+            has_history=returns_df["product_name"].isin(sales_df["product_name"]).values,
+            config=self.config
+        )
+        result = sweep.at(self.config["max_distance_km"])
+
+        # Regional aggregates per geohash cell (country -> neighborhood drill-down)
+        regional_cells = SpatialBuckets.build(
+            returns_df.assign(
+                resellable=[r["sell_near_me"] != "NO" for r in result["analysis_results"]],
+                confidence=[r["sell_confidence"] for r in result["analysis_results"]]
+            ),
+            sales_df
+        )
 
-                nearby_sales = matched_sales[matched_sales["distance_km"] <= MAX_DISTANCE_KM]
-
-                if nearby_sales.empty:
-                    decision = "NO"
-                    confidence = 0
-                    reason = "No nearby demand within radius"
-                    regional_summary[city]["returns"] += 1
-                else:
-                    total_qty = nearby_sales["qty"].sum()
-
-                    if total_qty < MIN_TOTAL_QTY:
-                        decision = "NO"
-                        confidence = 0
-                        reason = "Insufficient demand volume"
-                        regional_summary[city]["returns"] += 1
-                    else:
-                        platform_qty = nearby_sales.groupby("platform")["qty"].sum()
-                        best_app = platform_qty.idxmax()
-
-                        platform_strength = PLATFORM_WEIGHT.get(best_app, 0.7)
-                        avg_distance = nearby_sales["distance_km"].mean()
-
-                        distance_score = max(0, (MAX_DISTANCE_KM - avg_distance) / MAX_DISTANCE_KM)
-                        demand_score = min(1, total_qty / 30)
-                        platform_score = platform_strength
-
-                        confidence = int((
-                            0.5 * distance_score +
-                            0.3 * demand_score +
-                            0.2 * platform_score
-                        ) * 100)
-
-                        if confidence < MAYBE_THRESHOLD:
-                            decision = "NO"
-                            reason = "Low confidence after demand & distance evaluation"
-                            regional_summary[city]["returns"] += 1
-                        elif confidence < YES_THRESHOLD:
-                            decision = "MAYBE"
-                            reason = "Moderate demand near return location"
-                            regional_summary[city]["sales"] += 1
-                        else:
-                            decision = "YES"
-                            reason = "Strong nearby demand with platform dominance"
-                            regional_summary[city]["sales"] += 1
-
-            # Determine best platform if available
-            best_platform = "Unknown"
-            if not matched_sales.empty and not nearby_sales.empty:
-                platform_qty = nearby_sales.groupby("platform")["qty"].sum()
-                if not platform_qty.empty:
-                    best_platform = platform_qty.idxmax()
-
-            analysis_results.append({
-                "order_id": order_id,
-                "product": product,
-                "city": city,
-                "lat": r_lat,
-                "lon": r_lon,
-                "sell_near_me": decision,
-                "sell_confidence": confidence,
-                "reason": reason,
-                "best_platform": best_platform
-            })
-
-        return {
-            "regional_summary": dict(regional_summary),
+        return {**result, "regional_cells": regional_cells, "sweep": sweep}
+
+    def _nearby_pairs(self, returns_df, sales_df, max_km):
+        """(ret, sale, distance_km, platform, qty) for same-product sales within `max_km`"""
+        pairs = spatial_join(returns_df, sales_df, on="product_name", radius_km=max_km)
+        pairs = pairs.rename(columns={"left": "ret", "right": "sale"})
+        pairs["platform"] = sales_df["platform"].values[pairs["sale"].values]
+        pairs["qty"] = sales_df["qty"].values[pairs["sale"].values]
+        return pairs
+
+
+class SellNearMeSweep:
+    """Sell-Near-Me results for any search radius from one neighbour list.
+
+    Pairs are found once at the widest radius (`sweep_max_km`) and kept sorted
+    by distance, so a smaller radius is only a filter on `distance_km` and a
+    re-score - no new spatial join. Results are memoised per radius.
+    """
+
+    def __init__(self, returns, pairs, has_history, config=None):
+        self.returns = returns
+        self.pairs = pairs
+        self.has_history = has_history
+        self.config = {**SELL_NEAR_ME_CONFIG, **(config or {})}
+        self.max_radius_km = max(self.config["max_distance_km"], self.config["sweep_max_km"])
+        self._results = {}
+
+    def at(self, radius_km=None):
+        """analysis_results, map_data and regional_summary for one radius (<= max_radius_km)"""
+        radius_km = float(min(radius_km or self.config["max_distance_km"], self.max_radius_km))
+        if radius_km in self._results:
+            return self._results[radius_km]
+
+        pairs = self.pairs[self.pairs["distance_km"].values <= radius_km]
+        scored = score_returns(len(self.returns), pairs, self.has_history,
+                               config={**self.config, "max_distance_km": radius_km})
+
+        results = self.returns.assign(
+            sell_near_me=scored["decision"].values,
+            sell_confidence=scored["confidence"].values,
+            reason=scored["reason"].values,
+            best_platform=scored["best_platform"].values,
+        )
+        analysis_results = results.to_dict("records")
+
+        # Regional summary: rejected returns stay "returns", YES/MAYBE count as resale "sales"
+        resellable = results["sell_near_me"] != "NO"
+        summary = (
+            pd.DataFrame({"city": results["city"], "returns": ~resellable, "sales": resellable})
+            .groupby("city", sort=False, dropna=False)[["returns", "sales"]]
+            .sum()
+        )
+        regional_summary = {city: {"returns": int(row.returns), "sales": int(row.sales)}
+                            for city, row in zip(summary.index, summary.itertuples(index=False))}
+
+        self._results[radius_km] = {
+            "radius_km": radius_km,
+            "regional_summary": regional_summary,
             "analysis_results": analysis_results,
             "map_data": [{"lat": r["lat"], "lon": r["lon"], "decision": r["sell_near_me"],
                          "confidence": r["sell_confidence"], "product": r["product"],
                          "city": r["city"], "platform": r["best_platform"]} for r in analysis_results]
         }
-
-# Utility function
-def haversine(lat1, lon1, lat2, lon2):
-    """Calculate haversine distance between two points"""
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    return 6371 * 2 * asin(sqrt(a))
\ No newline at end of file
+        return self._results[radius_km]
+
+
+def score_returns(n_returns, pairs, has_history, config=None):
+    """Sell-Near-Me decision per return from a (return, nearby-sale) pair table.
+
+    `pairs` needs ret (0..n_returns-1), distance_km, platform and qty columns;
+    `has_history` flags returns whose product sold anywhere at all.
+    """
+    config = {**SELL_NEAR_ME_CONFIG, **(config or {})}
+    max_km = config["max_distance_km"]
+    weights = config["weights"]
+
+    # Per-return aggregates (returns without nearby sales get zeros)
+    per_return = pairs.groupby("ret").agg(total_qty=("qty", "sum"), avg_distance=("distance_km", "mean"))
+    per_return = per_return.reindex(np.arange(n_returns))
+    nearby = per_return["total_qty"].notna().values
+    total_qty = per_return["total_qty"].fillna(0).values
+    avg_distance = per_return["avg_distance"].fillna(max_km).values
+
+    # Best platform: most nearby units, ties to the alphabetically first platform
+    platform_qty = pairs.groupby(["ret", "platform"])["qty"].sum().reset_index()
+    best = platform_qty.loc[platform_qty.groupby("ret")["qty"].idxmax()]
+    best_platform = pd.Series(best["platform"].values, index=best["ret"].values).reindex(np.arange(n_returns))
+    best_platform = best_platform.fillna("Unknown").values
+
+    platform_score = pd.Series(best_platform).map(config["platform_weight"]).fillna(config["default_platform_weight"]).values
+    distance_score = np.maximum(0, (max_km - avg_distance) / max_km)
+    demand_score = np.minimum(1, total_qty / config["demand_saturation_qty"])
+    confidence = np.trunc((
+        weights["distance"] * distance_score +
+        weights["demand"] * demand_score +
+        weights["platform"] * platform_score
+    ) * 100).astype(int)
+
+    enough = nearby & (total_qty >= config["min_total_qty"])
+    confidence = np.where(enough, confidence, 0)
+
+    conditions = [
+        ~has_history,
+        ~nearby,
+        ~enough,
+        confidence < config["maybe_threshold"],
+        confidence < config["yes_threshold"],
+    ]
+    decision = np.select(conditions, ["NO", "NO", "NO", "NO", "MAYBE"], "YES")
+    reason = np.select(conditions, [
+        "No instant-delivery sales history",
+        "No nearby demand within radius",
+        "Insufficient demand volume",
+        "Low confidence after demand & distance evaluation",
+        "Moderate demand near return location",
+    ], "Strong nearby demand with platform dominance")
+
+    return pd.DataFrame({
+        "decision": decision,
+        "confidence": confidence,
+        "reason": reason,
+        "best_platform": best_platform,
+        "total_qty": total_qty,
+        "avg_distance_km": np.where(nearby, avg_distance, np.nan),
+    })
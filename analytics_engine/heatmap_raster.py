@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_SIZE = 256       # Raster width/height in pixels (longest side)
+DEFAULT_SIGMA = 2.0      # Gaussian smoothing radius in pixels
+
+# Layer name -> RGB colour of the overlay
+LAYER_COLORS = {
+    "sales": (0, 230, 118),     # green, matches the Sales bars
+    "returns": (255, 82, 82),   # red, matches the Returns bars
+}
+
+
+def _coordinates(df, lat_cols=("return_lat", "lat", "latitude"), lon_cols=("return_lon", "lon", "longitude")):
+    """Numeric, valid lat/lon arrays from the first matching columns of a frame"""
+    if df is None or df.empty:
+        return np.empty(0), np.empty(0)
+
+    columns = {c.strip().lower(): c for c in df.columns}
+    lat_col = next((columns[c] for c in lat_cols if c in columns), None)
+    lon_col = next((columns[c] for c in lon_cols if c in columns), None)
+    if lat_col is None or lon_col is None:
+        return np.empty(0), np.empty(0)
+
+    lat = pd.to_numeric(df[lat_col], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df[lon_col], errors="coerce").to_numpy(dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    return lat[valid], lon[valid]
+
+
+def grid_bounds(*point_sets, pad=0.05):
+    """Shared (south, west, north, east) of several (lat, lon) sets, padded"""
+    lats = np.concatenate([lat for lat, _ in point_sets])
+    lons = np.concatenate([lon for _, lon in point_sets])
+    south, north, west, east = lats.min(), lats.max(), lons.min(), lons.max()
+    pad_lat = max((north - south) * pad, 0.01)
+    pad_lon = max((east - west) * pad, 0.01)
+    return south - pad_lat, west - pad_lon, north + pad_lat, east + pad_lon
+
+
+def rasterize(lat, lon, bounds, shape, weights=None):
+    """Point density on a lat/lon grid; row 0 is the northern edge (image order)"""
+    south, west, north, east = bounds
+    grid, _, _ = np.histogram2d(lat, lon, bins=shape, range=[[south, north], [west, east]], weights=weights)
+    return grid[::-1]
+
+
+def _kernel_matrix(n, sigma):
+    """Banded Gaussian convolution matrix (columns sum to 1, so mass is preserved)"""
+    offsets = np.arange(n)[:, None] - np.arange(n)[None, :]
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel[np.abs(offsets) > 4 * sigma] = 0.0
+    return kernel / kernel.sum(axis=0, keepdims=True)
+
+
+def smooth(grid, sigma=DEFAULT_SIGMA):
+    """Separable Gaussian blur as two matrix products"""
+    if sigma <= 0:
+        return grid
+    rows, cols = grid.shape
+    return _kernel_matrix(rows, sigma) @ grid @ _kernel_matrix(cols, sigma).T
+
+
+def colorize(density, rgb, gamma=0.5, max_alpha=210):
+    """RGBA image whose opacity follows the (gamma-compressed) density"""
+    peak = density.max()
+    norm = (density / peak) ** gamma if peak > 0 else np.zeros_like(density)
+    image = np.zeros(density.shape + (4,), dtype=np.uint8)
+    image[..., :3] = rgb
+    image[..., 3] = (norm * max_alpha).astype(np.uint8)
+    return image
+
+
+def build_heatmaps(returns_df=None, sales_df=None, size=DEFAULT_SIZE, sigma=DEFAULT_SIGMA):
+    """Sales and return density rasters on one shared grid, ready for an image overlay.
+
+    Returns {"bounds": [[south, west], [north, east]], "layers": {name: {...}}}
+    where each layer holds the RGBA `image`, the smoothed `density` and the
+    number of `points`.
+    """
+    points = {"returns": _coordinates(returns_df), "sales": _coordinates(sales_df)}
+    points = {name: p for name, p in points.items() if len(p[0])}
+    if not points:
+        return None
+
+    south, west, north, east = grid_bounds(*points.values())
+    aspect = (north - south) / (east - west)
+    shape = (size, max(16, int(size / aspect))) if aspect >= 1 else (max(16, int(size * aspect)), size)
+
+    weights = {}
+    if sales_df is not None and "sales" in points:
+        qty_col = next((c for c in sales_df.columns if c.strip().lower() in ("qty", "quantity")), None)
+        if qty_col is not None:
+            lat, lon = _coordinates(sales_df)
+            if len(lat) == len(sales_df):
+                weights["sales"] = pd.to_numeric(sales_df[qty_col], errors="coerce").fillna(1).to_numpy()
+
+    layers = {}
+    for name, (lat, lon) in points.items():
+        density = smooth(rasterize(lat, lon, (south, west, north, east), shape, weights.get(name)), sigma)
+        layers[name] = {
+            "image": colorize(density, LAYER_COLORS[name]),
+            "density": density.astype(np.float32),
+            "points": int(len(lat)),
+        }
+
+    print(f"✅ Heatmap rasters built: {shape[0]}x{shape[1]} grid, "
+          + ", ".join(f"{name}={layer['points']}" for name, layer in layers.items()))
+    return {"bounds": [[float(south), float(west)], [float(north), float(east)]], "layers": layers}
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from fast_forecast import FAST_FORECAST_CONFIG, fast_forecast
+
+# Levels of the forecast hierarchy -> index keys they aggregate to. "bottom" is
+# the demand matrix grain (product, category, city); the others are roll-ups.
+LEVELS = {
+    "total": [],
+    "category": ["category"],
+    "city": ["city"],
+    "sku": ["product_name", "category"],
+    "bottom": ["product_name", "category", "city"],
+}
+
+HIERARCHY_CONFIG = {
+    "horizon": 30,
+    "anchor": "category",              # level whose forecast sparse series share
+    "share_days": 90,                  # recent history that sets each sparse series' share
+    "sparse_methods": ["croston", "none"],
+}
+
+
+def summing_matrix(index, keys):
+    """Sparse 0/1 matrix mapping bottom rows to the groups of `keys`, with the group labels"""
+    if keys:
+        codes, groups = pd.MultiIndex.from_frame(index[keys]).factorize(sort=True)
+        labels = groups.to_frame(index=False, name=keys)
+    else:
+        codes, labels = np.zeros(len(index), dtype=int), pd.DataFrame(index=[0])
+    S = sparse.csr_matrix((np.ones(len(index)), (codes, np.arange(len(index)))), shape=(len(labels), len(index)))
+    return S, codes, labels
+
+
+def reconcile(bottom_paths, anchor_paths, S_anchor, anchor_codes, sparse_rows, recent):
+    """Coherent bottom forecasts: dense series keep their own, sparse ones split the anchor's remainder.
+
+    Within each anchor group (e.g. a category) the sparse series share what the
+    anchor forecast leaves after the dense series, in proportion to their
+    recent demand (equally when they had none). The group total then equals
+    the anchor forecast unless the dense series alone exceed it.
+    """
+    dense_paths = np.where(sparse_rows[:, None], 0.0, bottom_paths)
+    remainder = np.clip(anchor_paths - S_anchor @ dense_paths, 0, None)
+
+    weight = np.where(sparse_rows, recent, 0.0)
+    group_weight = S_anchor @ weight
+    group_count = S_anchor @ sparse_rows.astype(float)
+    share = np.where(group_weight[anchor_codes] > 0,
+                     weight / np.where(group_weight[anchor_codes] > 0, group_weight[anchor_codes], 1),
+                     sparse_rows / np.maximum(group_count[anchor_codes], 1))
+    return np.where(sparse_rows[:, None], share[:, None] * remainder[anchor_codes], bottom_paths)
+
+
+def split_sku_paths(sku_paths, sku_codes, recent):
+    """Bottom-row paths of SKU-level forecasts ({sku row: daily path}), split over cities by recent demand"""
+    n_sku = int(sku_codes.max()) + 1 if len(sku_codes) else 0
+    rows = np.isin(sku_codes, list(sku_paths))
+    totals = np.bincount(sku_codes, weights=recent, minlength=n_sku)
+    counts = np.bincount(sku_codes, minlength=n_sku)
+    share = np.where(totals[sku_codes] > 0, recent / np.where(totals[sku_codes] > 0, totals[sku_codes], 1),
+                     1 / counts[sku_codes])
+    paths = {row: share[row] * sku_paths[sku_codes[row]] for row in np.flatnonzero(rows)}
+    return rows, paths
+
+
+def hierarchical_forecast(matrix, config=None, sku_paths=None):
+    """Fast-tier forecasts at every level of a (product, category, city) DemandMatrix, reconciled.
+
+    Each level is aggregated from the bottom rows with a sparse summing
+    matrix and forecast on its own ("base"). `sku_paths` ({(product_name,
+    category): daily path}, e.g. Prophet forecasts) replace the bottom
+    forecasts of those SKUs, split over their cities. Bottom forecasts are
+    then reconciled against the anchor level (see `reconcile`) and every
+    level is re-aggregated from them, so totals agree at every level.
+
+    Returns {level: DataFrame} with the level keys, the base method, the
+    base and reconciled `horizon`-day totals and the reconciled daily rate.
+    """
+    config = {**HIERARCHY_CONFIG, **(config or {})}
+    horizon = config["horizon"]
+    fast_config = {**FAST_FORECAST_CONFIG, "horizon": horizon}
+    index, values = matrix.index, np.asarray(matrix.values)
+    if not len(index) or not values.shape[1]:
+        return None
+
+    summing = {level: summing_matrix(index, keys) for level, keys in LEVELS.items() if level != "bottom"}
+    base = {}
+    for level, (S, _, labels) in summing.items():
+        base[level] = fast_forecast(S @ values, labels, fast_config)
+    base["bottom"] = fast_forecast(values, index[LEVELS["bottom"]], fast_config)
+
+    bottom_result, bottom_paths = base["bottom"]
+    S_anchor, anchor_codes, _ = summing[config["anchor"]]
+    sparse_rows = bottom_result["method"].isin(config["sparse_methods"]).to_numpy()
+    recent = values[:, -config["share_days"]:].sum(axis=1)
+
+    # Given SKU forecasts are kept as they are: their rows count as dense
+    overridden = np.zeros(len(index), dtype=bool)
+    if sku_paths:
+        _, sku_codes, sku_labels = summing["sku"]
+        code_of = {key: code for code, key in enumerate(sku_labels.itertuples(index=False, name=None))}
+        coded = {code_of[key]: np.asarray(path, dtype=float)[:horizon] for key, path in sku_paths.items()
+                 if key in code_of and len(path) >= horizon}
+        overridden, paths = split_sku_paths(coded, sku_codes, recent)
+        bottom_paths = bottom_paths.copy()
+        for row, path in paths.items():
+            bottom_paths[row] = path
+        sparse_rows = sparse_rows & ~overridden
+
+    reconciled = reconcile(bottom_paths, base[config["anchor"]][1], S_anchor, anchor_codes, sparse_rows, recent)
+
+    levels = {}
+    for level in LEVELS:
+        result, _ = base[level]
+        paths = reconciled if level == "bottom" else summing[level][0] @ reconciled
+        result = result.rename(columns={f"forecast_{horizon}d": f"base_{horizon}d"}).drop(columns="forecast_daily")
+        result[f"forecast_{horizon}d"] = paths.sum(axis=1).round(1)
+        result["forecast_daily"] = paths.mean(axis=1).round(2)
+        if level == "bottom":
+            result["source"] = np.select([overridden, sparse_rows], ["given", f"{config['anchor']}_share"], "own")
+        levels[level] = result
+
+    shared = int(sparse_rows.sum())
+    print(f"✅ Hierarchical forecast: {len(index)} bottom series, {shared} sparse ones "
+          f"inherit a share of their {config['anchor']} forecast")
+    return levels
@@ -0,0 +1,211 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from columns import SALES_COLUMNS as BASE_SALES_COLUMNS
+from columns import clean_labels, clean_sales, rename_columns
+from sales_cube import SalesCube
+from weather_store import attach_weather
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "run_reports", "kpi_snapshot.json")
+MARGIN = 0.25          # gross margin on order value, as in the price sensitivity model
+
+# Column aliases beyond the shared sales ones (see columns.SALES_COLUMNS)
+SALES_COLUMNS = {
+    **BASE_SALES_COLUMNS,
+    "order_value": ["order_value", "revenue"],
+    "sale_price": ["sale_price", "price", "selling_price", "unit_price"],
+    "commission_rate": ["commission_rate"],
+}
+RETURNS_COLUMNS = {
+    "return_date": ["return_date", "date"],
+    "city": ["city", "return_city"],
+    "category": ["category"],
+    "weather": ["weather", "weather condition", "weather_condition"],
+    "price": ["price", "return_price"],
+}
+
+
+def _clean_sales(sales_df, weather_store=None):
+    """Sales in the SalesCube layout: order value from the price when missing, no commission when missing"""
+    s = clean_sales(attach_weather(rename_columns(sales_df, SALES_COLUMNS), weather_store))
+    if "order_value" in s.columns:
+        s["order_value"] = pd.to_numeric(s["order_value"], errors="coerce").fillna(0)
+    elif "sale_price" in s.columns:
+        s["order_value"] = pd.to_numeric(s["sale_price"], errors="coerce").fillna(0) * s["qty"]
+    else:
+        s["order_value"] = 0.0
+    s["commission_rate"] = (pd.to_numeric(s["commission_rate"], errors="coerce").fillna(0)
+                            if "commission_rate" in s.columns else 0.0)
+    return s
+
+
+def _clean_returns(returns_df, weather_store=None):
+    r = clean_labels(attach_weather(rename_columns(returns_df, RETURNS_COLUMNS), weather_store),
+                     ["city", "category", "weather"])
+    if "return_date" not in r.columns:
+        r["return_date"] = pd.NaT
+    return r
+
+
+def _profit(frame):
+    """Profit of cube roll-up rows: margin on order value minus commission (revenue = value net of commission)"""
+    return frame["revenue"] - (1 - MARGIN) * frame["order_value"]
+
+
+class KPISnapshot:
+    """Executive KPIs kept as a persisted SalesCube.
+
+    Each load only aggregates its own rows into cube cells and merges them
+    in (the measures are additive), so a delta load costs O(new rows) and
+    the dashboard reads roll-ups whose size depends on the number of
+    months/cities/categories, not on the history.
+    """
+
+    def __init__(self, cube=None, sources=None, updated_at=None, forecast_accuracy=None):
+        self.cube = cube
+        self.sources = list(sources or [])       # fingerprints of the files already counted
+        self.forecast_accuracy = list(forecast_accuracy or [])   # one demand forecast backtest per load
+        self.updated_at = updated_at
+
+    def apply(self, returns_df=None, sales_df=None, sources=(None, None), weather_store=None):
+        """Add one load to the snapshot; files whose fingerprint was already counted are skipped"""
+        returns_fp, sales_fp = sources
+        if returns_fp is not None and returns_fp in self.sources:
+            print("ℹ️ KPI snapshot: returns file already counted, skipped")
+            returns_df = None
+        if sales_fp is not None and sales_fp in self.sources:
+            print("ℹ️ KPI snapshot: sales file already counted, skipped")
+            sales_df = None
+
+        sales = (_clean_sales(sales_df, weather_store) if sales_df is not None
+                 else pd.DataFrame(columns=list(SALES_COLUMNS)))
+        returns = _clean_returns(returns_df, weather_store) if returns_df is not None else None
+        batch = SalesCube.build(sales, returns)
+        self.cube = batch if self.cube is None else self.cube.merge(batch)
+
+        self.sources += [fp for fp, df in ((returns_fp, returns_df), (sales_fp, sales_df))
+                         if fp is not None and df is not None]
+        self.updated_at = datetime.now().isoformat(timespec="seconds")
+        print(f"✅ KPI snapshot updated: {int(self.total('orders')):,} sales, {int(self.total('returns')):,} returns")
+        return self
+
+    def record_backtest(self, result):
+        """Keep the headline figures of a forecast backtest (see forecast_backtest.backtest).
+
+        A skipped, failed or NaN backtest is kept as an entry without figures,
+        so the latest load reads as "no result" rather than the one before it.
+        """
+        if not result or pd.isna(result.get("wape_pct")):
+            self.forecast_accuracy.append({"evaluated_at": datetime.now().isoformat(timespec="seconds"),
+                                           "wape_pct": None})
+            return self
+        self.forecast_accuracy.append({
+            "evaluated_at": datetime.now().isoformat(timespec="seconds"),
+            "wape_pct": result["wape_pct"],
+            "daily_wape_pct": result["daily_wape_pct"],
+            "mape_pct": result["mape_pct"],
+            "skus": result["skus"],
+            "folds": result["folds"],
+            "complete": result["complete"],
+        })
+        return self
+
+    def total(self, measure):
+        if self.cube is None:
+            return 0.0
+        if measure == "returns":
+            return float(self.cube.total_returns())
+        if measure == "profit":
+            return float(_profit(self.cube.rollup([])).sum())
+        return float(self.cube.total(measure))
+
+    def monthly(self, measure):
+        """year-month indexed series of one measure (known months only)"""
+        if self.cube is None:
+            return pd.Series(dtype=float)
+        if measure == "returns":
+            if self.cube.returns_cells is None:
+                return pd.Series(dtype=float)
+            return self.cube.returns_rollup("year_month").set_index("year_month")["returns"].sort_index()
+        monthly = self.cube.rollup("year_month").set_index("year_month")
+        return (_profit(monthly) if measure == "profit" else monthly[measure]).sort_index()
+
+    def avg_profit_per_item(self):
+        qty = self.total("qty")
+        return self.total("profit") / qty if qty else None
+
+    def monthly_profit_per_item(self):
+        if self.cube is None:
+            return pd.Series(dtype=float)
+        monthly = self.cube.rollup("year_month").set_index("year_month")
+        monthly = monthly[monthly["qty"] > 0]
+        return (_profit(monthly) / monthly["qty"]).sort_index()
+
+    def by_city(self):
+        """Orders and returns per city"""
+        orders = self.cube.rollup("city")[["city", "orders"]]
+        returns = self.cube.returns_rollup("city")
+        if "returns" not in returns.columns:
+            returns = returns.assign(returns=0)
+        return orders.merge(returns[["city", "returns"]], on="city", how="outer").fillna(0)
+
+    def by_weather(self):
+        """Orders per weather label"""
+        return self.cube.rollup("weather")[["weather", "orders"]]
+
+    def by_channel(self):
+        """Orders per (category, platform)"""
+        return self.cube.rollup(["category", "platform"])[["category", "platform", "orders"]]
+
+    def latest_forecast_wape(self):
+        return self.forecast_accuracy[-1]["wape_pct"] if self.forecast_accuracy else None
+
+    def forecast_wape_delta(self):
+        """Change of the backtested forecast WAPE since the previous load, in points"""
+        if len(self.forecast_accuracy) < 2 or self.forecast_accuracy[-2]["wape_pct"] is None:
+            return None
+        latest = self.latest_forecast_wape()
+        return None if latest is None else latest - self.forecast_accuracy[-2]["wape_pct"]
+
+    def is_empty(self):
+        return self.cube is None or self.cube.cells.empty
+
+    def to_dict(self):
+        cube = None
+        if self.cube is not None:
+            cube = {
+                "cells": self.cube.cells.to_dict("list"),
+                "returns_cells": None if self.cube.returns_cells is None else self.cube.returns_cells.to_dict("list"),
+            }
+        return {
+            "updated_at": self.updated_at,
+            "sources": self.sources,
+            "forecast_accuracy": self.forecast_accuracy,
+            "cube": cube,
+        }
+
+    def save(self, path=SNAPSHOT_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, default=lambda v: v.item() if isinstance(v, np.generic) else str(v))
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_PATH):
+        """Persisted snapshot, or None when nothing has been ingested yet (or it predates the cube layout)"""
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if not data.get("cube"):
+            return None
+        returns_cells = data["cube"].get("returns_cells")
+        cube = SalesCube(pd.DataFrame(data["cube"]["cells"]),
+                         None if returns_cells is None else pd.DataFrame(returns_cells))
+        return cls(cube, data.get("sources"), data.get("updated_at"), data.get("forecast_accuracy"))
@@ -1,20 +1,26 @@
 import pandas as pd
-import numpy as np
 from sklearn.preprocessing import LabelEncoder
 from sklearn.linear_model import LogisticRegression
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import GradientBoostingRegressor
 
+from feature_store import FeatureStore
+from weather_store import attach_weather
+from weather_uplift import WeatherUplift
+
 class ManualViabilityProcessor:
-    def __init__(self, sales_df=None):
+    def __init__(self, sales_df=None, feature_store=None, weather_store=None, weather_uplift=None):
         self.sales_df = sales_df
+        self.feature_store = feature_store   # rolling velocity features; built from the sales data if not given
         self.encoders = {}
         self.fallback_values = {}
         self.log_model = None
         self.knn_model = None
         self.price_model = None
         self.trained = False
+        self.weather_store = weather_store
+        self.weather_uplift = weather_uplift   # learned category x weather/season multipliers; built if not given
 
     def load_and_train_models(self, sales_df=None):
         """Load sales data and train the ML models for manual viability check"""
@@ -29,6 +35,10 @@ class ManualViabilityProcessor:
 
         # Train the ML models (logic from near5.py)
         self._train_models()
+        if self.feature_store is None:
+            self.feature_store = FeatureStore().apply(self.sales_df, weather_store=self.weather_store)
+        if self.weather_uplift is None:
+            self.weather_uplift = WeatherUplift.from_sales(self.sales_df, self.weather_store)
         self.trained = True
         return True
 
@@ -58,30 +68,9 @@ class ManualViabilityProcessor:
                     df.rename(columns={possible_name: standard_col}, inplace=True)
                     break
 
-        # near3.py logic: Handle weather data imputation
+        # Missing weather: as-of join on each city's observed weather history
         if "weather" in df.columns:
-            df["weather"] = df["weather"].replace("", np.nan)
-
-            if "brand" in df.columns and "qty" in df.columns:
-                # Fill missing weather based on brand's most selling weather pattern
-                brand_weather_qty = (
-                    df.dropna(subset=["weather"])
-                      .groupby(["brand", "weather"], as_index=False)["qty"]
-                      .sum()
-                )
-
-                top_weather_per_brand = (
-                    brand_weather_qty
-                      .sort_values(by=["brand", "qty"], ascending=[True, False])
-                      .drop_duplicates(subset=["brand"])
-                      .rename(columns={"weather": "top_weather"})
-                      [["brand", "top_weather"]]
-                )
-
-                df = df.merge(top_weather_per_brand, on="brand", how="left")
-                df["weather"] = df["weather"].fillna(df["top_weather"])
-                df["weather"] = df["weather"].fillna("Unknown")
-                df.drop(columns=["top_weather"], inplace=True, errors="ignore")
+            df = attach_weather(df, self.weather_store)
 
         # Ensure required columns exist
         if "qty" not in df.columns:
@@ -178,47 +167,32 @@ class ManualViabilityProcessor:
         if not price_ok:
             base_prob *= 0.5   # price too high → reduce probability
 
-        # Weather Impact
-        seasonal_boost = {
-            # 🌞 SUMMER
-            "Air Conditioner": ["Summer"], "Cooler": ["Summer"], "Fan": ["Summer"],
-            "Water Cooler": ["Summer"], "Refrigerator": ["Summer"], "Ice Cream": ["Summer"],
-            "Cold Drink": ["Summer"], "Juice": ["Summer"], "Soft Drink": ["Summer"],
-            "Sunscreen": ["Summer"], "Cotton Clothes": ["Summer"], "T-Shirt": ["Summer"],
-            "Shorts": ["Summer"], "Cap": ["Summer"],
-
-            # ❄️ WINTER
-            "Heater": ["Winter"], "Room Heater": ["Winter"], "Geyser": ["Winter"],
-            "Blanket": ["Winter"], "Quilt": ["Winter"], "Jacket": ["Winter"],
-            "Sweater": ["Winter"], "Hoodie": ["Winter"], "Thermal Wear": ["Winter"],
-            "Gloves": ["Winter"],
-
-            # 🌧️ RAINY
-            "Raincoat": ["Rainy"], "Umbrella": ["Rainy"], "Rain Shoes": ["Rainy"],
-            "Waterproof Jacket": ["Rainy"], "Mosquito Repellent": ["Rainy"],
-            "Insect Killer": ["Rainy"],
-
-            # 🍲 MULTI-SEASON
-            "Tea": ["Winter", "Rainy"], "Coffee": ["Winter", "Rainy"],
-            "Soup": ["Winter", "Rainy"], "Instant Noodles": ["Winter", "Rainy"],
-            "Snacks": ["Rainy", "Winter"],
-
-            # ⚖️ ALL-SEASON / NEUTRAL
-            "Electronics": ["Summer", "Winter", "Rainy"], "Smart Watch": ["Summer", "Winter", "Rainy"],
-            "Mobile Phone": ["Summer", "Winter", "Rainy"], "Headphones": ["Summer", "Winter", "Rainy"]
-        }
-
-        weather_impact = "Neutral ⚖️"
+        # Weather Impact: learned demand uplift of the category under this weather/season
         category = product_details.get("category", "")
         weather = product_details.get("weather", "")
-
-        if category in seasonal_boost:
-            if weather in seasonal_boost[category]:
-                base_prob *= 1.15
-                weather_impact = "Significant ✅"
-            else:
-                base_prob *= 0.7
-                weather_impact = "Not Significant ❌"
+        uplift = self.weather_uplift.lookup(category, weather)
+        base_prob *= uplift
+
+        if uplift >= 1.05:
+            weather_impact = f"Significant ✅ (x{uplift:.2f})"
+        elif uplift <= 0.95:
+            weather_impact = f"Not Significant ❌ (x{uplift:.2f})"
+        else:
+            weather_impact = "Neutral ⚖️"
+
+        # Sales Momentum: last 7 days vs last 28 days, for the product if it has sold, else its category
+        velocity = self.feature_store.get("product", (product_details.get("product_name", ""), category))
+        if velocity is None:
+            velocity = self.feature_store.get("category", category)
+
+        sales_velocity, velocity_trend = "No recent sales", "Unknown"
+        if velocity is not None:
+            sales_velocity = f"{velocity['qty_mean_7d']:.1f}/day (7d) vs {velocity['qty_mean_28d']:.1f}/day (28d)"
+            momentum = velocity["momentum"]
+            if pd.notna(momentum):
+                base_prob *= min(max(momentum, 0.85), 1.15)
+                velocity_trend = ("Rising 📈" if momentum >= 1.1 else
+                                  "Falling 📉" if momentum <= 0.9 else "Steady ➡️")
 
         # Final Probability Clamp
         sell_probability = round(
@@ -236,5 +210,7 @@ class ManualViabilityProcessor:
             "recommended_app": recommended_app,
             "weather_impact": weather_impact,
             "predicted_market_price": f"₹{round(predicted_market_price, 2)}",
-            "price_acceptable": "YES ✅" if price_ok else "NO ❌"
+            "price_acceptable": "YES ✅" if price_ok else "NO ❌",
+            "sales_velocity": sales_velocity,
+            "velocity_trend": velocity_trend
         }
\ No newline at end of file
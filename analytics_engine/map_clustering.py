@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+TILE_SIZE = 256          # Web-mercator tile size in pixels (Leaflet/folium)
+MIN_ZOOM, MAX_ZOOM = 2, 18
+MAX_LAT = 85.05112878
+
+
+def mercator(lat, lon):
+    """Project lat/lon onto the unit web-mercator square (x, y in [0, 1))"""
+    lat = np.clip(np.asarray(lat, dtype=float), -MAX_LAT, MAX_LAT)
+    lon = np.asarray(lon, dtype=float)
+    sin_lat = np.sin(np.radians(lat))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    return x, y
+
+
+class MarkerClusterer:
+    """Server-side grid clustering of map points, aggregated once per zoom level.
+
+    Points are bucketed into square screen-space cells of `cell_px` pixels at
+    each zoom, so a viewport only ever renders a few hundred markers no
+    matter how many points there are. Levels are computed lazily and cached.
+    """
+
+    def __init__(self, points, cell_px=64, aggregations=None, lat_col="lat", lon_col="lon"):
+        points = pd.DataFrame(points)
+        if not points.empty:
+            points = points.dropna(subset=[lat_col, lon_col]).reset_index(drop=True)
+        self.points = points
+        self.cell_px = cell_px
+        self.lat_col = lat_col
+        self.lon_col = lon_col
+        self.aggregations = aggregations or {}
+        self._levels = {}
+
+        if points.empty:
+            self._x = self._y = np.empty(0)
+        else:
+            self._x, self._y = mercator(points[lat_col].values, points[lon_col].values)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cells(self, zoom, x, y):
+        scale = TILE_SIZE * (2 ** zoom) / self.cell_px
+        return np.floor(x * scale).astype(np.int64), np.floor(y * scale).astype(np.int64)
+
+    def level(self, zoom):
+        """Clusters at one zoom level: centroid, point count and aggregated attributes"""
+        zoom = int(np.clip(round(zoom), MIN_ZOOM, MAX_ZOOM))
+        if zoom in self._levels:
+            return self._levels[zoom]
+
+        if self.points.empty:
+            level = pd.DataFrame(columns=["cell_x", "cell_y", "lat", "lon", "count", "point_id"])
+        else:
+            cell_x, cell_y = self._cells(zoom, self._x, self._y)
+            frame = pd.DataFrame({
+                "cell_x": cell_x,
+                "cell_y": cell_y,
+                "lat": self.points[self.lat_col].values,
+                "lon": self.points[self.lon_col].values,
+                "point_id": np.arange(len(self.points)),
+            })
+            for col in self.aggregations:
+                frame[col] = self.points[col].values
+
+            agg = {"lat": ("lat", "mean"), "lon": ("lon", "mean"),
+                   "count": ("point_id", "size"), "point_id": ("point_id", "first")}
+            agg.update({col: (col, how) for col, how in self.aggregations.items()})
+            level = frame.groupby(["cell_x", "cell_y"], sort=False).agg(**agg).reset_index()
+
+        self._levels[zoom] = level
+        return level
+
+    def clusters(self, zoom, bounds=None, pad=0.25):
+        """Clusters whose centroid lies in the (south, west, north, east) viewport, padded"""
+        level = self.level(zoom)
+        if bounds is None or level.empty:
+            return level
+
+        south, west, north, east = bounds
+        pad_lat, pad_lon = (north - south) * pad, (east - west) * pad
+        visible = (
+            level["lat"].between(south - pad_lat, north + pad_lat)
+            & level["lon"].between(west - pad_lon, east + pad_lon)
+        )
+        return level[visible]
+
+    def members(self, zoom, lat, lon):
+        """Points of the cluster containing (lat, lon) at this zoom — used for click details"""
+        if self.points.empty:
+            return self.points
+        zoom = int(np.clip(round(zoom), MIN_ZOOM, MAX_ZOOM))
+        cell_x, cell_y = self._cells(zoom, self._x, self._y)
+        click_x, click_y = self._cells(zoom, *mercator(lat, lon))
+        return self.points[(cell_x == click_x) & (cell_y == click_y)]
+
+    def fit_view(self, width_px=800, height_px=400):
+        """(center, zoom) that shows every point"""
+        if self.points.empty:
+            return (20.5937, 78.9629), 5
+
+        lat, lon = self.points[self.lat_col], self.points[self.lon_col]
+        center = (float(lat.mean()), float(lon.mean()))
+        span_x = max(self._x.max() - self._x.min(), 1e-9)
+        span_y = max(self._y.max() - self._y.min(), 1e-9)
+        zoom = np.floor(np.log2(min(width_px / (span_x * TILE_SIZE), height_px / (span_y * TILE_SIZE))))
+        return center, int(np.clip(zoom, MIN_ZOOM, MAX_ZOOM - 4))
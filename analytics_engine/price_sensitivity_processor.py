@@ -3,18 +3,21 @@ import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import GradientBoostingRegressor
 
+from columns import load_table
+from weather_store import attach_weather
+
 class PriceSensitivityProcessor:
-    def __init__(self):
+    def __init__(self, weather_store=None):
         self.sales_df = None
         self.price_col = None
         self.processed_data = {}
+        self.weather_store = weather_store
 
     def load_and_process_data(self, returns_file=None, sales_file=None):
         """Load and process data using combined logic from near.py, near1.py, near2.py, near3.py, near12.py"""
 
         # Load data
-        if sales_file:
-            self.sales_df = pd.read_excel(sales_file) if sales_file.endswith('.xlsx') else pd.read_csv(sales_file)
+        self.sales_df = load_table(sales_file, self.sales_df)
 
         if self.sales_df is None:
             return None
@@ -61,30 +64,9 @@ class PriceSensitivityProcessor:
                     df.rename(columns={possible_name: standard_col}, inplace=True)
                     break
 
-        # near3.py logic: Handle weather data imputation
+        # Missing weather: as-of join on each city's observed weather history
         if "weather" in df.columns:
-            df["weather"] = df["weather"].replace("", np.nan)
-
-            if "brand" in df.columns and "qty" in df.columns:
-                # Fill missing weather based on brand's most selling weather pattern
-                brand_weather_qty = (
-                    df.dropna(subset=["weather"])
-                      .groupby(["brand", "weather"], as_index=False)["qty"]
-                      .sum()
-                )
-
-                top_weather_per_brand = (
-                    brand_weather_qty
-                      .sort_values(by=["brand", "qty"], ascending=[True, False])
-                      .drop_duplicates(subset=["brand"])
-                      .rename(columns={"weather": "top_weather"})
-                      [["brand", "top_weather"]]
-                )
-
-                df = df.merge(top_weather_per_brand, on="brand", how="left")
-                df["weather"] = df["weather"].fillna(df["top_weather"])
-                df["weather"] = df["weather"].fillna("Unknown")
-                df.drop(columns=["top_weather"], inplace=True, errors="ignore")
+            df = attach_weather(df, self.weather_store)
 
         # Ensure required columns exist
         if "qty" not in df.columns:
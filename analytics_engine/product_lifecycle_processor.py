@@ -1,18 +1,22 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
+
+from columns import load_table
+from demand_matrix import DemandMatrix
+from weather_store import attach_weather
 
 class ProductLifecycleProcessor:
-    def __init__(self):
+    def __init__(self, demand_matrix=None, weather_store=None):
         self.sales_df = None
         self.processed_data = {}
+        self.demand_matrix = demand_matrix   # shared daily DemandMatrix; built from the sales data if not given
+        self.weather_store = weather_store
 
     def load_and_process_data(self, returns_file=None, sales_file=None):
         """Load and process data using combined logic from near.py, near1.py, near2.py, near3.py, near11.py"""
 
         # Load data
-        if sales_file:
-            self.sales_df = pd.read_excel(sales_file) if sales_file.endswith('.xlsx') else pd.read_csv(sales_file)
+        self.sales_df = load_table(sales_file, self.sales_df)
 
         if self.sales_df is None:
             return None
@@ -59,30 +63,9 @@ class ProductLifecycleProcessor:
                     df.rename(columns={possible_name: standard_col}, inplace=True)
                     break
 
-        # near3.py logic: Handle weather data imputation
+        # Missing weather: as-of join on each city's observed weather history
         if "weather" in df.columns:
-            df["weather"] = df["weather"].replace("", np.nan)
-
-            if "brand" in df.columns and "qty" in df.columns:
-                # Fill missing weather based on brand's most selling weather pattern
-                brand_weather_qty = (
-                    df.dropna(subset=["weather"])
-                      .groupby(["brand", "weather"], as_index=False)["qty"]
-                      .sum()
-                )
-
-                top_weather_per_brand = (
-                    brand_weather_qty
-                      .sort_values(by=["brand", "qty"], ascending=[True, False])
-                      .drop_duplicates(subset=["brand"])
-                      .rename(columns={"weather": "top_weather"})
-                      [["brand", "top_weather"]]
-                )
-
-                df = df.merge(top_weather_per_brand, on="brand", how="left")
-                df["weather"] = df["weather"].fillna(df["top_weather"])
-                df["weather"] = df["weather"].fillna("Unknown")
-                df.drop(columns=["top_weather"], inplace=True, errors="ignore")
+            df = attach_weather(df, self.weather_store)
 
         # Ensure required columns exist
         if "qty" not in df.columns:
@@ -119,62 +102,32 @@ class ProductLifecycleProcessor:
         # 📊 MONTHLY DEMAND AGGREGATION
         # =================================================
 
-        monthly_demand = (
-            df.groupby(["product_name", "month"])["qty"]
-            .sum()
-            .reset_index()
-        )
+        # Products x year-months from the shared demand matrix (years no longer merge)
+        if self.demand_matrix is None:
+            self.demand_matrix = DemandMatrix.from_sales(df)
+        monthly_demand = self.demand_matrix.monthly().by("product_name")
 
         # =================================================
         # 🧠 LIFECYCLE CLASSIFICATION WITH LINEAR REGRESSION
         # =================================================
 
-        results = []
-
-        for product, grp in monthly_demand.groupby("product_name"):
-            grp = grp.sort_values("month")
-
-            if len(grp) < 3:
-                # New products with insufficient data points
-                stage = "New"
-                trend = "Growing"
-                action = "Increase inventory by 25%"
-                emoji_trend = "📈"
-                emoji_stage = "🟡"
-            else:
-                # Linear regression analysis
-                X = np.arange(len(grp)).reshape(-1, 1)
-                y = grp["qty"].values
-
-                model = LinearRegression()
-                model.fit(X, y)
-                slope = model.coef_[0]
-
-                if slope > 1:
-                    trend = "Growing"
-                    stage = "New"
-                    action = "Increase inventory by 25%"
-                    emoji_trend = "📈"
-                    emoji_stage = "🟡"
-                elif slope > -1:
-                    trend = "Stable"
-                    stage = "Mature"
-                    action = "Maintain current stock levels"
-                    emoji_trend = "➡️"
-                    emoji_stage = "🟢"
-                else:
-                    trend = "Declining"
-                    stage = "Declining"
-                    action = "Reduce procurement by 40%"
-                    emoji_trend = "📉"
-                    emoji_stage = "🔴"
-
-            results.append({
-                "product_name": product,
-                "demand_trend": f"{emoji_trend} {trend}",
-                "lifecycle_stage": f"{emoji_stage} {stage}",
-                "action_recommendation": action
-            })
+        # Least-squares slope of every product at once, over the months since its first sale
+        active_months = monthly_demand.active().sum(axis=1)
+        slope = monthly_demand.slopes()
+
+        new = (active_months < 3) | (slope > 1)   # too little history counts as new
+        stable = ~new & (slope > -1)
+
+        results = {
+            "product_name": monthly_demand.index["product_name"],
+            "demand_trend": np.select([new, stable], ["📈 Growing", "➡️ Stable"], "📉 Declining"),
+            "lifecycle_stage": np.select([new, stable], ["🟡 New", "🟢 Mature"], "🔴 Declining"),
+            "action_recommendation": np.select(
+                [new, stable],
+                ["Increase inventory by 25%", "Maintain current stock levels"],
+                "Reduce procurement by 40%"
+            ),
+        }
 
         lifecycle_df = pd.DataFrame(results)
 
@@ -191,15 +144,7 @@ class ProductLifecycleProcessor:
         # 📈 PRODUCT DEMAND TRENDS CHART DATA
         # =================================================
 
-        trend_chart_data = (
-            monthly_demand.pivot(
-                index="month",
-                columns="product_name",
-                values="qty"
-            )
-            .fillna(0)
-            .round(1)
-        )
+        trend_chart_data = monthly_demand.to_frame("product_name").round(1)
 
         # =================================================
         # 🚨 CRITICAL INSIGHT
@@ -0,0 +1,193 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_MB = 1024
+
+
+def dataset_fingerprint(*sources):
+    """Content hash of the uploaded files (paths, uploaded file objects or bytes)"""
+    digest = hashlib.sha256()
+
+    for source in sources:
+        digest.update(b"\x00")
+        if source is None:
+            continue
+        if isinstance(source, bytes):
+            digest.update(source)
+        elif hasattr(source, "getvalue"):
+            digest.update(source.getvalue())
+        elif isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        else:
+            position = source.tell()
+            digest.update(source.read())
+            source.seek(position)
+
+    return digest.hexdigest()[:16]
+
+
+def frame_fingerprint(*frames):
+    """Content hash of in-memory frames (row order and dtypes included), e.g. a store's state"""
+    digest = hashlib.sha256()
+    for frame in frames:
+        digest.update(b"\x00")
+        if frame is None or frame.empty:
+            continue
+        digest.update(",".join(map(str, frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def estimate_size(value, _seen=None):
+    """Approximate memory held by a cached value, in bytes"""
+    _seen = _seen if _seen is not None else set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum()) if isinstance(value, pd.DataFrame) \
+            else int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v, _seen) for v in value)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return sys.getsizeof(value)
+    if hasattr(value, "__dict__") and not hasattr(value, "fit"):
+        # Processor objects: size of the frames/models they hold
+        return sys.getsizeof(value) + estimate_size(vars(value), _seen)
+
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class SharedResultCache:
+    """Process-wide LRU cache for staged data, processor outputs and trained models.
+
+    Entries are keyed by (dataset fingerprint, [store versions,] name) and
+    shared by every Streamlit session, so sessions only hold references. Cached values must
+    be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()   # key -> (value, size)
+        self._pending = {}              # key -> Future of an in-flight computation
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Size the cache from RESULT_CACHE_MAX_MB (default 1024 MB)"""
+        max_mb = float(os.getenv("RESULT_CACHE_MAX_MB", DEFAULT_MAX_MB))
+        return cls(max_bytes=int(max_mb * 1024 * 1024))
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries to stay under the limit"""
+        size = estimate_size(value)
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+            if size > self.max_bytes:
+                print(f"⚠️ Result cache: {key[-1] if isinstance(key, tuple) else key} "
+                      f"({size / 1e6:.1f} MB) exceeds the cache limit, not cached")
+                return value
+
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+                print(f"♻️ Result cache evicted {evicted_key}")
+
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value, computing it once even if several sessions ask at once"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = Future()
+                self._pending[key] = future
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        # Failed runs (None) are not cached so the next request retries them
+        if value is not None:
+            self.put(key, value)
+        with self._lock:
+            self._pending.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, fingerprint):
+        """Drop every entry computed from one dataset"""
+        with self._lock:
+            for key in [k for k in self._entries if isinstance(k, tuple) and k[0] == fingerprint]:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self.current_bytes / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
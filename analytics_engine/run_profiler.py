@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import pandas as pd
+
+# Processor methods that map onto a pipeline stage. Any method ending in
+# "_analysis" (e.g. _weather_analysis, _channel_performance_analysis) is
+# treated as the "analyze" stage.
+STAGE_METHODS = {
+    "_load_data": "load",
+    "_clean_returns_data": "clean",
+    "_clean_sales_data": "clean",
+    "_train_models": "train",
+}
+
+REPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "run_reports")
+
+# tracemalloc is process-wide: it is only switched on while at least one
+# stage is running so lazily computed pages don't pay its overhead between runs
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+# Its peak is process-wide too, so one stage at a time owns it: the first to
+# start while no other stage runs. Stages nested in it or started meanwhile
+# are left unmeasured, and the owner is too if another thread ran a stage
+# during its window (their allocations would be counted in its peak).
+_peak = {"owner": None, "shared": False}
+
+
+def _acquire_tracing():
+    """Start tracing if needed; True when this stage owns the peak"""
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+        thread = threading.get_ident()
+        if _peak["owner"] is None:
+            _peak.update(owner=thread, shared=False)
+            tracemalloc.reset_peak()
+            return True
+        if _peak["owner"] != thread:
+            _peak["shared"] = True
+        return False
+
+
+def _release_tracing(owner):
+    """Stop tracing when the last stage ends; the owner gets its peak (None if shared)"""
+    global _tracing_users
+    with _tracing_lock:
+        peak = None
+        if owner:
+            if not _peak["shared"]:
+                peak = tracemalloc.get_traced_memory()[1]
+            _peak.update(owner=None, shared=False)
+        elif _peak["owner"] not in (None, threading.get_ident()):
+            _peak["shared"] = True
+
+        _tracing_users -= 1
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return peak
+
+
+class RunProfiler:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._stages_lock = threading.Lock()    # stages are recorded from prefetch/background threads too
+        self.started_at = datetime.now()
+        self._start_wall = time.perf_counter()
+
+    def instrument(self, processor, name=None):
+        """Wrap a processor's load, clean, analyze and train methods with stage timers"""
+        name = name or type(processor).__name__
+
+        for attr in dir(type(processor)):
+            stage = STAGE_METHODS.get(attr)
+            if stage is None and attr.endswith("_analysis"):
+                stage = "analyze"
+            if stage is None:
+                continue
+
+            method = getattr(processor, attr)
+            if callable(method):
+                setattr(processor, attr, self._wrap(processor, method, name, stage, attr))
+
+        return processor
+
+    def _wrap(self, processor, method, name, stage, step):
+        @wraps(method)
+        def timed(*args, **kwargs):
+            with self.stage(name, stage, step=step, processor=processor) as record:
+                result = method(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    record["output_rows"] = len(result)
+            return result
+
+        return timed
+
+    @contextmanager
+    def stage(self, processor_name, stage, step=None, processor=None):
+        """Measure wall time, CPU time, peak memory and row counts of a block.
+
+        peak_mem_mb is None when the peak could not be attributed to this
+        block alone (nested in or overlapping another stage, see _peak).
+        """
+        record = {
+            "processor": processor_name,
+            "stage": stage,
+            "step": step or stage,
+            "input_rows": _frame_rows(processor),
+            "output_rows": None,
+        }
+
+        if self.trace_memory:
+            owner = _acquire_tracing()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        else:
+            mem_start = None
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        status = "ok"
+
+        try:
+            yield record
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall_start, 4)
+            record["cpu_s"] = round(time.process_time() - cpu_start, 4)
+
+            record["peak_mem_mb"] = None
+            if mem_start is not None:
+                peak = _release_tracing(owner)
+                if peak is not None:
+                    record["peak_mem_mb"] = round(max(peak - mem_start, 0) / (1024 * 1024), 3)
+
+            if record["output_rows"] is None:
+                record["output_rows"] = _frame_rows(processor)
+
+            record["status"] = status
+            with self._stages_lock:
+                self.stages.append(record)
+
+    def finish(self):
+        """Return the final report of the run"""
+        return self.report()
+
+    def report(self):
+        """Structured run report: one record per stage plus per-processor totals"""
+        frame = self.to_frame()
+        processors = {}
+
+        if not frame.empty:
+            totals = frame.groupby("processor", sort=False).agg(
+                wall_s=("wall_s", "sum"),
+                cpu_s=("cpu_s", "sum"),
+                peak_mem_mb=("peak_mem_mb", "max"),
+            )
+            processors = {
+                name: {key: _plain(value) for key, value in row.items()}
+                for name, row in totals.round(4).iterrows()
+            }
+
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_wall_s": round(time.perf_counter() - self._start_wall, 4),
+            "stages": [{key: _plain(value) for key, value in s.items()} for s in self._snapshot()],
+            "processors": processors,
+        }
+
+    def _snapshot(self):
+        with self._stages_lock:
+            return list(self.stages)
+
+    def to_frame(self):
+        columns = ["processor", "stage", "step", "input_rows", "output_rows",
+                   "wall_s", "cpu_s", "peak_mem_mb", "status"]
+        return pd.DataFrame(self._snapshot(), columns=columns)
+
+    def save(self, report_dir=REPORT_DIR):
+        """Write the run report as JSON and return its path"""
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"run_{self.started_at.strftime('%Y%m%d_%H%M%S')}.json")
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+        print(f"📝 Run report written to {path}")
+        return path
+
+
+def _frame_rows(processor):
+    """Total rows held in a processor's returns/sales frames"""
+    if processor is None:
+        return None
+
+    frames = [getattr(processor, attr, None) for attr in ("returns_df", "sales_df")]
+    frames = [df for df in frames if isinstance(df, pd.DataFrame)]
+    return sum(len(df) for df in frames) if frames else 0
+
+
+def _plain(value):
+    """Convert numpy scalars so the report is JSON serialisable"""
+    if hasattr(value, "item"):
+        return value.item()
+    return value
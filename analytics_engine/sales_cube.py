@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ["year_month", "platform", "city", "category", "weather"]
+RETURN_DIMENSIONS = ["year_month", "city", "category", "weather"]
+
+# Columns averaged by the dashboards; the cube keeps their sum and non-null
+# count so means can be rolled up exactly
+AVERAGED = ["commission_rate", "delivery_time_min", "conversion_rate", "return_rate", "rating"]
+
+
+def _year_month(dates):
+    """'YYYY-MM' labels (NaN for missing dates) — sortable and safe across years"""
+    dates = pd.to_datetime(dates, errors="coerce")
+    return dates.dt.strftime("%Y-%m").where(dates.notna())
+
+
+class SalesCube:
+    """Pre-aggregated sales cube keyed by (year_month, platform, city, category, weather).
+
+    Holds additive measures only (sums and counts), so any roll-up or filter
+    is a small groupby over the cells instead of a rescan of raw sales.
+    """
+
+    def __init__(self, cells, returns_cells=None):
+        self.cells = cells
+        self.returns_cells = returns_cells
+
+    @classmethod
+    def build(cls, sales_df, returns_df=None):
+        """Aggregate cleaned sales (and optionally returns) frames into cube cells"""
+        df = pd.DataFrame({
+            "year_month": _year_month(sales_df["sale_date"]) if "sale_date" in sales_df.columns else np.nan,
+        }, index=sales_df.index)
+        for dim in DIMENSIONS[1:]:
+            df[dim] = sales_df[dim] if dim in sales_df.columns else np.nan
+
+        order_value = pd.to_numeric(sales_df.get("order_value"), errors="coerce")
+        commission = pd.to_numeric(sales_df.get("commission_rate"), errors="coerce")
+        df["orders"] = 1
+        df["qty"] = pd.to_numeric(sales_df.get("qty", 1), errors="coerce")
+        df["order_value"] = order_value
+        df["revenue"] = order_value * (1 - commission)
+        for col in AVERAGED:
+            values = pd.to_numeric(sales_df[col], errors="coerce") if col in sales_df.columns \
+                else pd.Series(np.nan, index=sales_df.index)
+            df[f"{col}_sum"] = values
+            df[f"{col}_n"] = values.notna().astype(int)
+
+        cells = df.groupby(DIMENSIONS, dropna=False, sort=True).sum(min_count=0).reset_index()
+
+        returns_cells = None
+        if returns_df is not None:
+            r = pd.DataFrame({
+                "year_month": _year_month(returns_df["return_date"]) if "return_date" in returns_df.columns else np.nan,
+            }, index=returns_df.index)
+            for dim in RETURN_DIMENSIONS[1:]:
+                r[dim] = returns_df[dim] if dim in returns_df.columns else np.nan
+            r["returns"] = 1
+            r["return_value"] = pd.to_numeric(returns_df.get("price"), errors="coerce")
+            returns_cells = r.groupby(RETURN_DIMENSIONS, dropna=False, sort=True).sum(min_count=0).reset_index()
+
+        print(f"✅ Sales cube built: {len(cells)} cells from {len(sales_df)} sales")
+        return cls(cells, returns_cells)
+
+    def merge(self, other):
+        """Cube of both cubes' cells; measures are additive, so cells with the same key are summed"""
+        def combine(cells, more, dims):
+            if cells is None or cells.empty:
+                return more
+            if more is None or more.empty:
+                return cells
+            return (pd.concat([cells, more], ignore_index=True)
+                    .groupby(dims, dropna=False, sort=True).sum(min_count=0).reset_index())
+
+        return SalesCube(combine(self.cells, other.cells, DIMENSIONS),
+                         combine(self.returns_cells, other.returns_cells, RETURN_DIMENSIONS))
+
+    # =================================================
+    # 🔎 SLICING
+    # =================================================
+
+    def filter(self, month_range=None, platforms=None, cities=None, categories=None, weather=None):
+        """Sub-cube for a (start, end) 'YYYY-MM' range and dimension value lists"""
+        def mask(cells, dims):
+            keep = pd.Series(True, index=cells.index)
+            if month_range is not None:
+                start, end = month_range
+                keep &= cells["year_month"].between(start, end)
+            for dim, values in (("platform", platforms), ("city", cities),
+                                ("category", categories), ("weather", weather)):
+                if values and dim in dims:
+                    keep &= cells[dim].isin(values)
+            return cells[keep]
+
+        returns_cells = None if self.returns_cells is None else mask(self.returns_cells, RETURN_DIMENSIONS)
+        return SalesCube(mask(self.cells, DIMENSIONS), returns_cells)
+
+    def values(self, dim):
+        """Distinct, sorted values of a dimension"""
+        return sorted(self.cells[dim].dropna().unique().tolist())
+
+    def month_range(self):
+        months = self.values("year_month")
+        return (months[0], months[-1]) if months else (None, None)
+
+    # =================================================
+    # 📊 ROLL-UPS
+    # =================================================
+
+    def rollup(self, by):
+        """Sum the measures over every dimension not in `by`; adds mean columns"""
+        by = [by] if isinstance(by, str) else list(by)
+        cells = self.cells
+        if "month" in by:
+            cells = cells.assign(month=cells["year_month"].str[5:7].astype(float).astype("Int64"))
+
+        measures = [c for c in self.cells.columns if c not in DIMENSIONS]
+        if by:
+            out = cells.groupby(by, sort=True)[measures].sum().reset_index()
+        else:
+            out = cells[measures].sum().to_frame().T
+
+        for col in AVERAGED:
+            out[col] = out[f"{col}_sum"] / out[f"{col}_n"].replace(0, np.nan)
+        return out
+
+    def returns_rollup(self, by):
+        if self.returns_cells is None:
+            return pd.DataFrame(columns=[by] if isinstance(by, str) else list(by))
+        by = [by] if isinstance(by, str) else list(by)
+        return self.returns_cells.groupby(by, sort=True)[["returns", "return_value"]].sum().reset_index()
+
+    def total(self, measure):
+        return self.cells[measure].sum()
+
+    def total_returns(self):
+        return 0 if self.returns_cells is None else int(self.returns_cells["returns"].sum())
+
+    def channel_summary(self, total_returns=None):
+        """Channel Analysis outputs (header, monthly trend, market share, platform table)"""
+        by_platform = self.rollup("platform")
+        revenue_by_channel = by_platform.set_index("platform")["revenue"]
+        totals = self.rollup([])
+
+        top_channel = revenue_by_channel.idxmax() if not revenue_by_channel.empty else "N/A"
+        avg_commission = round(float(totals["commission_rate"].iloc[0]) * 100, 2) if len(totals) else np.nan
+        return_rate = round(float(totals["return_rate"].iloc[0]) * 100, 2) if len(totals) else np.nan
+
+        revenue_trend = (
+            self.rollup(["month", "platform"])[["month", "platform", "revenue"]]
+            .sort_values(["month", "platform"])
+            .reset_index(drop=True)
+        )
+
+        market_share = (
+            revenue_by_channel / revenue_by_channel.sum() * 100
+        ).round(2).reset_index(name="market_share")
+
+        platform_metrics = by_platform[["platform"]].copy()
+        platform_metrics["delivery_speed"] = by_platform["delivery_time_min"].round(0)
+        platform_metrics["conversion"] = (by_platform["conversion_rate"] * 100).round(2)
+        platform_metrics["rtn_rate"] = (by_platform["return_rate"] * 100).round(2)
+        platform_metrics["rating"] = by_platform["rating"].round(1)
+
+        return {
+            "header_metrics": {
+                "total_returns": self.total_returns() if total_returns is None else total_returns,
+                "total_revenue": round(revenue_by_channel.sum(), 2),
+                "top_channel": top_channel,
+                "avg_commission_percent": avg_commission,
+                "return_rate_percent": return_rate
+            },
+            "revenue_trend": revenue_trend,
+            "market_share": market_share,
+            "platform_metrics": platform_metrics
+        }
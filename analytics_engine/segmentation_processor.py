@@ -2,20 +2,23 @@ import pandas as pd
 import numpy as np
 from sklearn.cluster import KMeans
 
+from columns import load_table
+from spatial_buckets import SpatialBuckets
+from weather_store import attach_weather
+
 class SegmentationProcessor:
-    def __init__(self):
+    def __init__(self, weather_store=None):
         self.returns_df = None
         self.sales_df = None
         self.processed_data = {}
+        self.weather_store = weather_store
 
     def load_and_process_data(self, returns_file=None, sales_file=None):
         """Load and process data using combined logic from near.py, near1.py, near2.py, near3.py, near10.py"""
 
         # Load data
-        if returns_file:
-            self.returns_df = pd.read_excel(returns_file) if returns_file.endswith('.xlsx') else pd.read_csv(returns_file)
-        if sales_file:
-            self.sales_df = pd.read_excel(sales_file) if sales_file.endswith('.xlsx') else pd.read_csv(sales_file)
+        self.returns_df = load_table(returns_file, self.returns_df)
+        self.sales_df = load_table(sales_file, self.sales_df)
 
         if self.returns_df is None or self.sales_df is None:
             return None
@@ -117,6 +120,10 @@ class SegmentationProcessor:
 
                 df.drop(columns=["unit_price"], errors="ignore", inplace=True)
 
+        # Missing weather: as-of join on each city's observed weather history
+        if "weather" in df.columns:
+            df = attach_weather(df, self.weather_store)
+
         # Ensure weather and category are strings, handle return_date
         df["weather"] = df.get("weather", "").astype(str).str.title()
         df["category"] = df.get("category", "").astype(str).str.title()
@@ -161,30 +168,9 @@ class SegmentationProcessor:
                     df.rename(columns={possible_name: standard_col}, inplace=True)
                     break
 
-        # near3.py logic: Handle weather data imputation
+        # Missing weather: as-of join on each city's observed weather history
         if "weather" in df.columns:
-            df["weather"] = df["weather"].replace("", np.nan)
-
-            if "brand" in df.columns and "qty" in df.columns:
-                # Fill missing weather based on brand's most selling weather pattern
-                brand_weather_qty = (
-                    df.dropna(subset=["weather"])
-                      .groupby(["brand", "weather"], as_index=False)["qty"]
-                      .sum()
-                )
-
-                top_weather_per_brand = (
-                    brand_weather_qty
-                      .sort_values(by=["brand", "qty"], ascending=[True, False])
-                      .drop_duplicates(subset=["brand"])
-                      .rename(columns={"weather": "top_weather"})
-                      [["brand", "top_weather"]]
-                )
-
-                df = df.merge(top_weather_per_brand, on="brand", how="left")
-                df["weather"] = df["weather"].fillna(df["top_weather"])
-                df["weather"] = df["weather"].fillna("Unknown")
-                df.drop(columns=["top_weather"], inplace=True, errors="ignore")
+            df = attach_weather(df, self.weather_store)
 
         # Ensure required columns exist
         if "qty" not in df.columns:
@@ -385,5 +371,6 @@ class SegmentationProcessor:
                 "demand_display": "demand"
             }).to_dict('records'),
             "zone_colors": zone_colors,
-            "city_metrics": city_metrics.to_dict('records')
+            "city_metrics": city_metrics.to_dict('records'),
+            "regional_cells": SpatialBuckets.build(returns_df, sales_df)
         }
\ No newline at end of file
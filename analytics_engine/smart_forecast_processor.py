@@ -1,25 +1,72 @@
 import pandas as pd
 import numpy as np
 import os
-import requests
-from math import radians
-from sklearn.neighbors import NearestNeighbors
-from prophet import Prophet
+
+from columns import load_table
+from demand_matrix import SKU_KEYS, DemandMatrix, first_sale
+from feature_store import FeatureStore
+from fast_forecast import FAST_FORECAST_CONFIG, fast_forecast
+from hierarchical_forecast import hierarchical_forecast
+from prophet_pool import shared_pool
+from forecast_cache import ForecastCache, series_key
+from weather_store import WeatherStore, attach_weather
+from weather_uplift import WeatherUplift
+
+# Forecast tiers: the vectorised fast tier covers every SKU, Prophet refines the top sellers
+FORECAST_CONFIG = {
+    "horizon": 30,
+    "prophet_top_n": 10,        # SKUs (by units sold) that get a Prophet fit
+    "prophet_min_points": 10,   # selling days Prophet needs
+    # Next-season demand labels by percentile rank of the SKU's average monthly
+    # units among the SKUs that sold in that season: top 10%, next 15%, next 25%
+    "demand_percentiles": {"Very High": 0.9, "High (+200%)": 0.75, "Moderate": 0.5},
+    "fast": FAST_FORECAST_CONFIG,
+}
+
+# Recommended action per next-season demand label
+DEMAND_ACTIONS = {"Very High": "Increase Order", "High (+200%)": "Stock Up Now", "Moderate": "Monitor", "Low": "Avoid"}
+
+# Prophet settings; part of every series fingerprint, so changing them refits everything
+# (only yhat is used, so no uncertainty sampling)
+PROPHET_CONFIG = {"yearly_seasonality": True, "periods": FORECAST_CONFIG["horizon"], "uncertainty_samples": 0}
+
+
+def get_season(month):
+    if month in [12, 1, 2]:
+        return "Winter"
+    if month in [3, 4, 5]:
+        return "Summer"
+    if month in [6, 7, 8]:
+        return "Rainy"
+    return "Cloudy"
+
+
+def prophet_candidates(matrix):
+    """Rows that get a Prophet fit: the top-N SKUs by volume with enough selling days"""
+    selling_days = (matrix > 0).sum(axis=1)
+    eligible = np.flatnonzero(selling_days >= FORECAST_CONFIG["prophet_min_points"])
+    return eligible[np.argsort(-matrix[eligible].sum(axis=1), kind="stable")][:FORECAST_CONFIG["prophet_top_n"]]
+
 
 class SmartForecastProcessor:
-    def __init__(self):
+    def __init__(self, forecast_cache=None, demand_matrix=None, prophet_pool=None, feature_store=None,
+                 weather_store=None, weather_uplift=None):
         self.returns_df = None
         self.sales_df = None
         self.processed_data = {}
+        self.forecast_cache = forecast_cache or ForecastCache()
+        self.demand_matrix = demand_matrix   # shared daily DemandMatrix; built from the sales data if not given
+        self.prophet_pool = prophet_pool     # warm Prophet workers; the process-wide pool if not given
+        self.feature_store = feature_store   # rolling velocity features; built from the sales data if not given
+        self.weather_store = weather_store
+        self.weather_uplift = weather_uplift   # learned category x weather/season multipliers; built if not given
 
     def load_and_process_data(self, returns_file=None, sales_file=None):
         """Load and process data using combined logic from near.py, near1.py, near2.py, near3.py, near9.py"""
 
         # Load data
-        if returns_file:
-            self.returns_df = pd.read_excel(returns_file) if returns_file.endswith('.xlsx') else pd.read_csv(returns_file)
-        if sales_file:
-            self.sales_df = pd.read_excel(sales_file) if sales_file.endswith('.xlsx') else pd.read_csv(sales_file)
+        self.returns_df = load_table(returns_file, self.returns_df)
+        self.sales_df = load_table(sales_file, self.sales_df)
 
         if self.returns_df is None or self.sales_df is None:
             return None
@@ -121,6 +168,10 @@ class SmartForecastProcessor:
 
                 df.drop(columns=["unit_price"], errors="ignore", inplace=True)
 
+        # Missing weather: as-of join on each city's observed weather history
+        if "weather" in df.columns:
+            df = attach_weather(df, self.weather_store)
+
         # Ensure weather and category are strings, handle return_date
         df["weather"] = df.get("weather", "").astype(str).str.title()
         df["category"] = df.get("category", "").astype(str).str.title()
@@ -165,30 +216,9 @@ class SmartForecastProcessor:
                     df.rename(columns={possible_name: standard_col}, inplace=True)
                     break
 
-        # near3.py logic: Handle weather data imputation
+        # Missing weather: as-of join on each city's observed weather history
         if "weather" in df.columns:
-            df["weather"] = df["weather"].replace("", np.nan)
-
-            if "brand" in df.columns and "qty" in df.columns:
-                # Fill missing weather based on brand's most selling weather pattern
-                brand_weather_qty = (
-                    df.dropna(subset=["weather"])
-                      .groupby(["brand", "weather"], as_index=False)["qty"]
-                      .sum()
-                )
-
-                top_weather_per_brand = (
-                    brand_weather_qty
-                      .sort_values(by=["brand", "qty"], ascending=[True, False])
-                      .drop_duplicates(subset=["brand"])
-                      .rename(columns={"weather": "top_weather"})
-                      [["brand", "top_weather"]]
-                )
-
-                df = df.merge(top_weather_per_brand, on="brand", how="left")
-                df["weather"] = df["weather"].fillna(df["top_weather"])
-                df["weather"] = df["weather"].fillna("Unknown")
-                df.drop(columns=["top_weather"], inplace=True, errors="ignore")
+            df = attach_weather(df, self.weather_store)
 
         # Ensure required columns exist
         if "qty" not in df.columns:
@@ -235,15 +265,6 @@ class SmartForecastProcessor:
         # 🌦 WEATHER API AND SEASON MAPPING
         # =================================================
 
-        def get_season(month):
-            if month in [12, 1, 2]:
-                return "Winter"
-            if month in [3, 4, 5]:
-                return "Summer"
-            if month in [6, 7, 8]:
-                return "Rainy"
-            return "Cloudy"
-
         # Load API key from .env file
         def load_env_file():
             """Manually load .env file if python-dotenv is not available"""
@@ -261,30 +282,19 @@ class SmartForecastProcessor:
         OPENWEATHER_API_KEY = os.getenv("API_kay", "API")
         CITY_FOR_WEATHER = "Ahmedabad"
 
-        def map_weather(main, wind):
-            main = main.lower()
-            if "rain" in main:
-                return "Rainy"
-            if wind >= 8:
-                return "Windy"
-            if "cloud" in main:
-                return "Cloudy"
-            return "Sunny"
-
         def get_weather_safe(city):
-            try:
-                url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
-                r = requests.get(url, timeout=10)
-                if r.status_code != 200:
-                    raise Exception("API failed")
-                d = r.json()
-                return round(d["main"]["temp"]), map_weather(d["weather"][0]["main"], d["wind"]["speed"])
-            except:
-                # Fallback to most recent weather in data
-                if not sales_df.empty and "weather" in sales_df.columns:
-                    fallback_weather = sales_df["weather"].mode().iloc[0] if not sales_df["weather"].mode().empty else "Sunny"
-                    return "Derived", fallback_weather
-                return "Derived", "Sunny"
+            # Cached per city and day in the given weather store (persisted); one API call at most
+            store = self.weather_store if self.weather_store is not None else WeatherStore()
+            current = store.current(city, OPENWEATHER_API_KEY)
+            if current is not None:
+                if self.weather_store is not None:
+                    self.weather_store.save()
+                return current
+            # Fallback to most recent weather in data
+            if not sales_df.empty and "weather" in sales_df.columns:
+                fallback_weather = sales_df["weather"].mode().iloc[0] if not sales_df["weather"].mode().empty else "Sunny"
+                return "Derived", fallback_weather
+            return "Derived", "Sunny"
 
         # Get current weather
         temp, CURRENT_WEATHER = get_weather_safe(CITY_FOR_WEATHER)
@@ -297,25 +307,25 @@ class SmartForecastProcessor:
         # 🔴 LIVE OPPORTUNITY – CURRENT WEATHER IMPACT
         # =================================================
 
+        # Rolling velocities come precomputed from the feature store (updated at ingestion)
         recent_days = 14
         latest = sales_df["sale_date"].max() if not sales_df["sale_date"].isna().all() else pd.Timestamp.now()
-
-        recent = sales_df[sales_df["sale_date"] >= latest - pd.Timedelta(days=recent_days)]
-        baseline = sales_df[sales_df["sale_date"] < latest - pd.Timedelta(days=recent_days)]
-
-        # Current weather impact analysis
-        live_opportunity = (
-            recent[recent["weather"] == CURRENT_WEATHER]
-            .groupby(["product_name", "category"])
-            .agg(current_velocity=("qty", "sum"))
-            .reset_index()
-        )
-
-        baseline_avg = (
-            baseline.groupby(["product_name", "category"])["qty"]
-            .mean()
-            .reset_index(name="baseline_velocity")
-        )
+        if self.feature_store is None:
+            self.feature_store = FeatureStore().apply(sales_df)
+
+        # Current weather impact analysis: units in the last 14 days under today's weather
+        by_weather = self.feature_store.table("product_weather").reset_index()
+        live_opportunity = by_weather.loc[
+            (by_weather["weather"] == CURRENT_WEATHER) & (by_weather[f"orders_{recent_days}d"] > 0),
+            ["product_name", "category", f"qty_{recent_days}d"]
+        ].rename(columns={f"qty_{recent_days}d": "current_velocity"})
+
+        # Baseline: mean units per order before the window
+        products = self.feature_store.table("product")
+        baseline_orders = (products["orders_total"] - products[f"orders_{recent_days}d"]).replace(0, np.nan)
+        baseline_avg = ((products["qty_total"] - products[f"qty_{recent_days}d"]) / baseline_orders).rename(
+            "baseline_velocity"
+        ).reset_index()
 
         live_opportunity = live_opportunity.merge(baseline_avg, on=["product_name", "category"], how="left").dropna()
         live_opportunity["velocity_ratio"] = live_opportunity["current_velocity"] / live_opportunity["baseline_velocity"]
@@ -343,55 +353,110 @@ class SmartForecastProcessor:
         next_month_weather = NEXT_SEASON  # Use season as weather proxy
         next_month_temp = "32°C" if NEXT_SEASON == "Summer" else "18°C" if NEXT_SEASON == "Rainy" else "25°C"
 
-        # Seasonal sales forecasting
-        seasonal_sales = (
-            sales_df[sales_df["season"] == NEXT_SEASON]
-            .groupby(["product_name", "category"])
-            .agg(avg_monthly_sales=("qty", "mean"))
-            .reset_index()
-        )
-
-        def demand_label(v):
-            if v >= 15: return "Very High"
-            if v >= 8: return "High (+200%)"
-            if v >= 4: return "Moderate"
+        # Seasonal sales forecasting: average monthly units over the past months of that season
+        if self.demand_matrix is None:
+            self.demand_matrix = DemandMatrix.from_sales(sales_df)
+        skus = self.demand_matrix.by(*SKU_KEYS)
+        monthly = skus.monthly()
+        in_season = np.array([get_season(p.month) == NEXT_SEASON for p in monthly.periods], dtype=bool)
+        seasonal_sales = monthly.index.assign(avg_monthly_sales=monthly.mean_over(in_season))
+        seasonal_sales = seasonal_sales[(monthly.values * in_season).sum(axis=1) > 0].reset_index(drop=True)
+
+        # Labels are relative to the other SKUs: monthly units vary by orders of
+        # magnitude between catalogues, so fixed unit thresholds don't carry over
+        percentile = seasonal_sales["avg_monthly_sales"].rank(pct=True)
+
+        def demand_label(p):
+            for label, cutoff in FORECAST_CONFIG["demand_percentiles"].items():
+                if p > cutoff:
+                    return label
             return "Low"
 
-        def action(v):
-            if v >= 15: return "Increase Order"
-            if v >= 8: return "Stock Up Now"
-            if v >= 4: return "Monitor"
-            return "Avoid"
-
         seasonal_sales["forecasted_demand"] = seasonal_sales["avg_monthly_sales"].round(1)
-        seasonal_sales["forecasted_demand_label"] = seasonal_sales["avg_monthly_sales"].apply(demand_label)
-        seasonal_sales["recommended_action"] = seasonal_sales["avg_monthly_sales"].apply(action)
+        seasonal_sales["forecasted_demand_label"] = percentile.apply(demand_label)
+        seasonal_sales["recommended_action"] = seasonal_sales["forecasted_demand_label"].map(DEMAND_ACTIONS)
 
         # =================================================
-        # 📈 PROPHET FORECASTING (Optional Advanced Feature)
+        # 📈 TIERED 30-DAY FORECAST (fast tier for every SKU, Prophet for the top sellers)
         # =================================================
 
-        prophet_forecasts = []
-        try:
-            for (product_name, category), group in sales_df.groupby(["product_name", "category"]):
-                ts = group.groupby("sale_date")["qty"].sum().reset_index()
-                if len(ts) < 10:  # Need minimum data points
-                    continue
+        horizon = FORECAST_CONFIG["horizon"]
+        matrix, sku_index, days = skus.values, skus.index, skus.periods
+        sku_forecasts, _ = fast_forecast(matrix, sku_index, {**FORECAST_CONFIG["fast"], "horizon": horizon})
 
-                ts.columns = ["ds", "y"]
-                m = Prophet(yearly_seasonality=True)
-                m.fit(ts)
-                future = m.make_future_dataframe(periods=30)
-                forecast = m.predict(future)
-                next_month_demand = forecast.tail(30)["yhat"].mean()
+        top = prophet_candidates(matrix)
 
+        prophet_forecasts, prophet_paths = [], {}
+        pool = self.prophet_pool or shared_pool()
+        try:
+            start = first_sale(matrix)
+            series = {
+                series_key(sku_index.iloc[i]["product_name"], sku_index.iloc[i]["category"]):
+                    pd.DataFrame({"ds": days[start[i]:], "y": matrix[i, start[i]:]})
+                for i in top
+            }
+
+            # Only series whose history changed since the last ingestion are refit, in parallel on the warm pool
+            forecasts = self.forecast_cache.get_or_fit_many(
+                series, lambda stale: pool.fit_many(stale, PROPHET_CONFIG), config=PROPHET_CONFIG
+            )
+
+            for i, key in zip(top, series):
+                forecast = forecasts.get(key)
+                if forecast is None:
+                    continue
+                product_name, category = sku_index.iloc[i]["product_name"], sku_index.iloc[i]["category"]
                 prophet_forecasts.append({
                     "product_name": product_name,
                     "category": category,
-                    "prophet_forecast": round(next_month_demand, 1)
+                    "prophet_forecast": forecast["prophet_forecast"]
                 })
+                sku_forecasts.loc[i, ["method", "forecast_daily", f"forecast_{horizon}d"]] = [
+                    "prophet", forecast["prophet_forecast"], round(float(np.sum(forecast["yhat"])), 1)
+                ]
+                prophet_paths[(product_name, category)] = forecast["yhat"]
         except Exception as e:
             print(f"⚠️ Prophet forecasting failed: {e}")
+        finally:
+            self.forecast_cache.save()
+
+        stats = self.forecast_cache.stats()
+        print(f"♻️ Prophet fits: {stats['hits']} reused, {stats['misses']} refit")
+        if stats["misses"]:
+            latency = pool.stats()
+            print(f"⏱️ Prophet pool: {latency['workers']} workers, p50 {latency['p50_ms']} ms/fit, "
+                  f"p95 {latency['p95_ms']} ms/fit, warm-up {latency['warmup_s']}s")
+        print(f"✅ {horizon}-day forecasts for {len(sku_forecasts)} SKUs: "
+              + ", ".join(f"{m}={c}" for m, c in sku_forecasts["method"].value_counts().items()))
+
+        # =================================================
+        # 🧭 HIERARCHICAL FORECAST (total / category / city, reconciled)
+        # =================================================
+
+        # Prophet SKUs enter the reconciliation with their Prophet forecast, so both figures agree
+        hierarchy = hierarchical_forecast(self.demand_matrix, {"horizon": horizon}, sku_paths=prophet_paths) or {}
+        if "sku" in hierarchy:
+            reconciled = hierarchy["sku"][["product_name", "category", f"forecast_{horizon}d"]]
+            sku_forecasts = sku_forecasts.merge(
+                reconciled.rename(columns={f"forecast_{horizon}d": f"reconciled_{horizon}d"}),
+                on=["product_name", "category"], how="left"
+            )
+
+        # Recent velocity next to each forecast (units/day over the last 7 and 28 days)
+        velocity = self.feature_store.table("product")[["qty_mean_7d", "qty_mean_28d"]].round(2).reset_index()
+        sku_forecasts = sku_forecasts.merge(
+            velocity.rename(columns={"qty_mean_7d": "velocity_7d", "qty_mean_28d": "velocity_28d"}),
+            on=["product_name", "category"], how="left"
+        )
+
+        # Weather-adjusted forecast: learned uplift of each SKU's category under today's weather
+        if self.weather_uplift is None:
+            self.weather_uplift = WeatherUplift.from_sales(sales_df, self.weather_store)
+        uplift = self.weather_uplift.lookup_many(sku_forecasts["category"], CURRENT_WEATHER)
+        sku_forecasts["weather_uplift"] = uplift.round(3)
+        sku_forecasts[f"weather_adjusted_{horizon}d"] = (
+            sku_forecasts[f"forecast_{horizon}d"] * uplift
+        ).round(1)
 
         return {
             "current_weather": {
@@ -408,5 +473,9 @@ class SmartForecastProcessor:
             "future_forecast": seasonal_sales[[
                 "product_name", "category", "forecasted_demand_label", "recommended_action"
             ]].head(10).to_dict('records'),
-            "prophet_forecasts": prophet_forecasts
+            "prophet_forecasts": prophet_forecasts,
+            "hierarchical_forecast": {
+                level: hierarchy[level].to_dict('records') for level in ("total", "category", "city") if level in hierarchy
+            },
+            "sku_forecasts": sku_forecasts.sort_values("total_qty", ascending=False).to_dict('records')
         }
\ No newline at end of file
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+BASE32 = np.array(list("0123456789bcdefghjkmnpqrstuvwxyz"))
+
+# Drill-down levels -> geohash precision (approximate cell size at the equator)
+LEVELS = {
+    "country": 2,        # ~1250 x 625 km
+    "region": 3,         # ~156 km
+    "city": 4,           # ~39 x 20 km
+    "district": 5,       # ~4.9 km
+    "neighborhood": 6,   # ~1.2 x 0.6 km
+}
+MAX_PRECISION = max(LEVELS.values())
+
+
+def geohash_codes(lat, lon, precision=MAX_PRECISION):
+    """Vectorised geohash as integers (5 bits per character, longitude bit first)"""
+    lat = np.clip(np.asarray(lat, dtype=float), -90.0, 90.0 - 1e-12)
+    lon = np.clip(np.asarray(lon, dtype=float), -180.0, 180.0 - 1e-12)
+
+    n_bits = 5 * precision
+    lon_bits = (n_bits + 1) // 2
+    lat_bits = n_bits // 2
+    lon_int = np.floor((lon + 180.0) / 360.0 * (1 << lon_bits)).astype(np.uint64)
+    lat_int = np.floor((lat + 90.0) / 180.0 * (1 << lat_bits)).astype(np.uint64)
+
+    # Interleave: even bit positions (from the most significant) are longitude
+    codes = np.zeros(lat.shape, dtype=np.uint64)
+    lon_i, lat_i = lon_bits, lat_bits
+    for bit in range(n_bits):
+        codes <<= np.uint64(1)
+        if bit % 2 == 0:
+            lon_i -= 1
+            codes |= (lon_int >> np.uint64(lon_i)) & np.uint64(1)
+        else:
+            lat_i -= 1
+            codes |= (lat_int >> np.uint64(lat_i)) & np.uint64(1)
+    return codes
+
+
+def codes_to_strings(codes, precision):
+    """Integer geohashes -> base32 strings"""
+    codes = np.asarray(codes, dtype=np.uint64)
+    chars = [BASE32[((codes >> np.uint64(5 * (precision - 1 - i))) & np.uint64(31)).astype(int)]
+             for i in range(precision)]
+    out = chars[0].astype(object)
+    for column in chars[1:]:
+        out = out + column.astype(object)
+    return out
+
+
+def encode(lat, lon, precision=MAX_PRECISION):
+    """Geohash strings for arrays of coordinates"""
+    return codes_to_strings(geohash_codes(lat, lon, precision), precision)
+
+
+def cell_bounds(geohash):
+    """(south, west, north, east) of a geohash cell"""
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = int(np.where(BASE32 == char)[0][0])
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lon_lo, lat_hi, lon_hi
+
+
+class SpatialBuckets:
+    """Returns and sales bucketed into geohash cells at every drill-down level.
+
+    Points are aggregated once at the finest precision (one vectorised
+    groupby); coarser levels are roll-ups of those cells by geohash prefix,
+    so drilling from country to neighbourhood never touches raw rows or
+    recomputes distances.
+    """
+
+    MEASURES = ["returns", "resellable", "confidence_sum", "sales", "qty"]
+
+    def __init__(self, cells):
+        self.cells = cells
+        self._levels = {}
+
+    @classmethod
+    def build(cls, returns_df=None, sales_df=None, return_lat="return_lat", return_lon="return_lon",
+              sale_lat="lat", sale_lon="lon"):
+        """Bucket cleaned returns/sales; returns may carry `resellable` and `confidence` columns"""
+        frames = []
+
+        if returns_df is not None and not returns_df.empty:
+            r = returns_df.dropna(subset=[return_lat, return_lon])
+            frames.append(pd.DataFrame({
+                "geohash": encode(r[return_lat].values, r[return_lon].values),
+                "city": r["city"].values if "city" in r.columns else "Unknown",
+                "lat": r[return_lat].values,
+                "lon": r[return_lon].values,
+                "returns": 1,
+                "resellable": r["resellable"].astype(int).values if "resellable" in r.columns else 0,
+                "confidence_sum": r["confidence"].values if "confidence" in r.columns else 0,
+                "sales": 0,
+                "qty": 0,
+            }))
+
+        if sales_df is not None and not sales_df.empty:
+            s = sales_df.dropna(subset=[sale_lat, sale_lon])
+            frames.append(pd.DataFrame({
+                "geohash": encode(s[sale_lat].values, s[sale_lon].values),
+                "city": s["city"].values if "city" in s.columns else "Unknown",
+                "lat": s[sale_lat].values,
+                "lon": s[sale_lon].values,
+                "returns": 0,
+                "resellable": 0,
+                "confidence_sum": 0,
+                "sales": 1,
+                "qty": pd.to_numeric(s["qty"], errors="coerce").fillna(0).values if "qty" in s.columns else 1,
+            }))
+
+        if not frames:
+            return cls(pd.DataFrame(columns=["geohash", "city", "lat_sum", "lon_sum", "points"] + cls.MEASURES))
+
+        points = pd.concat(frames, ignore_index=True)
+        points["city"] = points["city"].astype(str)
+        points["points"] = 1
+        points["lat_sum"] = points["lat"]
+        points["lon_sum"] = points["lon"]
+
+        # Finest level: one row per (cell, city) so coarser levels can still be labelled
+        cells = (
+            points.groupby(["geohash", "city"], sort=False)
+            [["lat_sum", "lon_sum", "points"] + cls.MEASURES]
+            .sum()
+            .reset_index()
+        )
+        print(f"✅ Spatial buckets: {cells['geohash'].nunique()} cells from {len(points)} points")
+        return cls(cells)
+
+    def level(self, level):
+        """All cells of one drill-down level (name or geohash precision)"""
+        precision = LEVELS.get(level, level)
+        if precision in self._levels:
+            return self._levels[precision]
+
+        cells = self.cells.assign(cell=self.cells["geohash"].str[:precision])
+        agg = cells.groupby("cell", sort=False)[["lat_sum", "lon_sum", "points"] + self.MEASURES].sum()
+
+        # Label each cell with its dominant city name
+        by_city = cells.groupby(["cell", "city"], sort=False)["points"].sum().reset_index()
+        top_city = by_city.sort_values("points", ascending=False).drop_duplicates("cell").set_index("cell")["city"]
+
+        out = pd.DataFrame({
+            "cell": agg.index,
+            "label": top_city.reindex(agg.index).values,
+            "lat": agg["lat_sum"].values / agg["points"].values,
+            "lon": agg["lon_sum"].values / agg["points"].values,
+            "returns": agg["returns"].values,
+            "resellable": agg["resellable"].values,
+            "avg_confidence": np.where(agg["returns"] > 0,
+                                       agg["confidence_sum"] / agg["returns"].replace(0, 1), np.nan),
+            "sales": agg["sales"].values,
+            "qty": agg["qty"].values,
+        })
+        out["return_pct"] = np.where(out["sales"] > 0, out["returns"] / out["sales"] * 100, np.nan)
+        out = out.sort_values(["sales", "returns"], ascending=False).reset_index(drop=True)
+
+        self._levels[precision] = out
+        return out
+
+    def drill(self, level, parent=None):
+        """Cells of `level`, optionally only those inside the `parent` cell"""
+        cells = self.level(level)
+        if parent:
+            cells = cells[cells["cell"].str.startswith(parent)]
+        return cells
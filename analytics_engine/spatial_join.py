@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371
+DENSE_MAX_CELLS = 2_000_000   # left x right sizes up to this use a brute-force distance matrix
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorised haversine distance in km (broadcasts like numpy)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+
+def _empty_pairs():
+    return pd.DataFrame({"left": np.empty(0, dtype=np.int32),
+                         "right": np.empty(0, dtype=np.int32),
+                         "distance_km": np.empty(0)})
+
+
+def _dense_pairs(l_lat, l_lon, r_lat, r_lon, radius_km, k):
+    """Exact pairs from a full distance matrix (small groups)"""
+    distance = haversine_km(l_lat[:, None], l_lon[:, None], r_lat[None, :], r_lon[None, :])
+    if k is not None:
+        k = min(k, distance.shape[1])
+        right = np.argsort(distance, axis=1, kind="stable")[:, :k]
+        left = np.repeat(np.arange(len(l_lat)), k)
+        right = right.ravel()
+    else:
+        left, right = np.nonzero(distance <= radius_km)
+    return left, right, distance[left, right]
+
+
+def _tree_pairs(tree, l_lat, l_lon, n_right, radius_km, k):
+    """Pairs from a haversine BallTree over the right-hand points"""
+    points = np.radians(np.column_stack([l_lat, l_lon]))
+    if k is not None:
+        # Everything up to the k-th distance, so ties can be broken by row order afterwards
+        distance, _ = tree.query(points, k=min(k, n_right))
+        radius = distance[:, -1] * (1 + 1e-9) + 1e-15
+    else:
+        radius = radius_km / EARTH_RADIUS_KM
+
+    right, distance = tree.query_radius(points, r=radius, return_distance=True)
+    counts = np.fromiter((len(r) for r in right), dtype=np.int64, count=len(right))
+    left = np.repeat(np.arange(len(l_lat)), counts)
+    if not counts.sum():
+        return left, np.empty(0, dtype=np.int64), np.empty(0)
+    return left, np.concatenate(right), np.concatenate(distance) * EARTH_RADIUS_KM
+
+
+def spatial_join(left, right, on=None, radius_km=None, k=None,
+                 left_coords=("return_lat", "return_lon"), right_coords=("lat", "lon"),
+                 chunk_size=4096):
+    """Pairs of nearby rows between two frames, optionally within equal keys.
+
+    Exactly one of `radius_km` (every right row within the radius) or `k`
+    (the k nearest right rows) must be given. Rows only pair up when all `on`
+    columns are equal; rows with missing keys or coordinates never pair.
+
+    Returns a compact frame of `left` / `right` positions (iloc into the
+    inputs) and `distance_km`, ordered by left row then distance; equal
+    distances keep the right frame's row order. Each key
+    group gets its own index (a haversine BallTree, or a dense distance
+    matrix when the group is small), and left rows are queried in chunks
+    of `chunk_size` so memory stays bounded.
+    """
+    if (radius_km is None) == (k is None):
+        raise ValueError("spatial_join needs exactly one of radius_km or k")
+
+    on = [on] if isinstance(on, str) else list(on or [])
+    l_lat, l_lon = (pd.to_numeric(left[c], errors="coerce").to_numpy(dtype=float) for c in left_coords)
+    r_lat, r_lon = (pd.to_numeric(right[c], errors="coerce").to_numpy(dtype=float) for c in right_coords)
+
+    l_frame = pd.DataFrame({c: left[c].values for c in on}).assign(_pos=np.arange(len(left)))
+    r_frame = pd.DataFrame({c: right[c].values for c in on}).assign(_pos=np.arange(len(right)))
+    l_frame = l_frame[np.isfinite(l_lat) & np.isfinite(l_lon)]
+    r_frame = r_frame[np.isfinite(r_lat) & np.isfinite(r_lon)]
+
+    if on:
+        l_pos, r_pos = l_frame["_pos"].values, r_frame["_pos"].values
+        l_groups = l_frame.groupby(on, sort=False, dropna=True).indices
+        r_groups = r_frame.groupby(on, sort=False, dropna=True).indices
+        groups = [(l_pos[rows], r_pos[r_groups[key]]) for key, rows in l_groups.items() if key in r_groups]
+    else:
+        groups = [(l_frame["_pos"].values, r_frame["_pos"].values)]
+
+    chunks = []
+    for l_pos, r_pos in groups:
+        if not len(l_pos) or not len(r_pos):
+            continue
+
+        g_lat, g_lon = r_lat[r_pos], r_lon[r_pos]
+        tree = None
+        if len(r_pos) * min(len(l_pos), chunk_size) > DENSE_MAX_CELLS:
+            tree = BallTree(np.radians(np.column_stack([g_lat, g_lon])), metric="haversine")
+
+        for start in range(0, len(l_pos), chunk_size):
+            part = l_pos[start:start + chunk_size]
+            if tree is None:
+                li, ri, dist = _dense_pairs(l_lat[part], l_lon[part], g_lat, g_lon, radius_km, k)
+            else:
+                li, ri, dist = _tree_pairs(tree, l_lat[part], l_lon[part], len(r_pos), radius_km, k)
+            chunks.append(pd.DataFrame({
+                "left": part[li].astype(np.int32),
+                "right": r_pos[ri].astype(np.int32),
+                "distance_km": dist,
+            }))
+
+    if not chunks:
+        return _empty_pairs()
+
+    pairs = pd.concat(chunks, ignore_index=True)
+    pairs = pairs.sort_values(["left", "distance_km", "right"], kind="stable")
+    if k is not None:
+        pairs = pairs.groupby("left", sort=False).head(k)
+    return pairs.reset_index(drop=True)
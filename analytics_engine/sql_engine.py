@@ -0,0 +1,106 @@
+import os
+import re
+import threading
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional dependency: pip install duckdb
+    duckdb = None
+
+QUERY_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "all_SQL_queries")
+
+# Databricks table names used in all_SQL_queries -> local table names
+TABLE_ALIASES = {
+    "amazon_flipkart_returns_mixed_220_1": "returns",
+    "instant_delivery_sales_mixed_260": "sales",
+}
+
+DATE_COLUMNS = {"returns": ["return_date"], "sales": ["sale_date"]}
+
+# Databricks/Spark SQL functions missing from DuckDB, defined as macros
+MACROS = [
+    """CREATE OR REPLACE MACRO initcap(s) AS
+       array_to_string(list_transform(string_split(lower(s), ' '),
+                                      w -> upper(w[1]) || w[2:]), ' ')""",
+    "CREATE OR REPLACE MACRO try_divide(a, b) AS CASE WHEN b = 0 THEN NULL ELSE a / b END",
+    "CREATE OR REPLACE MACRO percentile_approx(x, p) AS quantile_disc(x, p)",
+]
+
+# Spark datetime pattern tokens -> strftime
+_DATE_TOKENS = {
+    "yyyy": "%Y", "yy": "%y", "MMMM": "%B", "MMM": "%b", "MM": "%m",
+    "dd": "%d", "EEEE": "%A", "EEE": "%a", "HH": "%H", "mm": "%M", "ss": "%S",
+}
+_DATE_TOKEN_RE = re.compile("|".join(sorted(_DATE_TOKENS, key=len, reverse=True)))
+
+_TABLE_RE = re.compile(r"\bworkspace\.sell_near_me\.(\w+)", re.IGNORECASE)
+_EXPLODE_RE = re.compile(r"\bexplode\s*\(\s*array\s*\(([^()]*)\)\s*\)", re.IGNORECASE)
+_DATE_FORMAT_RE = re.compile(r"\bdate_format\s*\(\s*([^,()]+?)\s*,\s*'([^']*)'\s*\)", re.IGNORECASE)
+_BACKTICK_RE = re.compile(r"`([^`]*)`")
+
+
+def translate(sql):
+    """Rewrite a Databricks SQL query into the DuckDB dialect"""
+    sql = _TABLE_RE.sub(lambda m: TABLE_ALIASES.get(m.group(1).lower(), m.group(1)), sql)
+    sql = _EXPLODE_RE.sub(r"unnest([\1])", sql)
+    sql = _DATE_FORMAT_RE.sub(
+        lambda m: f"strftime({m.group(1)}, '{_DATE_TOKEN_RE.sub(lambda t: _DATE_TOKENS[t.group(0)], m.group(2))}')",
+        sql,
+    )
+    sql = _BACKTICK_RE.sub(r'"\1"', sql)
+    return sql.strip().rstrip(";")
+
+
+def available_queries(query_dir=QUERY_DIR):
+    """Names (file stems) of the .sql files in all_SQL_queries"""
+    if not os.path.isdir(query_dir):
+        return []
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(query_dir) if f.endswith(".sql"))
+
+
+class SQLEngine:
+    """Embedded DuckDB engine that runs the all_SQL_queries set on in-memory frames"""
+
+    def __init__(self, returns_df=None, sales_df=None, query_dir=QUERY_DIR):
+        if duckdb is None:
+            raise ImportError("duckdb is required for the SQL engine — pip install duckdb")
+
+        self.query_dir = query_dir
+        self._con = duckdb.connect(database=":memory:")
+        self._lock = threading.Lock()
+
+        for macro in MACROS:
+            self._con.execute(macro)
+
+        if returns_df is not None:
+            self.register("returns", returns_df)
+        if sales_df is not None:
+            self.register("sales", sales_df)
+
+    def register(self, name, df):
+        """Expose a DataFrame as a table; date columns are parsed for MONTH()/DATE_FORMAT()"""
+        df = df.copy()
+        df.columns = df.columns.str.strip()
+        for col in DATE_COLUMNS.get(name, []):
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+
+        with self._lock:
+            self._con.register(name, df)
+
+    def query(self, sql):
+        """Run a Databricks-dialect query and return the result as a DataFrame"""
+        with self._lock:
+            return self._con.execute(translate(sql)).df()
+
+    def run_file(self, name):
+        """Run one of the all_SQL_queries files by name (with or without .sql)"""
+        filename = name if name.endswith(".sql") else f"{name}.sql"
+        with open(os.path.join(self.query_dir, filename), encoding="utf-8") as f:
+            return self.query(f.read())
+
+    def close(self):
+        with self._lock:
+            self._con.close()
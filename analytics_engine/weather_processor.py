@@ -1,24 +1,27 @@
 import pandas as pd
-import numpy as np
-from math import radians, cos, sin, asin, sqrt
 from sklearn.preprocessing import LabelEncoder
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 
+from columns import load_table
+from spatial_join import spatial_join
+from weather_store import attach_weather
+from weather_uplift import WeatherUplift
+
 class WeatherProcessor:
-    def __init__(self):
+    def __init__(self, weather_store=None, weather_uplift=None):
         self.returns_df = None
         self.sales_df = None
         self.processed_data = {}
+        self.weather_store = weather_store
+        self.weather_uplift = weather_uplift   # learned category x weather/season multipliers; built if not given
 
     def load_and_process_data(self, returns_file=None, sales_file=None):
         """Load and process data using combined logic from near.py, near1.py, near2.py, near3.py, near6.py"""
 
         # Load data
-        if returns_file:
-            self.returns_df = pd.read_excel(returns_file) if returns_file.endswith('.xlsx') else pd.read_csv(returns_file)
-        if sales_file:
-            self.sales_df = pd.read_excel(sales_file) if sales_file.endswith('.xlsx') else pd.read_csv(sales_file)
+        self.returns_df = load_table(returns_file, self.returns_df)
+        self.sales_df = load_table(sales_file, self.sales_df)
 
         if self.returns_df is None or self.sales_df is None:
             return None
@@ -119,6 +122,10 @@ class WeatherProcessor:
 
                 df.drop(columns=["unit_price"], errors="ignore", inplace=True)
 
+        # Missing weather: as-of join on each city's observed weather history
+        if "weather" in df.columns:
+            df = attach_weather(df, self.weather_store)
+
         # Ensure weather and category are strings
         df["weather"] = df.get("weather", "").astype(str).str.title()
         df["category"] = df.get("category", "").astype(str)
@@ -153,30 +160,9 @@ class WeatherProcessor:
                     df.rename(columns={possible_name: standard_col}, inplace=True)
                     break
 
-        # near3.py logic: Handle weather data imputation
+        # Missing weather: as-of join on each city's observed weather history
         if "weather" in df.columns:
-            df["weather"] = df["weather"].replace("", np.nan)
-
-            if "brand" in df.columns and "qty" in df.columns:
-                # Fill missing weather based on brand's most selling weather pattern
-                brand_weather_qty = (
-                    df.dropna(subset=["weather"])
-                      .groupby(["brand", "weather"], as_index=False)["qty"]
-                      .sum()
-                )
-
-                top_weather_per_brand = (
-                    brand_weather_qty
-                      .sort_values(by=["brand", "qty"], ascending=[True, False])
-                      .drop_duplicates(subset=["brand"])
-                      .rename(columns={"weather": "top_weather"})
-                      [["brand", "top_weather"]]
-                )
-
-                df = df.merge(top_weather_per_brand, on="brand", how="left")
-                df["weather"] = df["weather"].fillna(df["top_weather"])
-                df["weather"] = df["weather"].fillna("Unknown")
-                df.drop(columns=["top_weather"], inplace=True, errors="ignore")
+            df = attach_weather(df, self.weather_store)
 
         # Ensure required columns exist
         if "qty" not in df.columns:
@@ -237,42 +223,30 @@ class WeatherProcessor:
         # Generate ML predictions
         ml_results = []
 
-        for _, r in returns_df.iterrows():
-            candidates = sales_df[
-                (sales_df["category"] == r["category"]) &
-                (sales_df["weather"] == r["weather"])
-            ]
+        # Nearest same-category, same-weather sale for every return (one spatial join)
+        pairs = spatial_join(returns_df, sales_df, on=["category", "weather"], k=1)
+        matched = returns_df.iloc[pairs["left"].values]
+        nearest = sales_df.iloc[pairs["right"].values]
 
-            if candidates.empty:
-                continue
-
-            candidates = candidates.copy()
-            candidates["distance_km"] = candidates.apply(
-                lambda s: haversine(r["return_lat"], r["return_lon"], s["lat"], s["lon"]),
-                axis=1
-            )
-
-            nearest = candidates.sort_values("distance_km").iloc[0]
-
-            X_input = pd.DataFrame([{
-                "category_code": cat_enc.transform([r["category"]])[0],
-                "weather_code": weather_enc.transform([r["weather"]])[0],
-                "sales_count": nearest["sales_count"]
-            }])
-
-            sell_prob = log_model.predict_proba(X_input)[0][1] * 100
-
-            ml_results.append({
-                "weather": r["weather"],
-                "product_name": r["product_name"],
-                "category": r["category"],
-                "city": r.get("city", "Unknown"),
-                "return_price": r.get("price", 0),
-                "sell_probability": round(sell_prob, 2),
-                "recommended_app": nearest.get("platform", "Unknown"),
-                "recommended_city": nearest["city"],
-                "ml_used": True
+        if not matched.empty:
+            X_input = pd.DataFrame({
+                "category_code": cat_enc.transform(matched["category"]),
+                "weather_code": weather_enc.transform(matched["weather"]),
+                "sales_count": nearest["sales_count"].values
             })
+            sell_prob = log_model.predict_proba(X_input)[:, 1] * 100
+
+            ml_results = pd.DataFrame({
+                "weather": matched["weather"].values,
+                "product_name": matched["product_name"].values,
+                "category": matched["category"].values,
+                "city": matched["city"].values if "city" in matched.columns else "Unknown",
+                "return_price": matched["price"].values if "price" in matched.columns else 0,
+                "sell_probability": sell_prob.round(2),
+                "recommended_app": nearest["platform"].values,
+                "recommended_city": nearest["city"].values,
+                "ml_used": True
+            }).to_dict("records")
 
         final_ml_df = pd.DataFrame(ml_results)
 
@@ -287,12 +261,8 @@ class WeatherProcessor:
         WEATHER_LIST = ["Sunny", "Rainy", "Cloudy", "Windy", "Winter"]
 
         page1_tables = {}
-        overall_avg = (
-            final_ml_df.groupby("category")["product_name"]
-            .count()
-            .rename("overall_avg")
-            .reset_index()
-        )
+        if self.weather_uplift is None:
+            self.weather_uplift = WeatherUplift.from_sales(self.sales_df, self.weather_store)
 
         for weather in WEATHER_LIST:
             w_df = final_ml_df[final_ml_df["weather"] == weather]
@@ -305,11 +275,9 @@ class WeatherProcessor:
                 .reset_index(name="sales_count")
             )
 
-            cat_perf = cat_perf.merge(overall_avg, on="category", how="left")
-
+            # Learned uplift of the category's sales under this weather (or season) vs its usual share
             cat_perf["trend_vs_avg"] = (
-                (cat_perf["sales_count"] - cat_perf["overall_avg"])
-                / cat_perf["overall_avg"]
+                self.weather_uplift.lookup_many(cat_perf["category"], weather) - 1
             ) * 100
 
             def stock_rule(v):
@@ -358,12 +326,3 @@ class WeatherProcessor:
             "page1_tables": page1_tables,
             "ml_results": final_ml_df
         }
-
-# Utility function
-def haversine(lat1, lon1, lat2, lon2):
-    """Calculate haversine distance between two points"""
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    return 6371 * 2 * asin(sqrt(a))
\ No newline at end of file
@@ -0,0 +1,198 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+
+from columns import load_columns, save_columns
+from result_cache import frame_fingerprint
+
+WEATHER_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "run_reports", "weather_store")
+
+WEATHER_STORE_CONFIG = {
+    # Optional stand-in history (city, date, weather[, temperature]) used instead of a paid history API
+    "history_file": os.getenv("WEATHER_HISTORY_FILE",
+                              os.path.join(os.path.dirname(os.path.dirname(__file__)), "data set", "weather_history.csv")),
+    "tolerance_days": 3,      # an observation fills rows up to this many days after it
+    "api_timeout_s": 10,
+}
+
+# Where an observation came from; a source never overwrites a more reliable one for the same city/day
+SOURCE_RANK = {"api": 0, "file": 1, "sales": 2}
+
+COLUMNS = ["city", "date", "weather", "temperature", "source"]
+DATE_COLUMNS = ["sale_date", "return_date", "date"]
+
+
+def map_weather(main, wind):
+    """OpenWeather condition + wind speed -> the labels used in the sales data"""
+    main = main.lower()
+    if "rain" in main:
+        return "Rainy"
+    if wind >= 8:
+        return "Windy"
+    if "cloud" in main:
+        return "Cloudy"
+    return "Sunny"
+
+
+def _date_column(df):
+    return next((col for col in DATE_COLUMNS if col in df.columns), None)
+
+
+class WeatherStore:
+    """Observed weather per city and day.
+
+    Filled from the live provider (one cached call per city and day), a local
+    stand-in history file and the weather recorded on sales/returns (the
+    day's most frequent label per city). `attach` joins it onto any frame by
+    city and the latest observation on or before each row's date.
+    """
+
+    def __init__(self, history=None, updated_at=None):
+        self.history = history if history is not None else pd.DataFrame(columns=COLUMNS)
+        self.updated_at = updated_at
+
+    def _add(self, observations):
+        """Merge observations, keeping the most reliable source per city/day"""
+        observations = observations.assign(
+            city=observations["city"].astype(str),
+            date=pd.to_datetime(observations["date"], errors="coerce").dt.normalize(),
+            weather=observations["weather"].astype(str).str.title(),
+        ).dropna(subset=["date"])
+        history = (pd.concat([self.history, observations[COLUMNS]], ignore_index=True)
+                   if not self.history.empty else observations[COLUMNS].copy())
+        history["rank"] = history["source"].map(SOURCE_RANK)
+        self.history = (history.sort_values(["city", "date", "rank"], kind="stable")
+                        .drop_duplicates(["city", "date"])
+                        .drop(columns="rank").reset_index(drop=True))
+        self.updated_at = datetime.now().isoformat(timespec="seconds")
+        return self
+
+    def observe(self, df, date_col=None):
+        """Record the weather a sales/returns frame reports per city and day"""
+        if df is None or not {"city", "weather"} <= set(df.columns):
+            return self
+        date_col = date_col or _date_column(df)
+        if date_col is None:
+            return self
+        rows = pd.DataFrame({
+            "city": df["city"],
+            "date": pd.to_datetime(df[date_col], errors="coerce").dt.normalize(),
+            "weather": df["weather"].replace("", np.nan),
+        }).dropna()
+        rows = rows[~rows["weather"].astype(str).str.lower().isin(["nan", "unknown"])]
+        if rows.empty:
+            return self
+        daily = (rows.groupby(["city", "date", "weather"]).size().reset_index(name="n")
+                 .sort_values(["city", "date", "n"], ascending=[True, True, False], kind="stable")
+                 .drop_duplicates(["city", "date"]))
+        return self._add(daily.assign(temperature=np.nan, source="sales"))
+
+    def load_history_file(self, path=None):
+        """Load the stand-in history CSV, if there is one"""
+        path = path or WEATHER_STORE_CONFIG["history_file"]
+        if not path or not os.path.exists(path):
+            return self
+        history = pd.read_csv(path)
+        history.columns = history.columns.str.strip().str.lower()
+        if "temperature" not in history.columns:
+            history["temperature"] = np.nan
+        print(f"✅ Weather history file: {len(history)} observations")
+        return self._add(history.assign(source="file"))
+
+    def current(self, city, api_key=None):
+        """Today's (temperature, condition) for a city: cached if already fetched today, else from OpenWeather.
+
+        Returns None when the provider cannot be reached.
+        """
+        today = pd.Timestamp.now().normalize()
+        cached = self.history[(self.history["city"] == city) & (self.history["date"] == today)
+                              & (self.history["source"] == "api")]
+        if not cached.empty:
+            row = cached.iloc[0]
+            return int(row["temperature"]), row["weather"]
+        try:
+            url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
+            r = requests.get(url, timeout=WEATHER_STORE_CONFIG["api_timeout_s"])
+            if r.status_code != 200:
+                raise Exception("API failed")
+            d = r.json()
+            temp, condition = round(d["main"]["temp"]), map_weather(d["weather"][0]["main"], d["wind"]["speed"])
+        except Exception:
+            return None
+        self._add(pd.DataFrame([{"city": city, "date": today, "weather": condition,
+                                 "temperature": temp, "source": "api"}]))
+        return temp, condition
+
+    def attach(self, df, date_col=None, tolerance_days=None):
+        """Fill missing `weather` of a frame from the city's latest observation on or before each row's date.
+
+        One sorted merge (merge_asof by city); rows with no observation within
+        the tolerance stay "Unknown". Existing values and row order are kept.
+        """
+        date_col = date_col or _date_column(df)
+        tolerance = pd.Timedelta(days=tolerance_days or WEATHER_STORE_CONFIG["tolerance_days"])
+        df = df.copy()
+        weather = (df["weather"] if "weather" in df.columns else pd.Series(np.nan, index=df.index)).replace("", np.nan)
+        weather = weather.mask(weather.astype(str).str.lower() == "nan")
+        missing = weather.isna().to_numpy()
+
+        if missing.any() and date_col is not None and "city" in df.columns and not self.history.empty:
+            rows = pd.DataFrame({
+                "row": np.flatnonzero(missing),
+                "city": df["city"].astype(str).to_numpy()[missing],
+                "date": pd.to_datetime(df[date_col], errors="coerce").to_numpy()[missing],
+            }).dropna(subset=["date"])
+            rows["date"] = rows["date"].astype("datetime64[ns]")
+            history = self.history[["city", "date", "weather"]].astype({"date": "datetime64[ns]"})
+            joined = pd.merge_asof(rows.sort_values("date"), history.sort_values("date"), on="date",
+                                   by="city", direction="backward", tolerance=tolerance)
+            filled = weather.to_numpy(dtype=object)
+            filled[joined["row"].to_numpy()] = joined["weather"].to_numpy()
+            weather = pd.Series(filled, index=df.index)
+
+        df["weather"] = weather.fillna("Unknown")
+        return df
+
+    def version(self):
+        """Content hash of the observations; results built on this store are cached under it"""
+        return frame_fingerprint(self.history)
+
+    def save(self, directory=WEATHER_STORE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        history = self.history.assign(date=pd.to_datetime(self.history["date"]).astype("datetime64[ns]"),
+                                      temperature=self.history["temperature"].astype(float))
+        save_columns(history, os.path.join(directory, "history.tmp.npz"))
+        os.replace(os.path.join(directory, "history.tmp.npz"), os.path.join(directory, "history.npz"))
+        tmp_path = os.path.join(directory, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"updated_at": self.updated_at, "observations": len(history)}, f)
+        os.replace(tmp_path, os.path.join(directory, "meta.json"))
+        return directory
+
+    @classmethod
+    def load(cls, directory=WEATHER_STORE_DIR):
+        """Persisted store, or None when nothing was saved"""
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        history = load_columns(os.path.join(directory, "history.npz"))
+        return cls(history[COLUMNS], updated_at=meta.get("updated_at"))
+
+
+def attach_weather(df, store=None):
+    """Processor cleaning step: weather filled from `store`.
+
+    Processors pass their `weather_store`, the observed weather per city/day
+    the pipeline sets. Without a store only the frame's own reports are
+    used; the persisted history is never read implicitly, so results depend
+    on the inputs alone.
+    """
+    if store is None:
+        store = WeatherStore().observe(df)
+    return store.attach(df)
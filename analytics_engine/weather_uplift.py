@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from columns import clean_sales, rename_columns
+from weather_store import attach_weather
+
+WEATHER_UPLIFT_CONFIG = {
+    "prior_units": 20,      # pseudo-units pulling small category/condition cells towards no uplift (1.0)
+}
+
+def _standardize(sales_df, weather_store=None):
+    return clean_sales(attach_weather(rename_columns(sales_df), weather_store))
+
+
+def _lift(units, prior):
+    """Category share of demand under each condition vs its overall share, shrunk towards 1"""
+    by_category = units.sum(axis=1, keepdims=True)
+    by_condition = units.sum(axis=0, keepdims=True)
+    expected = by_category * by_condition / max(units.sum(), 1)
+    return (units + prior) / (expected + prior)
+
+
+class WeatherUplift:
+    """Learned demand multiplier per (category, weather) and (category, season).
+
+    uplift[c, w] is how much more (>1) or less (<1) of its demand category c
+    sells under weather w than its overall share would predict, from one
+    pass over the sales. Sparse cells are shrunk towards 1 with
+    `prior_units` pseudo-units. Lookups map labels to codes and index the
+    dense arrays; unseen categories or conditions give 1.0.
+    """
+
+    def __init__(self, categories, weathers, seasons, weather_units, season_units, config=None):
+        config = {**WEATHER_UPLIFT_CONFIG, **(config or {})}
+        self.categories = pd.Index(categories)
+        self.weathers = pd.Index(weathers)
+        self.seasons = pd.Index(seasons)
+        self.weather_units = weather_units
+        self.season_units = season_units
+        self.weather_uplift = _lift(weather_units, config["prior_units"])
+        self.season_uplift = _lift(season_units, config["prior_units"])
+        self._category_code = {c: i for i, c in enumerate(self.categories)}
+        self._condition_code = {
+            **{s: (self.season_uplift, i) for i, s in enumerate(self.seasons)},
+            **{w: (self.weather_uplift, i) for i, w in enumerate(self.weathers)},   # weather wins on shared labels
+        }
+
+    @classmethod
+    def from_sales(cls, sales_df, weather_store=None, config=None):
+        """Uplift arrays of a (raw or cleaned) sales frame"""
+        from smart_forecast_processor import get_season
+
+        sales = _standardize(sales_df, weather_store)
+        sales = sales[sales["weather"] != "Unknown"]
+        category_codes, categories = pd.factorize(sales["category"], sort=True)
+        weather_codes, weathers = pd.factorize(sales["weather"], sort=True)
+
+        dated = sales["sale_date"].notna().to_numpy()
+        seasons_of_rows = sales["sale_date"].dt.month[dated].map(get_season)
+        season_codes, seasons = pd.factorize(seasons_of_rows, sort=True)
+
+        qty = sales["qty"].to_numpy(dtype=float)
+        weather_units = np.zeros((len(categories), len(weathers)))
+        np.add.at(weather_units, (category_codes, weather_codes), qty)
+        season_units = np.zeros((len(categories), len(seasons)))
+        np.add.at(season_units, (category_codes[dated], season_codes), qty[dated])
+
+        uplift = cls(categories, weathers, seasons, weather_units, season_units, config)
+        print(f"✅ Weather uplift: {len(categories)} categories x {len(weathers)} weathers / {len(seasons)} seasons")
+        return uplift
+
+    def _codes(self, categories, condition):
+        """Category codes plus the array of the condition (weather first, then season) and its code"""
+        category_codes = self.categories.get_indexer(pd.Index(categories).astype(str).str.strip().str.title())
+        condition = str(condition).strip().title()
+        for labels, table in ((self.weathers, self.weather_uplift), (self.seasons, self.season_uplift)):
+            if condition in labels:
+                return category_codes, table, labels.get_loc(condition)
+        return category_codes, None, -1
+
+    def lookup_many(self, categories, condition):
+        """Uplift of each category under one weather or season (1.0 where unknown).
+
+        Labels are title-cased like the ones learned, so callers may pass them as cleaned or raw.
+        """
+        category_codes, table, condition_code = self._codes(categories, condition)
+        if table is None:
+            return np.ones(len(category_codes))
+        return np.where(category_codes >= 0, table[category_codes, condition_code], 1.0)
+
+    def lookup(self, category, condition):
+        """Uplift of one category under a weather or season: two dict lookups and an array index"""
+        row = self._category_code.get(str(category).strip().title())
+        table, col = self._condition_code.get(str(condition).strip().title(), (None, None))
+        return 1.0 if row is None or table is None else float(table[row, col])
+
+    def to_frame(self):
+        """Long table (category, kind, condition, units, uplift) for display"""
+        frames = []
+        for kind, labels, units, uplift in (("weather", self.weathers, self.weather_units, self.weather_uplift),
+                                            ("season", self.seasons, self.season_units, self.season_uplift)):
+            frames.append(pd.DataFrame({
+                "category": np.repeat(self.categories, len(labels)),
+                "kind": kind,
+                "condition": np.tile(labels, len(self.categories)),
+                "units": units.ravel(),
+                "uplift": uplift.ravel().round(3),
+            }))
+        return pd.concat(frames, ignore_index=True)
@@ -1,18 +1,28 @@
+import importlib
 import streamlit as st
-import dashboard
-import manual
-import ingestion
-import geospatial
-import weather
-import weatherProduct
-import demand
-import ChannelAn
-import generateLabel
-import smartForecast
 
-import segmentation
-import productLifecycle
-import priceSensitivity
+# Navigation label -> page module. Pages (and the analytics libraries they pull
+# in) are imported on first navigation instead of at startup.
+PAGES = {
+    "Dashboard": "dashboard",
+    "Manual Check": "manual",
+    "Ingest Data": "ingestion",
+    "Geo & Demand": "geospatial",
+    "Weather Trends": "weather",
+    "Weather x Product": "weatherProduct",
+    "Demand Matching": "demand",
+    "Channel Analysis": "ChannelAn",
+    "Smart Forecast": "smartForecast",
+    "Customer & Location Segmentation": "segmentation",
+    "Product Lifecycle Analysis": "productLifecycle",
+    "Price Sensitivity & Discount Simulator": "priceSensitivity",
+}
+
+
+def load_page(label):
+    """Import a page module on first use (cached in sys.modules afterwards)"""
+    return importlib.import_module(PAGES[label])
+
 
 # Page Configuration
 st.set_page_config(layout="wide", page_title="Sell Best - Inventory Intelligence", initial_sidebar_state="expanded")
@@ -64,20 +74,7 @@ with st.sidebar:
     st.markdown("---")
 
     # All navigation options in a single flat list
-    all_options = [
-        "Dashboard",
-        "Manual Check",
-        "Ingest Data",
-        "Geo & Demand",
-        "Weather Trends",
-        "Weather x Product",
-        "Demand Matching",
-        "Channel Analysis",
-        "Smart Forecast",
-        "Customer & Location Segmentation",
-        "Product Lifecycle Analysis",
-        "Price Sensitivity & Discount Simulator"
-    ]
+    all_options = list(PAGES)
 
     selected_option = st.radio("Navigation", all_options, index=0, label_visibility="collapsed")
 
@@ -86,31 +83,7 @@ with st.sidebar:
     st.caption("Admin User")
 
 # Routing Logic
-if selected_option == "Dashboard":
-    dashboard.show()
-elif selected_option == "Manual Check":
-    manual.show()
-elif selected_option == "Ingest Data":
-    ingestion.show()
-elif selected_option == "Geo & Demand":
-    geospatial.show()
-elif selected_option == "Weather Trends":
-    weather.show()
-elif selected_option == "Weather x Product":
-    weatherProduct.show()
-elif selected_option == "Demand Matching":
-    demand.show()
-elif selected_option == "Channel Analysis":
-    ChannelAn.show()
-elif selected_option == "Smart Forecast":
-    smartForecast.show()
-elif selected_option == "Customer & Location Segmentation":
-    segmentation.show()
-elif selected_option == "Product Lifecycle Analysis":
-    productLifecycle.show()
-elif selected_option == "Price Sensitivity & Discount Simulator":
-    priceSensitivity.show()
+if selected_option in PAGES:
+    load_page(selected_option).show()
 else:
     st.info("Module under development")
-
-
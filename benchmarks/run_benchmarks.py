@@ -0,0 +1,160 @@
+"""
+Per-processor benchmark harness for the analytics engine.
+
+Generates a seeded synthetic dataset (see synthetic_data.py), writes it to
+disk and runs every `analytics_engine` processor against it under the
+RunProfiler, reporting throughput and peak memory per processor and per
+stage.
+
+Usage:
+    python benchmarks/run_benchmarks.py --rows 1000 10000 100000
+    python benchmarks/run_benchmarks.py --rows 1000000 --processors channel segmentation
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "analytics_engine"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from run_profiler import RunProfiler, REPORT_DIR
+from synthetic_data import generate_dataset, write_dataset
+
+
+def _run_two_file(processor, returns_path, sales_path):
+    return processor.load_and_process_data(returns_path, sales_path)
+
+
+def _run_sales_only(processor, returns_path, sales_path):
+    return processor.load_and_process_data(None, sales_path)
+
+
+def _run_manual_viability(processor, returns_path, sales_path, profiler, name):
+    with profiler.stage(name, "load"):
+        sales_df = pd.read_csv(sales_path)
+    return processor.load_and_train_models(sales_df)
+
+
+# name -> (module, class, runner)
+BENCHMARK_CASES = {
+    "geospatial": ("geospatial_processor", "GeospatialProcessor", _run_two_file),
+    "weather": ("weather_processor", "WeatherProcessor", _run_two_file),
+    "demand": ("demand_processor", "DemandProcessor", _run_two_file),
+    "channel": ("channel_processor", "ChannelProcessor", _run_two_file),
+    "smart_forecast": ("smart_forecast_processor", "SmartForecastProcessor", _run_two_file),
+    "segmentation": ("segmentation_processor", "SegmentationProcessor", _run_two_file),
+    "lifecycle": ("product_lifecycle_processor", "ProductLifecycleProcessor", _run_sales_only),
+    "price_sensitivity": ("price_sensitivity_processor", "PriceSensitivityProcessor", _run_sales_only),
+    "manual_viability": ("manual_viability_processor", "ManualViabilityProcessor", _run_manual_viability),
+}
+
+
+def run_case(name, returns_path, sales_path, n_rows, trace_memory=True):
+    """Run one processor on the dataset and summarise its stage timings"""
+    module_name, class_name, runner = BENCHMARK_CASES[name]
+
+    try:
+        processor_cls = getattr(importlib.import_module(module_name), class_name)
+    except ImportError as e:
+        print(f"⚠️ Skipping {name}: {e}")
+        return {"case": name, "rows": n_rows, "status": f"skipped ({e.name or e})"}, pd.DataFrame()
+
+    profiler = RunProfiler(trace_memory=trace_memory)
+    processor = profiler.instrument(processor_cls(), name)
+
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        if runner is _run_manual_viability:
+            result = runner(processor, returns_path, sales_path, profiler, name)
+        else:
+            result = runner(processor, returns_path, sales_path)
+        if not result:
+            status = "no result"
+    except Exception as e:
+        status = f"failed ({type(e).__name__}: {e})"
+    wall = time.perf_counter() - start
+
+    profiler.finish()
+    stages = profiler.to_frame()
+    peak = stages["peak_mem_mb"].max() if not stages.empty else None
+
+    summary = {
+        "case": name,
+        "rows": n_rows,
+        "status": status,
+        "wall_s": round(wall, 4),
+        "cpu_s": round(stages["cpu_s"].sum(), 4) if not stages.empty else None,
+        "rows_per_s": round(n_rows / wall, 1) if wall > 0 else None,
+        "peak_mem_mb": None if peak is None or pd.isna(peak) else round(float(peak), 3),
+    }
+    stages.insert(0, "rows", n_rows)
+    return summary, stages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark analytics_engine processors on synthetic data")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000],
+                        help="Sales row counts to benchmark (1k – 10M)")
+    parser.add_argument("--returns-ratio", type=float, default=0.2,
+                        help="Returns rows as a fraction of sales rows")
+    parser.add_argument("--processors", nargs="+", choices=sorted(BENCHMARK_CASES),
+                        default=sorted(BENCHMARK_CASES), help="Processors to benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=365, help="Calendar span of the synthetic data")
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="Disable tracemalloc (lower overhead, no peak memory)")
+    parser.add_argument("--data-dir", default=None, help="Keep generated files here instead of a temp dir")
+    parser.add_argument("--output", default=None, help="JSON results path")
+    args = parser.parse_args(argv)
+
+    summaries, stage_frames = [], []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in args.rows:
+            n_returns = max(1, int(n_rows * args.returns_ratio))
+            print(f"\n📦 Generating {n_rows:,} sales / {n_returns:,} returns (seed={args.seed})")
+            returns_df, sales_df = generate_dataset(n_rows, n_returns, seed=args.seed, days=args.days)
+
+            out_dir = os.path.join(args.data_dir or tmp_dir, f"rows_{n_rows}")
+            returns_path, sales_path = write_dataset(returns_df, sales_df, out_dir)
+            del returns_df, sales_df
+
+            for name in args.processors:
+                print(f"⏱️ {name} @ {n_rows:,} rows")
+                summary, stages = run_case(name, returns_path, sales_path, n_rows + n_returns,
+                                           trace_memory=not args.no_trace_memory)
+                summaries.append(summary)
+                stage_frames.append(stages)
+
+    summary_df = pd.DataFrame(summaries)
+    stages_df = pd.concat(stage_frames, ignore_index=True) if stage_frames else pd.DataFrame()
+
+    print("\n📊 Benchmark summary")
+    print(summary_df.to_string(index=False))
+    if not stages_df.empty:
+        print("\n📊 Stage breakdown")
+        print(stages_df.to_string(index=False))
+
+    output = args.output or os.path.join(
+        REPORT_DIR, "benchmarks", f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "config": vars(args),
+            "summary": json.loads(summary_df.to_json(orient="records")),
+            "stages": json.loads(stages_df.to_json(orient="records")),
+        }, f, indent=2)
+    print(f"\n📝 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Python/SQL result parity harness.
+
+Runs each analytics_engine processor and the matching query from
+`all_SQL_queries/` (on the local DuckDB engine) against the same dataset,
+diffs the outputs within tolerances and records the time taken by both
+paths. Use it before routing an aggregation from one path to the other.
+
+Python timings cover the whole processor run (which produces several
+outputs at once); SQL timings cover the single query.
+
+Usage:
+    python benchmarks/sql_parity.py --rows 5000
+    python benchmarks/sql_parity.py --sample-data --show-diffs 5
+    python benchmarks/sql_parity.py --cases market_share weather_impact
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "analytics_engine"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analytics_pipeline import AnalyticsPipeline
+from run_profiler import REPORT_DIR
+from synthetic_data import generate_dataset
+
+MONTHS = {name: i for i, name in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+
+def _velocity_pct(text):
+    """'+415.4% vs avg' -> 415.4"""
+    match = re.search(r"[-+]?\d+(\.\d+)?", str(text))
+    return float(match.group(0)) if match else np.nan
+
+
+def _records(key):
+    return lambda result: pd.DataFrame(result[key])
+
+
+# case -> processor output vs SQL query. `rename` maps SQL columns onto the
+# processor's column names; `keys` join the two frames (no keys = compare by
+# row position); `values` are diffed, numerically within `atol`/`rtol` or as
+# normalised text.
+PARITY_CASES = {
+    "market_share": {
+        "processor": "channel", "query": "Market_Share",
+        "python": lambda r: r["market_share"],
+        "rename": {"market_share_percentage": "market_share"},
+        "keys": ["platform"], "values": ["market_share"], "atol": 0.01,
+    },
+    "revenue_trend": {
+        "processor": "channel", "query": "Monthly _Revenue_by_Platform_from_Sales_Data",
+        "python": lambda r: r["revenue_trend"],
+        "sql": lambda df: df.assign(month=df["month"].map(MONTHS)),
+        "keys": ["month", "platform"], "values": ["revenue"], "atol": 1.0,
+    },
+    "weather_impact": {
+        "processor": "weather", "query": "WEATHER_IMPACT_STATISTICS",
+        "python": lambda r: r["weather_impact_table"],
+        "rename": {"market_share_percent": "market_share"},
+        "keys": ["weather"], "values": ["total_transactions", "avg_order_value", "market_share"],
+        "atol": 0.5,
+    },
+    "lifecycle_stage": {
+        "processor": "lifecycle", "query": "Product_Lifecycle_Classification",
+        "python": _records("lifecycle_table"),
+        "keys": ["product_name"], "values": ["demand_trend", "lifecycle_stage", "action_recommendation"],
+    },
+    "price_demand": {
+        "processor": "sensitivity", "query": "Price_vs_Demand_Relationship",
+        "python": _records("price_demand_graph"),
+        "rename": {"discount_percent": "discount_%", "demand_impact_percent": "demand_impact_%",
+                   "revenue_impact_percent": "revenue_impact_%", "profit_impact_percent": "profit_impact_%"},
+        "keys": ["discount_%"], "values": ["demand_impact_%", "revenue_impact_%", "profit_impact_%"],
+        "atol": 0.01,
+    },
+    "profit_impact": {
+        "processor": "sensitivity", "query": "Profit_Impact_Analysis",
+        "python": lambda r: pd.DataFrame([r["profit_impact_analysis"]]),
+        "rename": {"profit_change_percent": "profit_change_%"},
+        "keys": [], "values": ["base_demand_units", "expected_demand_units", "profit_change_%",
+                               "break_even_discount"],
+        "atol": 0.5,
+    },
+    "sell_near_me": {
+        "processor": "geospatial", "query": "Geospatial_Demand_Analysis",
+        "python": _records("analysis_results"),
+        "rename": {"best_app": "best_platform"},
+        "keys": ["order_id"], "values": ["sell_near_me", "sell_confidence", "best_platform"], "atol": 0,
+    },
+    "zone_segmentation": {
+        "processor": "segmentation", "query": "High_Demand_zone",
+        "python": _records("city_metrics"),
+        "keys": ["city"], "values": ["total_sales", "total_returns", "return_pct", "zone_type", "risk_level"],
+        "atol": 0.01,
+    },
+    "live_opportunity": {
+        "processor": "forecast", "query": "Smart_Forecast",
+        "python": lambda r: pd.DataFrame(r["live_opportunity"]).assign(
+            current_velocity=lambda df: df["current_velocity_display"].map(_velocity_pct)),
+        "sql": lambda df: df.rename(columns={
+            "Product Name": "product_name", "Category": "category", "Stock Status": "stock_status",
+        }).assign(current_velocity=lambda d: d["Current Velocity"].map(_velocity_pct)),
+        "keys": ["product_name", "category"], "values": ["current_velocity", "stock_status"], "atol": 0.5,
+    },
+    "demand_matches": {
+        # The SQL returns every matching sale, the processor one row per recent
+        # return: compare which (product, category, city) groups are matched
+        "processor": "demand", "query": "Demand_Matching",
+        "python": _records("demand_matching_results"),
+        "keys": ["product_name", "category", "city"], "values": [],
+    },
+}
+
+
+def _norm_text(value):
+    """Case/emoji/punctuation-insensitive text for comparing labels"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    text = re.sub(r"[^0-9a-z%.\s/+-]", "", str(value).lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def compare_frames(py_df, sql_df, keys, values, atol=0.01, rtol=1e-4):
+    """Outer-join both frames on `keys` and count mismatches per value column"""
+    py_df, sql_df = py_df.copy(), sql_df.copy()
+
+    if not keys:
+        py_df["_row"], sql_df["_row"] = range(len(py_df)), range(len(sql_df))
+        keys = ["_row"]
+
+    for frame in (py_df, sql_df):
+        for key in keys:
+            if key != "_row" and frame[key].dtype == object:
+                frame[key] = frame[key].map(_norm_text)
+
+    missing = [c for c in keys + values if c not in py_df.columns or c not in sql_df.columns]
+    if missing:
+        return {"status": f"missing columns {missing}"}, pd.DataFrame()
+
+    py_df = py_df[keys + values].drop_duplicates(subset=keys)
+    sql_df = sql_df[keys + values].drop_duplicates(subset=keys)
+    merged = py_df.merge(sql_df, on=keys, how="outer", suffixes=("_py", "_sql"), indicator=True)
+    both = merged[merged["_merge"] == "both"]
+
+    columns, mismatch_any = {}, pd.Series(False, index=both.index)
+    for col in values:
+        left, right = both[f"{col}_py"], both[f"{col}_sql"]
+        left_num, right_num = pd.to_numeric(left, errors="coerce"), pd.to_numeric(right, errors="coerce")
+
+        if left_num.notna().equals(left.notna()) and right_num.notna().equals(right.notna()):
+            mismatch = ~np.isclose(left_num.astype(float), right_num.astype(float),
+                                   atol=atol, rtol=rtol, equal_nan=True)
+            mismatch = pd.Series(mismatch, index=both.index)
+            diff = (left_num - right_num).abs()
+            max_diff = None if diff.dropna().empty else round(float(diff.max()), 4)
+        else:
+            mismatch = left.map(_norm_text) != right.map(_norm_text)
+            max_diff = None
+
+        mismatch_any |= mismatch
+        columns[col] = {"mismatches": int(mismatch.sum()), "max_abs_diff": max_diff}
+
+    only_python = int((merged["_merge"] == "left_only").sum())
+    only_sql = int((merged["_merge"] == "right_only").sum())
+    mismatched_rows = int(mismatch_any.sum())
+
+    summary = {
+        "status": "PASS" if only_python == only_sql == mismatched_rows == 0 else "DIFF",
+        "python_rows": len(py_df),
+        "sql_rows": len(sql_df),
+        "matched_keys": len(both),
+        "only_python": only_python,
+        "only_sql": only_sql,
+        "mismatched_rows": mismatched_rows,
+        "columns": columns,
+    }
+    diffs = pd.concat([both[mismatch_any], merged[merged["_merge"] != "both"]])
+    return summary, diffs.drop(columns="_merge")
+
+
+def run_parity(pipeline, cases, show_diffs=0):
+    """Run every case on one staged pipeline; returns (results, diff frames)"""
+    processor_times, results, diff_frames = {}, [], {}
+
+    for name in cases:
+        case = PARITY_CASES[name]
+        processor, query = case["processor"], case["query"]
+        print(f"⚖️ {name}: {processor} vs {query}.sql")
+
+        try:
+            if processor not in processor_times:
+                start = time.perf_counter()
+                pipeline.run(processor)
+                processor_times[processor] = time.perf_counter() - start
+            py_result = pipeline.run(processor)
+            if py_result is None:
+                raise RuntimeError(f"{processor} processor returned no result")
+
+            start = time.perf_counter()
+            sql_df = pipeline.sql(query)
+            sql_s = time.perf_counter() - start
+        except Exception as e:
+            results.append({"case": name, "processor": processor, "query": query,
+                            "status": f"failed ({type(e).__name__}: {e})"})
+            continue
+
+        py_df = case["python"](py_result)
+        sql_df = sql_df.rename(columns=case.get("rename", {}))
+        if "sql" in case:
+            sql_df = case["sql"](sql_df)
+
+        summary, diffs = compare_frames(py_df, sql_df, case["keys"], case["values"],
+                                        atol=case.get("atol", 0.01), rtol=case.get("rtol", 1e-4))
+        python_s = processor_times[processor]
+        results.append({
+            "case": name, "processor": processor, "query": query,
+            "python_s": round(python_s, 4), "sql_s": round(sql_s, 4),
+            "faster": "sql" if sql_s < python_s else "python",
+            **summary,
+        })
+
+        if show_diffs and not diffs.empty:
+            diff_frames[name] = diffs.head(show_diffs)
+
+    return results, diff_frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff processor outputs against all_SQL_queries")
+    parser.add_argument("--rows", type=int, default=5000, help="Synthetic sales rows")
+    parser.add_argument("--returns-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sample-data", action="store_true",
+                        help="Use the workbooks in 'data set/' instead of synthetic data")
+    parser.add_argument("--cases", nargs="+", choices=sorted(PARITY_CASES), default=list(PARITY_CASES))
+    parser.add_argument("--show-diffs", type=int, default=0, help="Print up to N differing rows per case")
+    parser.add_argument("--output", default=None, help="JSON results path")
+    args = parser.parse_args(argv)
+
+    if args.sample_data:
+        data_dir = os.path.join(ROOT, "data set")
+        pipeline = AnalyticsPipeline.stage(os.path.join(data_dir, "Amazon_Flipkart_Returns_MIXED.xlsx"),
+                                           os.path.join(data_dir, "Instant_Delivery_Sales_MIXED.xlsx"))
+    else:
+        n_returns = max(1, int(args.rows * args.returns_ratio))
+        print(f"📦 Generating {args.rows:,} sales / {n_returns:,} returns (seed={args.seed})")
+        returns_df, sales_df = generate_dataset(args.rows, n_returns, seed=args.seed, days=args.days)
+        pipeline = AnalyticsPipeline(returns_df, sales_df)
+
+    try:
+        results, diff_frames = run_parity(pipeline, args.cases, show_diffs=args.show_diffs)
+    finally:
+        pipeline.shutdown()
+
+    columns = ["case", "status", "python_s", "sql_s", "faster", "python_rows", "sql_rows",
+               "matched_keys", "only_python", "only_sql", "mismatched_rows"]
+    summary_df = pd.DataFrame(results).reindex(columns=columns)
+
+    print("\n📊 Python/SQL parity")
+    print(summary_df.to_string(index=False))
+    for name, diffs in diff_frames.items():
+        print(f"\n🔍 {name}: first differing rows")
+        print(diffs.to_string(index=False))
+
+    output = args.output or os.path.join(
+        REPORT_DIR, "benchmarks", f"parity_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"config": vars(args), "results": results}, f, indent=2, default=str)
+    print(f"\n📝 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Startup-time benchmark for the Streamlit app.
+
+Measures cold import time in fresh interpreters for:
+  * lazy   - what `app.py` imports before rendering the Dashboard
+  * eager  - every page module plus every analytics processor and Prophet,
+             i.e. what startup cost before the lazy page registry
+  * each page module and each processor module on its own
+
+Every measurement runs in a new subprocess so nothing is served from
+`sys.modules`; the median of --repeat runs is reported.
+
+Usage:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --repeat 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "analytics_engine"))
+
+from analytics_pipeline import PROCESSORS
+
+PAGE_MODULES = [
+    "dashboard", "manual", "ingestion", "geospatial", "weather", "weatherProduct",
+    "demand", "ChannelAn", "smartForecast", "segmentation", "productLifecycle",
+    "priceSensitivity",
+]
+PROCESSOR_MODULES = sorted({module for module, _, _, _ in PROCESSORS.values()})
+
+SCENARIOS = {
+    "lazy": ["streamlit", "dashboard"],
+    "eager": ["streamlit"] + PAGE_MODULES + PROCESSOR_MODULES + ["prophet"],
+}
+
+_PROBE = """
+import sys, time, json
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+try:
+    for name in {modules!r}:
+        __import__(name)
+except ImportError as e:
+    print(json.dumps({{"error": "%s: %s" % (type(e).__name__, e)}}))
+else:
+    print(json.dumps({{"seconds": time.perf_counter() - start}}))
+"""
+
+
+def time_imports(modules, repeat=3):
+    """Median cold import time of `modules` over `repeat` fresh interpreters"""
+    code = _PROBE.format(paths=[ROOT, os.path.join(ROOT, "analytics_engine")], modules=list(modules))
+    samples = []
+
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if not lines:
+            return {"status": f"failed ({proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode})"}
+
+        result = json.loads(lines[-1])
+        if "error" in result:
+            return {"status": f"unavailable ({result['error']})"}
+        samples.append(result["seconds"])
+
+    return {
+        "status": "ok",
+        "median_s": round(statistics.median(samples), 4),
+        "min_s": round(min(samples), 4),
+        "max_s": round(max(samples), 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import / startup time of the app")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement")
+    parser.add_argument("--skip-modules", action="store_true", help="Only time the lazy and eager scenarios")
+    parser.add_argument("--output", default=None, help="Optional JSON results path")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, modules in SCENARIOS.items():
+        print(f"⏱️ scenario: {name}")
+        results.append({"target": f"startup:{name}", **time_imports(modules, args.repeat)})
+
+    if not args.skip_modules:
+        for module in PAGE_MODULES + PROCESSOR_MODULES + ["prophet"]:
+            print(f"⏱️ module: {module}")
+            results.append({"target": module, **time_imports([module], args.repeat)})
+
+    print("\n📊 Startup benchmark (median of fresh interpreters)")
+    for row in results:
+        timing = f"{row['median_s']:.3f}s" if row["status"] == "ok" else row["status"]
+        print(f"  {row['target']:<32} {timing}")
+
+    lazy, eager = results[0], results[1]
+    if lazy["status"] == "ok" and eager["status"] == "ok" and lazy["median_s"] > 0:
+        print(f"\n🚀 Lazy startup is {eager['median_s'] / lazy['median_s']:.1f}x faster than eager imports")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\n📝 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Synthetic returns/sales generator for benchmarking the analytics engine.
+
+The generated frames follow the schema of the sample workbooks in
+`data set/` (Amazon_Flipkart_Returns_MIXED.xlsx and
+Instant_Delivery_Sales_MIXED.xlsx), so every processor can load them
+unchanged. Generation is fully vectorised and seeded, which keeps runs
+reproducible from 1k up to 10M rows.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# City centres (state, lat, lon) used to scatter coordinates
+CITIES = {
+    "Ahmedabad": ("Gujarat", 23.0225, 72.5714),
+    "Surat": ("Gujarat", 21.1702, 72.8311),
+    "Vadodara": ("Gujarat", 22.3072, 73.1812),
+    "Mumbai": ("Maharashtra", 19.0760, 72.8777),
+    "Pune": ("Maharashtra", 18.5204, 73.8567),
+    "New Delhi": ("Delhi", 28.6139, 77.2090),
+    "Gurgaon": ("Haryana", 28.4595, 77.0266),
+    "Bengaluru": ("Karnataka", 12.9716, 77.5946),
+    "Hyderabad": ("Telangana", 17.3850, 78.4867),
+    "Chennai": ("Tamil Nadu", 13.0827, 80.2707),
+    "Kolkata": ("West Bengal", 22.5726, 88.3639),
+    "Jaipur": ("Rajasthan", 26.9124, 75.7873),
+    "Lucknow": ("Uttar Pradesh", 26.8467, 80.9462),
+    "Indore": ("Madhya Pradesh", 22.7196, 75.8577),
+    "Kochi": ("Kerala", 9.9312, 76.2673),
+}
+
+# Category -> (products, brands, price range)
+CATALOG = {
+    "Electronics": (["Bluetooth Speaker", "Smart Watch", "Power Bank", "Earphones"],
+                    ["Boat", "Samsung", "MI", "Realme"], (900, 5000)),
+    "Home": (["Room Heater", "Fan", "Cooler", "Umbrella"],
+             ["Bajaj", "Havells", "Orient", "Usha"], (300, 8000)),
+    "Beauty": (["Sunscreen", "Face Wash", "Moisturizer", "Lip Balm"],
+               ["Lakme", "Nivea", "Mamaearth", "Himalaya"], (99, 900)),
+    "Grocery": (["Tea", "Coffee", "Instant Noodles", "Snacks"],
+                ["Tata", "Nestle", "Britannia", "Haldiram"], (40, 600)),
+    "Fashion": (["Jacket", "Raincoat", "T-Shirt", "Cap"],
+                ["Puma", "Nike", "Roadster", "HRX"], (250, 3500)),
+}
+
+SALES_PLATFORMS = ["Blinkit", "Zepto", "Swiggy Instamart", "BB Now"]
+RETURN_PLATFORMS = ["Amazon", "Flipkart"]
+WEATHER = ["Sunny", "Rainy", "Cloudy", "Windy", "Winter"]
+RETURN_REASONS = ["Damaged", "Customer Changed Mind", "Late Delivery"]
+
+# Per-platform operating profile: (commission, delivery minutes, rating)
+PLATFORM_PROFILE = {
+    "Blinkit": (0.15, 12, 4.7),
+    "Zepto": (0.14, 11, 4.7),
+    "Swiggy Instamart": (0.16, 16, 4.6),
+    "BB Now": (0.18, 25, 4.2),
+}
+
+CITY_SPREAD_DEG = 0.08   # ~9 km standard deviation around each city centre
+
+
+def _catalog_arrays():
+    """Flatten CATALOG into aligned product/category/brand-pool arrays"""
+    products, categories, price_lo, price_hi, brand_pools = [], [], [], [], []
+    for category, (items, brands, (lo, hi)) in CATALOG.items():
+        for item in items:
+            products.append(item)
+            categories.append(category)
+            price_lo.append(lo)
+            price_hi.append(hi)
+            brand_pools.append(brands)
+    return (np.array(products), np.array(categories), np.array(price_lo),
+            np.array(price_hi), np.array(brand_pools))
+
+
+def _draw_common(rng, n, start_date, days):
+    """Columns shared by returns and sales: product, location, weather and date"""
+    products, categories, price_lo, price_hi, brand_pools = _catalog_arrays()
+    city_names = np.array(list(CITIES))
+    states = np.array([CITIES[c][0] for c in city_names])
+    centres = np.array([CITIES[c][1:] for c in city_names])
+
+    product_idx = rng.integers(0, len(products), n)
+    city_idx = rng.integers(0, len(city_names), n)
+
+    brand_idx = rng.integers(0, brand_pools.shape[1], n)
+    brands = brand_pools[product_idx, brand_idx]
+
+    prices = rng.integers(price_lo[product_idx], price_hi[product_idx] + 1)
+
+    lat = centres[city_idx, 0] + rng.normal(0, CITY_SPREAD_DEG, n)
+    lon = centres[city_idx, 1] + rng.normal(0, CITY_SPREAD_DEG, n)
+
+    # Weather follows the calendar loosely so seasonal analyses have signal
+    day_offset = rng.integers(0, days, n)
+    dates = pd.Timestamp(start_date) + pd.to_timedelta(day_offset, unit="D")
+    month = dates.month.values
+    seasonal = np.select(
+        [np.isin(month, [12, 1, 2]), np.isin(month, [6, 7, 8, 9])],
+        [4, 1],
+        default=0,
+    )
+    weather_idx = np.where(rng.random(n) < 0.5, seasonal, rng.integers(0, len(WEATHER), n))
+
+    return {
+        "product_name": products[product_idx],
+        "category": categories[product_idx],
+        "brand": brands,
+        "price": prices,
+        "state": states[city_idx],
+        "city": city_names[city_idx],
+        "lat": lat.round(6),
+        "lon": lon.round(6),
+        "weather": np.array(WEATHER)[weather_idx],
+        "date": dates,
+    }
+
+
+def generate_returns(n_rows, seed=42, start_date="2025-01-01", days=365):
+    """Synthetic returns frame matching Amazon_Flipkart_Returns_MIXED.xlsx"""
+    rng = np.random.default_rng(seed)
+    common = _draw_common(rng, n_rows, start_date, days)
+
+    return pd.DataFrame({
+        "order_id": "RET-" + pd.Series(np.arange(1000, 1000 + n_rows)).astype(str),
+        "product_name": common["product_name"],
+        "category": common["category"],
+        "brand": common["brand"],
+        "price": common["price"],
+        "return_reason": np.array(RETURN_REASONS)[rng.integers(0, len(RETURN_REASONS), n_rows)],
+        "return_date": common["date"],
+        "state": common["state"],
+        "city": common["city"],
+        "lat": common["lat"],
+        "lon": common["lon"],
+        "weather": common["weather"],
+        "platform": np.array(RETURN_PLATFORMS)[rng.integers(0, len(RETURN_PLATFORMS), n_rows)],
+        "return_value": common["price"],
+        "return_month": common["date"].month.values,
+    })
+
+
+def generate_sales(n_rows, seed=43, start_date="2025-01-01", days=365):
+    """Synthetic sales frame matching Instant_Delivery_Sales_MIXED.xlsx"""
+    rng = np.random.default_rng(seed)
+    common = _draw_common(rng, n_rows, start_date, days)
+
+    platform_idx = rng.integers(0, len(SALES_PLATFORMS), n_rows)
+    platforms = np.array(SALES_PLATFORMS)[platform_idx]
+    profile = np.array([PLATFORM_PROFILE[p] for p in SALES_PLATFORMS])
+
+    quantity = rng.poisson(2.5, n_rows)
+    conversion = rng.random(n_rows).round(2)
+
+    return pd.DataFrame({
+        "transaction_id": "TXN-" + pd.Series(np.arange(2000, 2000 + n_rows)).astype(str),
+        "product_name": common["product_name"],
+        "category": common["category"],
+        "brand": common["brand"],
+        "sale_price": common["price"],
+        "quantity": quantity,
+        "sale_date": common["date"],
+        "state": common["state"],
+        "city": common["city"],
+        "lat": common["lat"],
+        "lon": common["lon"],
+        "weather": common["weather"],
+        "platform": platforms,
+        "commission_rate": (profile[platform_idx, 0] + rng.uniform(-0.01, 0.02, n_rows)).round(2),
+        "order_value": common["price"] * quantity,
+        "delivery_time_min": (profile[platform_idx, 1] + rng.integers(-1, 5, n_rows)).astype(int),
+        "conversion_rate": conversion,
+        "return_rate": (1 - conversion).round(2),
+        "rating": (profile[platform_idx, 2] + rng.choice([-0.1, 0.0, 0.1], n_rows)).round(1),
+    })
+
+
+def generate_dataset(n_sales, n_returns=None, seed=42, start_date="2025-01-01", days=365):
+    """Generate a (returns_df, sales_df) pair; returns default to 20% of sales"""
+    if n_returns is None:
+        n_returns = max(1, int(n_sales * 0.2))
+    returns_df = generate_returns(n_returns, seed=seed, start_date=start_date, days=days)
+    sales_df = generate_sales(n_sales, seed=seed + 1, start_date=start_date, days=days)
+    return returns_df, sales_df
+
+
+def write_dataset(returns_df, sales_df, out_dir, fmt="csv"):
+    """Write the pair to disk in a format the processors can load; returns the two paths"""
+    os.makedirs(out_dir, exist_ok=True)
+
+    if fmt == "xlsx":
+        if max(len(returns_df), len(sales_df)) > 1_048_575:
+            raise ValueError("xlsx is limited to 1,048,576 rows per sheet — use fmt='csv'")
+        returns_path = os.path.join(out_dir, "synthetic_returns.xlsx")
+        sales_path = os.path.join(out_dir, "synthetic_sales.xlsx")
+        returns_df.to_excel(returns_path, index=False)
+        sales_df.to_excel(sales_path, index=False)
+    else:
+        returns_path = os.path.join(out_dir, "synthetic_returns.csv")
+        sales_path = os.path.join(out_dir, "synthetic_sales.csv")
+        returns_df.to_csv(returns_path, index=False, chunksize=500_000)
+        sales_df.to_csv(sales_path, index=False, chunksize=500_000)
+
+    return returns_path, sales_path
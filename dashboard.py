@@ -2,8 +2,49 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+import os
+import sys
+
+# Add analytics engine to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'analytics_engine'))
+from kpi_snapshot import KPISnapshot
+
+PLATFORM_COLORS = {
+    'Zepto': '#5c6bc0',            # Purple
+    'Swiggy Instamart': '#ff7043', # Orange
+    'Blinkit': '#fbc02d',          # Yellow
+    'BB Now': '#00E676',           # Green
+}
+
+
+def _kpi_snapshot():
+    """KPI snapshot kept up to date by ingestion (persisted, so new sessions see it too)"""
+    snapshot = st.session_state.get('kpi_snapshot')
+    backtest = st.session_state.get('kpi_backtest')
+    if backtest is not None and backtest.done():
+        # The background backtest of the latest load has been recorded: read the snapshot again
+        st.session_state.pop('kpi_backtest')
+        snapshot = None
+    if snapshot is None:
+        snapshot = KPISnapshot.load()
+        if snapshot is not None:
+            st.session_state.kpi_snapshot = snapshot
+    return None if snapshot is None or snapshot.is_empty() else snapshot
+
+
+def _month_delta(monthly):
+    """'+x% vs last month' from a year_month-indexed series"""
+    monthly = monthly.dropna().sort_index()
+    if len(monthly) < 2 or monthly.iloc[-2] == 0:
+        return None
+    return f"{(monthly.iloc[-1] / monthly.iloc[-2] - 1) * 100:+.1f}% vs last month"
+
 
 def show():
+    # Every figure below is read from the KPI snapshot maintained at ingestion
+    # (constant time, whatever the history size); sample figures otherwise
+    kpis = _kpi_snapshot()
+
     # Top Header
     col1, col2 = st.columns([6, 1])
     with col1:
@@ -15,25 +56,64 @@ def show():
     m1, m2, m3, m4 = st.columns(4)
 
     with m1:
-        st.metric(label="TOTAL RETURNS", value="50", delta="12.5% vs last month")
+        if kpis is not None:
+            st.metric(label="TOTAL RETURNS", value=f"{int(kpis.total('returns')):,}",
+                      delta=_month_delta(kpis.monthly("returns")))
+        else:
+            st.metric(label="TOTAL RETURNS", value="50", delta="12.5% vs last month")
 
     with m2:
-        st.metric(label="TOTAL SALES DATA", value="150", delta="12.5% vs last month")
+        if kpis is not None:
+            st.metric(label="TOTAL SALES DATA", value=f"{int(kpis.total('orders')):,}",
+                      delta=_month_delta(kpis.monthly("orders")))
+        else:
+            st.metric(label="TOTAL SALES DATA", value="150", delta="12.5% vs last month")
 
     with m3:
-        st.metric(label="AVG PROFIT/ITEM", value="₹245", delta="-2.3% vs last month")
+        if kpis is not None and kpis.avg_profit_per_item() is not None:
+            st.metric(label="AVG PROFIT/ITEM", value=f"₹{kpis.avg_profit_per_item():,.0f}",
+                      delta=_month_delta(kpis.monthly_profit_per_item()))
+        else:
+            st.metric(label="AVG PROFIT/ITEM", value="₹245", delta="-2.3% vs last month")
 
     with m4:
-        st.metric(label="PREDICTION ACCURACY", value="88%", delta="12.5% vs last month")
+        if kpis is not None and kpis.latest_forecast_wape() is not None:
+            change = kpis.forecast_wape_delta()
+            latest = kpis.forecast_accuracy[-1]
+            st.metric(label="FORECAST ERROR (WAPE)", value=f"{kpis.latest_forecast_wape():.0f}%",
+                      delta=None if change is None else f"{change:+.1f} pts vs last load", delta_color="inverse",
+                      help=f"Demand forecast backtest over {latest['skus']:,} SKUs, {latest['folds']} rolling-origin "
+                           f"folds: |forecast − actual| of each SKU's horizon total, over actual units")
+        elif kpis is not None:
+            running = st.session_state.get('kpi_backtest') is not None
+            st.metric(label="FORECAST ERROR (WAPE)", value="n/a",
+                      help="Forecast backtest of the latest load still running" if running else
+                           "No forecast backtest for the latest load (too little sales history, or it failed)")
+        else:
+            st.metric(label="FORECAST ERROR (WAPE)", value="12%", delta="-1.5 pts vs last load", delta_color="inverse")
+
+    if kpis is not None and kpis.updated_at:
+        caption = f"KPIs as of {kpis.updated_at.replace('T', ' ')}"
+        if st.session_state.get('kpi_backtest') is not None:
+            caption += " • Forecast backtest of the latest load still running"
+            if kpis.latest_forecast_wape() is not None:
+                caption += ", WAPE shown is the previous load's"
+        st.caption(caption)
 
     st.markdown("---")
 
     # Chart 1: Returns vs Sales Volume (Overview)
     st.subheader("Returns vs Sales Volume (Overview)")
 
-    cities = ['Delhi', 'Hyderabad', 'Chennai', 'Gurgaon', 'Bangalore', 'Pune', 'Mumbai']
-    sales = [19, 24, 18, 18, 26, 22, 23]
-    returns = [9, 11, 8, 6, 6, 6, 4]
+    if kpis is not None:
+        by_city = kpis.by_city().nlargest(7, "orders")
+        cities = by_city["city"].tolist()
+        sales = by_city["orders"].astype(int).tolist()
+        returns = by_city["returns"].astype(int).tolist()
+    else:
+        cities = ['Delhi', 'Hyderabad', 'Chennai', 'Gurgaon', 'Bangalore', 'Pune', 'Mumbai']
+        sales = [19, 24, 18, 18, 26, 22, 23]
+        returns = [9, 11, 8, 6, 6, 6, 4]
 
     # Create grouped bar chart
     fig1 = go.Figure()
@@ -75,9 +155,14 @@ def show():
     with c1:
         st.subheader("Weather Impact")
         # Pie chart
-        labels = ['Cloudy', 'Rainy', 'Sunny', 'Windy']
-        values = [34, 32, 29, 32] # Adjusted to look similar to image
-        colors = ['#FF5252', '#00E676', '#7C4DFF', '#FFB74D']
+        if kpis is not None:
+            by_weather = kpis.by_weather()
+            labels = by_weather["weather"].tolist()
+            values = by_weather["orders"].astype(int).tolist()
+        else:
+            labels = ['Cloudy', 'Rainy', 'Sunny', 'Windy']
+            values = [34, 32, 29, 32] # Adjusted to look similar to image
+        colors = ['#FF5252', '#00E676', '#7C4DFF', '#FFB74D', '#4FC3F7', '#BA68C8']
         
         fig2 = go.Figure(data=[go.Pie(labels=labels, values=values, hole=.0, marker=dict(colors=colors))])
         fig2.update_layout(
@@ -94,55 +179,37 @@ def show():
     with c2:
         st.subheader("Top Channel Share")
         # Stacked Bar Chart
-        categories = ['Beauty', 'Electronics', 'Home', 'Food', 'Pharma', 'Grocery']
-        
-        # Zepto (Purple)
-        y_zepto = [7, 5, 8, 12, 10, 6]
-        # Blinkit (Yellow)
-        y_blinkit = [10, 12, 6, 8, 12, 10] 
-        # Swiggy (Orange)
-        y_swiggy = [5, 8, 12, 10, 8, 12]
-        # BB Now (Green)
-        y_bbnow = [10, 15, 8, 5, 10, 8]
-        
+        if kpis is not None:
+            channel_share = (
+                kpis.by_channel()
+                .pivot(index="category", columns="platform", values="orders")
+                .fillna(0)
+            )
+            categories = channel_share.index.tolist()
+            platform_orders = {platform: channel_share[platform].astype(int).tolist()
+                               for platform in channel_share.columns}
+        else:
+            categories = ['Beauty', 'Electronics', 'Home', 'Food', 'Pharma', 'Grocery']
+            platform_orders = {
+                'Zepto': [7, 5, 8, 12, 10, 6],
+                'Swiggy Instamart': [5, 8, 12, 10, 8, 12],
+                'Blinkit': [10, 12, 6, 8, 12, 10],
+                'BB Now': [10, 15, 8, 5, 10, 8],
+            }
+
         fig3 = go.Figure()
-        
-        # Trace 1: Zepto (Purple)
-        fig3.add_trace(go.Bar(
-            name='Zepto', 
-            x=categories, 
-            y=y_zepto, 
-            marker_color='#5c6bc0', # Purple
-            hovertemplate="<span style='color:#5c6bc0'>Zepto : %{y}</span><extra></extra>"
-        ))
-        
-        # Trace 2: Swiggy Instamart (Orange)
-        fig3.add_trace(go.Bar(
-            name='Swiggy Instamart', 
-            x=categories, 
-            y=y_swiggy, 
-            marker_color='#ff7043', # Orange
-            hovertemplate="<span style='color:#ff7043'>Swiggy Instamart : %{y}</span><extra></extra>"
-        ))
-        
-        # Trace 3: Blinkit (Yellow)
-        fig3.add_trace(go.Bar(
-            name='Blinkit', 
-            x=categories, 
-            y=y_blinkit, 
-            marker_color='#fbc02d', # Yellow
-            hovertemplate="<span style='color:#fbc02d'>Blinkit : %{y}</span><extra></extra>"
-        ))
-        
-        # Trace 4: BB Now (Green)
-        fig3.add_trace(go.Bar(
-            name='BB Now', 
-            x=categories, 
-            y=y_bbnow, 
-            marker_color='#00E676', # Green
-            hovertemplate="<span style='color:#00E676'>BB Now : %{y}</span><extra></extra>"
-        ))
-        
+
+        # One stacked trace per platform
+        for platform, y_values in platform_orders.items():
+            color = PLATFORM_COLORS.get(platform, '#8b949e')
+            fig3.add_trace(go.Bar(
+                name=platform,
+                x=categories,
+                y=y_values,
+                marker_color=color,
+                hovertemplate=f"<span style='color:{color}'>{platform} : %{{y}}</span><extra></extra>"
+            ))
+
         fig3.update_layout(
             barmode='stack',
             paper_bgcolor='rgba(0,0,0,0)',
@@ -1,7 +1,12 @@
 import streamlit as st
 import pandas as pd
+import ingestion
+from demand_processor import demand_matches
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("demand")
+
     # Check if data has been processed
     if not st.session_state.get('demand_processed', False):
         st.warning("⚠️ Please upload both returns and sales data first using the 'Ingest Data' page to see demand matching analysis.")
@@ -16,6 +21,14 @@ def show():
     with col2:
         st.success("● System Active")
 
+    # Neighbour count: truncates the stored distance-sorted neighbour lists, no re-run
+    if demand_data.get('neighbors') is not None:
+        k = st.slider("🔎 Nearest similar sales (K)", min_value=1, max_value=demand_data['max_k'],
+                      value=demand_data['k'], key="demand_k")
+        if k != demand_data['k']:
+            demand_data = {**demand_data, "demand_matching_results":
+                           demand_matches(demand_data['recent_returns'], demand_data['neighbors'], k)}
+
     # Main Layout: Two Columns (Left List, Right Content)
     # Ratio approx 1:2 based on image
     left_col, right_col = st.columns([1, 2.2], gap="large")
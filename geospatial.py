@@ -4,8 +4,114 @@ from streamlit_folium import st_folium
 import plotly.graph_objects as go
 import pandas as pd
 import generateLabel
+import spatialDrill
+import ingestion
+from map_clustering import MarkerClusterer
+
+# Marker colours per platform (matches the legend under the map)
+PLATFORM_COLORS = {"orange": "#FFA500", "blue": "#4169E1", "red": "#FF0000", "gray": "#808080"}
+
+
+def get_platform_color(platform):
+    """Get color based on platform"""
+    platform_lower = str(platform).lower()
+    if "blinkit" in platform_lower:
+        return "orange"
+    elif "zepto" in platform_lower:
+        return "blue"
+    elif "swiggy" in platform_lower:
+        return "red"
+    else:
+        return "gray"
+
+
+def add_heatmap(m, layers=("returns", "sales"), opacity=0.75):
+    """Overlay the precomputed density rasters of the staged dataset on a folium map"""
+    pipeline = st.session_state.get('analytics_pipeline')
+    heat = pipeline.heatmap() if pipeline is not None else None
+    if not heat:
+        return False
+
+    for name in layers:
+        layer = heat["layers"].get(name)
+        if layer is None:
+            continue
+        folium.raster_layers.ImageOverlay(
+            image=layer["image"],
+            bounds=heat["bounds"],
+            mercator_project=True,
+            opacity=opacity,
+            name=f"{name.title()} density",
+        ).add_to(m)
+    folium.LayerControl(collapsed=True).add_to(m)
+    return True
+
+
+def radius_view(geospatial_data, radius_km):
+    """Geospatial results re-scored for another search radius (truncates the cached neighbour lists)"""
+    sweep = geospatial_data.get('sweep')
+    if sweep is None:
+        return geospatial_data
+    return {**geospatial_data, **sweep.at(radius_km)}
+
+
+def return_clusterer(map_data):
+    """Clusterer for the current map data, rebuilt only when the data changes"""
+    cached = st.session_state.get('geo_clusterer')
+    if cached is None or cached[0] is not map_data:
+        clusterer = MarkerClusterer(map_data, aggregations={"confidence": "mean"})
+        st.session_state.geo_clusterer = (map_data, clusterer)
+        return clusterer
+    return cached[1]
+
+
+def cluster_bubble(count, confidence):
+    """Circle with the number of returns, coloured by their average confidence"""
+    color = "#00E676" if confidence >= 70 else "#fb8c00" if confidence >= 40 else "#FF5252"
+    size = int(min(28 + 6 * len(str(count)), 56))
+    return f"""
+    <div style="width: {size}px; height: {size}px; margin-left: -{size // 2}px; margin-top: -{size // 2}px;
+                border-radius: 50%; background-color: {color}33; border: 2px solid {color};
+                color: white; font-size: 12px; font-weight: bold; display: flex;
+                align-items: center; justify-content: center;">{count}</div>
+    """
+
+
+def return_card(item):
+    """Popup-style detail card for one return, built on click"""
+    confidence_color = "#00E676" if item['confidence'] >= 70 else "#fb8c00" if item['confidence'] >= 40 else "#FF5252"
+    return f"""
+    <div style="font-family: sans-serif; width: 260px; background-color: #161b22; color: white; border-radius: 8px; overflow: hidden;">
+        <div style="background-color: #21262d; padding: 8px 12px; border-bottom: 1px solid #30363d; font-size: 10px; font-weight: bold; color: {confidence_color}; display: flex; align-items: center; gap: 5px;">
+            <span>●</span> {item['decision']} - {item['confidence']}%
+        </div>
+        <div style="padding: 12px;">
+            <div style="font-size: 14px; font-weight: bold; margin-bottom: 4px;">{item['product']}</div>
+            <div style="font-size: 11px; color: #8b949e; margin-bottom: 12px;">{item['city']}</div>
+
+            <div style="background-color: #0d1117; padding: 8px; border-radius: 4px; margin-bottom: 12px;">
+                <div style="display: flex; justify-content: space-between; font-size: 10px; margin-bottom: 4px;">
+                    <span style="color: #8b949e;">PLATFORM</span>
+                    <span style="color: #fb8c00; font-weight: bold;">{item.get('platform', 'Unknown')}</span>
+                </div>
+                <div style="display: flex; justify-content: space-between; font-size: 10px; margin-bottom: 4px;">
+                    <span style="color: #8b949e;">CONFIDENCE</span>
+                    <span style="color: {confidence_color}; font-weight: bold;">{item['confidence']}%</span>
+                </div>
+                 <div style="display: flex; justify-content: space-between; font-size: 10px;">
+                    <span style="color: #8b949e;">DECISION</span>
+                    <span style="color: {confidence_color}; font-weight: bold;">{item['decision']}</span>
+                </div>
+            </div>
+        </div>
+    </div>
+    """
+
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("geospatial")
+
     # Check if data has been processed
     if not st.session_state.get('data_processed', False):
         st.warning("⚠️ Please upload and process data first using the 'Ingest Data' page.")
@@ -19,6 +125,19 @@ def show():
     with col2:
         st.success("● System Active")
 
+    # Search radius: derived from neighbour lists computed once at the widest radius
+    geospatial_data = st.session_state.get('geospatial_data', {})
+    sweep = geospatial_data.get('sweep')
+    if sweep is not None:
+        radius_km = st.slider(
+            "📏 Sell-Near-Me search radius (km)",
+            min_value=1,
+            max_value=int(sweep.max_radius_km),
+            value=int(sweep.config["max_distance_km"]),
+            key="geo_radius"
+        )
+        geospatial_data = radius_view(geospatial_data, radius_km)
+
     # Initialize Drawer State
     if "detail_drawer_open" not in st.session_state:
         st.session_state.detail_drawer_open = False
@@ -65,71 +184,82 @@ def show():
             </style>
             """, unsafe_allow_html=True)
             
-            st.caption("Geospatial view of returns vs. historical sales hotspots.")
+            c_caption, c_heat = st.columns([3, 1])
+            with c_caption:
+                st.caption("Geospatial view of returns vs. historical sales hotspots.")
+            with c_heat:
+                show_heatmap = st.checkbox("🔥 Density heatmap", value=False, key="geo_heatmap")
     
-            # Folium Map
-            m = folium.Map(location=[20.5937, 78.9629], zoom_start=5, tiles='CartoDB dark_matter')
-
-            # Get processed geospatial data for map markers
-            geospatial_data = st.session_state.get('geospatial_data', {})
-            map_data = geospatial_data.get('map_data', [])
-
-            def get_platform_color(platform):
-                """Get color based on platform"""
-                platform_lower = str(platform).lower()
-                if "blinkit" in platform_lower:
-                    return "orange"
-                elif "zepto" in platform_lower:
-                    return "blue"
-                elif "swiggy" in platform_lower:
-                    return "red"
-                else:
-                    return "gray"
-
-            if map_data:
-                for item in map_data[:50]:  # Limit to first 50 for performance
-                    confidence_color = "#00E676" if item['confidence'] >= 70 else "#fb8c00" if item['confidence'] >= 40 else "#FF5252"
-                    platform_color = get_platform_color(item.get('platform', 'Unknown'))
-
-                    popup_html = f"""
-                    <div style="font-family: sans-serif; width: 200px; background-color: #161b22; color: white; border-radius: 8px; overflow: hidden;">
-                        <div style="background-color: #21262d; padding: 8px 12px; border-bottom: 1px solid #30363d; font-size: 10px; font-weight: bold; color: {confidence_color}; display: flex; align-items: center; gap: 5px;">
-                            <span>●</span> {item['decision']} - {item['confidence']}%
-                        </div>
-                        <div style="padding: 12px;">
-                            <div style="font-size: 14px; font-weight: bold; margin-bottom: 4px;">{item['product']}</div>
-                            <div style="font-size: 11px; color: #8b949e; margin-bottom: 12px;">{item['city']}</div>
-
-                            <div style="background-color: #0d1117; padding: 8px; border-radius: 4px; margin-bottom: 12px;">
-                                <div style="display: flex; justify-content: space-between; font-size: 10px; margin-bottom: 4px;">
-                                    <span style="color: #8b949e;">PLATFORM</span>
-                                    <span style="color: #fb8c00; font-weight: bold;">{item.get('platform', 'Unknown')}</span>
-                                </div>
-                                <div style="display: flex; justify-content: space-between; font-size: 10px; margin-bottom: 4px;">
-                                    <span style="color: #8b949e;">CONFIDENCE</span>
-                                    <span style="color: {confidence_color}; font-weight: bold;">{item['confidence']}%</span>
-                                </div>
-                                 <div style="display: flex; justify-content: space-between; font-size: 10px;">
-                                    <span style="color: #8b949e;">DECISION</span>
-                                    <span style="color: {confidence_color}; font-weight: bold;">{item['decision']}</span>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    """
-
-                    # Add marker for each return location with platform-specific color
-                    folium.Marker(
-                        [item['lat'], item['lon']],
-                        popup=folium.Popup(popup_html, max_width=250),
-                        icon=folium.Icon(color=platform_color, icon="info-sign", prefix='fa')
-                    ).add_to(m)
+            # Folium Map — server-side clustered, only the current viewport is rendered
+            clusterer = return_clusterer(geospatial_data.get('map_data', []))
+
+            # Viewport reported by the map on the previous interaction
+            map_state = st.session_state.get('geo_map') or {}
+            if map_state.get('zoom') and map_state.get('center') and map_state.get('bounds'):
+                center = [map_state['center']['lat'], map_state['center']['lng']]
+                zoom = map_state['zoom']
+                sw, ne = map_state['bounds']['_southWest'], map_state['bounds']['_northEast']
+                bounds = (sw['lat'], sw['lng'], ne['lat'], ne['lng'])
+            else:
+                center, zoom = clusterer.fit_view()
+                bounds = None
+
+            m = folium.Map(location=center, zoom_start=zoom, tiles='CartoDB dark_matter')
+            markers = folium.FeatureGroup(name="Returns")
+            if show_heatmap:
+                # Pre-rendered rasters: one image per layer instead of one marker per point
+                add_heatmap(m, ["sales", "returns"] if mode == "Sales" else ["returns", "sales"])
+
+            if len(clusterer):
+                visible = clusterer.clusters(zoom, bounds)
+                for cluster in visible.itertuples(index=False):
+                    if cluster.count == 1:
+                        item = clusterer.points.iloc[cluster.point_id]
+                        folium.CircleMarker(
+                            [item['lat'], item['lon']],
+                            radius=7,
+                            color=PLATFORM_COLORS[get_platform_color(item.get('platform', 'Unknown'))],
+                            fill=True,
+                            fill_opacity=0.85,
+                            tooltip=f"{item['product']} · {item['city']}"
+                        ).add_to(markers)
+                    else:
+                        folium.Marker(
+                            [cluster.lat, cluster.lon],
+                            icon=folium.DivIcon(html=cluster_bubble(cluster.count, cluster.confidence)),
+                            tooltip=f"{cluster.count} returns — zoom in or click for details"
+                        ).add_to(markers)
+                st.caption(f"Showing {len(visible)} markers for {len(clusterer)} returns "
+                           f"({int(visible['count'].sum())} in view)")
             else:
                 # Fallback static markers if no processed data
                 folium.Marker([17.3850, 78.4867], popup="No processed data available",
-                            icon=folium.Icon(color="gray", icon="info-sign", prefix='fa')).add_to(m)
-    
-            st_folium(m, height=400, width="100%", use_container_width=True)
+                            icon=folium.Icon(color="gray", icon="info-sign", prefix='fa')).add_to(markers)
+
+            map_state = st_folium(
+                m,
+                feature_group_to_add=markers,
+                center=center,
+                zoom=zoom,
+                height=400,
+                width="100%",
+                use_container_width=True,
+                key="geo_map",
+                returned_objects=["bounds", "zoom", "center", "last_object_clicked"]
+            )
+
+            # Popup details are only built for the marker that was clicked
+            clicked = (map_state or {}).get('last_object_clicked')
+            if clicked and len(clusterer):
+                members = clusterer.members(map_state.get('zoom') or zoom, clicked['lat'], clicked['lng'])
+                if len(members) == 1:
+                    st.markdown(return_card(members.iloc[0]), unsafe_allow_html=True)
+                elif len(members) > 1:
+                    st.markdown(f"**{len(members)} returns in this cluster**")
+                    st.dataframe(
+                        members[['product', 'city', 'decision', 'confidence', 'platform']].head(100),
+                        use_container_width=True, hide_index=True, height=200
+                    )
             
             st.markdown("""
             <div style="display: flex; justify-content: center; gap: 20px; font-size: 12px; color: #8b949e; margin-top: 10px;">
@@ -144,8 +274,7 @@ def show():
             st.markdown('<div style="background-color: #0d1117; border: 1px solid #30363d; border-radius: 10px; padding: 15px; height: 100%;">', unsafe_allow_html=True)
             st.markdown("##### Regional Sales vs Returns")
 
-            # Get processed geospatial data
-            geospatial_data = st.session_state.get('geospatial_data', {})
+            # Get processed geospatial data (at the selected radius)
             regional_summary = geospatial_data.get('regional_summary', {})
 
             if regional_summary:
@@ -190,6 +319,10 @@ def show():
             </div>
             """, unsafe_allow_html=True)
     
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown("#### Regional Drill-down (Country → City → Neighborhood)")
+        spatialDrill.show(geospatial_data.get('regional_cells'), key="geo_drill")
+
         st.markdown("<br><br>", unsafe_allow_html=True)
         st.markdown("#### Inventory Re-routing Plan (Return Origin → Resale Destination)")
         
@@ -223,7 +356,6 @@ def show():
         st.markdown("<hr style='margin: 0 0 10px 0; border-color: #30363d;'>", unsafe_allow_html=True)
 
         # Display analysis results from processed data
-        geospatial_data = st.session_state.get('geospatial_data', {})
         analysis_results = geospatial_data.get('analysis_results', [])
 
         if analysis_results:
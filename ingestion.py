@@ -2,18 +2,177 @@ import streamlit as st
 import pandas as pd
 import os
 import sys
+import threading
+from concurrent.futures import Future
 
 # Add analytics engine to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'analytics_engine'))
-from geospatial_processor import GeospatialProcessor
-from manual_viability_processor import ManualViabilityProcessor
-from weather_processor import WeatherProcessor
-from demand_processor import DemandProcessor
-from channel_processor import ChannelProcessor
-from smart_forecast_processor import SmartForecastProcessor
-from segmentation_processor import SegmentationProcessor
-from product_lifecycle_processor import ProductLifecycleProcessor
-from price_sensitivity_processor import PriceSensitivityProcessor
+from analytics_pipeline import AnalyticsPipeline, PROCESSORS
+from result_cache import SharedResultCache, dataset_fingerprint
+from kpi_snapshot import KPISnapshot
+from feature_store import FeatureStore
+from weather_store import WeatherStore
+from prophet_pool import shared_pool
+from run_profiler import RunProfiler
+
+# Processor name -> (result key, "processed" flag) the pages read from session state
+SESSION_KEYS = {
+    "geospatial": ("geospatial_data", "data_processed"),
+    "weather": ("weather_data", "weather_processed"),
+    "demand": ("demand_data", "demand_processed"),
+    "channel": ("channel_data", "channel_processed"),
+    "forecast": ("forecast_data", "forecast_processed"),
+    "segmentation": ("segmentation_data", "segmentation_processed"),
+    "lifecycle": ("lifecycle_data", "lifecycle_processed"),
+    "sensitivity": ("sensitivity_data", "sensitivity_processed"),
+    "viability": ("manual_viability_processor", "viability_trained"),
+}
+
+FEATURE_LABELS = {
+    "geospatial": "Geospatial analysis",
+    "weather": "weather trends analysis",
+    "demand": "demand matching analysis",
+    "channel": "channel performance analysis",
+    "forecast": "smart forecast analysis",
+    "segmentation": "customer & location segmentation",
+    "lifecycle": "product lifecycle analysis",
+    "sensitivity": "price sensitivity analysis",
+    "viability": "manual viability check models",
+}
+
+
+@st.cache_resource
+def get_result_cache():
+    """One result cache per server process, shared by every session"""
+    return SharedResultCache.from_env()
+
+
+def reset_pipeline(pipeline):
+    """Replace the staged pipeline and drop results computed from the previous upload"""
+    previous = st.session_state.get('analytics_pipeline')
+    if previous is not None:
+        previous.shutdown()
+
+    for data_key, flag_key in SESSION_KEYS.values():
+        st.session_state.pop(data_key, None)
+        st.session_state.pop(flag_key, None)
+    st.session_state.pop('sql_result', None)
+
+    st.session_state.analytics_pipeline = pipeline
+
+
+# Serializes read-modify-write of the persisted KPI snapshot (uploads and background backtests)
+_SNAPSHOT_LOCK = threading.Lock()
+
+
+def _record_backtest(sales_fp, future, recorded):
+    """Add a finished background backtest to the persisted snapshot that counted its sales file"""
+    try:
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"⚠️ Forecast backtest failed: {e}")
+            result = None
+        with _SNAPSHOT_LOCK:
+            snapshot = KPISnapshot.load()
+            if snapshot is not None and sales_fp in snapshot.sources:     # else replaced by an unrelated load
+                snapshot.record_backtest(result).save()    # no result is recorded too, so no stale WAPE is shown
+    finally:
+        recorded.set_result(None)
+
+
+def update_kpi_snapshot(pipeline, returns_file=None, sales_file=None, delta=False):
+    """Fold this upload into the persisted KPI snapshot (or start a new one) for the dashboard.
+
+    The forecast accuracy KPI needs a backtest of the new sales; it runs in
+    the background. Only a delta load keeps the accuracy history of the
+    loads before it; a replace load starts without one.
+    """
+    sources = (dataset_fingerprint(returns_file) if returns_file is not None else None,
+               dataset_fingerprint(sales_file) if sales_file is not None else None)
+
+    with _SNAPSHOT_LOCK:
+        snapshot = (KPISnapshot.load() if delta else None) or KPISnapshot()
+        new_sales = pipeline.sales_df is not None and sources[1] not in snapshot.sources
+
+        if pipeline.profiler is not None:
+            with pipeline.profiler.stage("Ingestion", "kpi", step="kpi_snapshot"):
+                snapshot.apply(pipeline.returns_df, pipeline.sales_df, sources=sources,
+                               weather_store=pipeline.weather_store())
+        else:
+            snapshot.apply(pipeline.returns_df, pipeline.sales_df, sources=sources,
+                           weather_store=pipeline.weather_store())
+        snapshot.save()
+
+    # Forecast accuracy KPI: rolling-origin backtest of the new sales (time-budgeted), off the upload path
+    if new_sales:
+        recorded = Future()
+        pipeline.backtest_in_background().add_done_callback(lambda f: _record_backtest(sources[1], f, recorded))
+        st.session_state.kpi_backtest = recorded
+
+    st.session_state.kpi_snapshot = snapshot
+    return snapshot
+
+
+def update_weather_store(pipeline):
+    """Add the weather this upload reports per city/day to the persisted weather history"""
+    store = WeatherStore.load() or WeatherStore().load_history_file()
+
+    if pipeline.profiler is not None:
+        with pipeline.profiler.stage("Ingestion", "weather", step="weather_store"):
+            store.observe(pipeline.sales_df).observe(pipeline.returns_df)
+    else:
+        store.observe(pipeline.sales_df).observe(pipeline.returns_df)
+
+    store.save()
+    pipeline.weather = store
+    return store
+
+
+def update_feature_store(pipeline, sales_file=None, delta=False):
+    """Fold this upload's sales into the persisted rolling-velocity feature store (or start a new one)"""
+    if pipeline.sales_df is None:
+        return None
+
+    store = (FeatureStore.load() if delta else None) or FeatureStore()
+    source = dataset_fingerprint(sales_file) if sales_file is not None else None
+
+    if pipeline.profiler is not None:
+        with pipeline.profiler.stage("Ingestion", "features", step="feature_store"):
+            store.apply(pipeline.sales_df, source=source, weather_store=pipeline.weather_store())
+    else:
+        store.apply(pipeline.sales_df, source=source, weather_store=pipeline.weather_store())
+
+    store.save()
+    pipeline.features = store
+    return store
+
+
+def ensure_processed(name, prefetch=True):
+    """Run a page's processor on its first visit and publish the result to session state"""
+    data_key, flag_key = SESSION_KEYS[name]
+    pipeline = st.session_state.get('analytics_pipeline')
+
+    if pipeline is None or not pipeline.available(name):
+        return st.session_state.get(flag_key, False)
+
+    if not st.session_state.get(flag_key, False):
+        if pipeline.is_ready(name):
+            result = pipeline.run(name)
+        else:
+            with st.spinner(f"Running {FEATURE_LABELS[name]}..."):
+                result = pipeline.run(name)
+            if pipeline.profiler is not None:
+                st.session_state.run_report_path = pipeline.profiler.save()
+
+        if result is not None:
+            st.session_state[data_key] = result
+            st.session_state[flag_key] = True
+
+    if prefetch:
+        pipeline.prefetch(name)
+
+    return st.session_state.get(flag_key, False)
 
 def show():
     # Header
@@ -147,128 +306,76 @@ def show():
         }
         </style>
         """, unsafe_allow_html=True)
+        lazy_mode = st.toggle(
+            "⚡ Lazy evaluation — run each analysis on the first visit of its page",
+            value=True, key="lazy_mode"
+        )
+        delta_load = st.toggle(
+            "📥 Delta load — add these files to the existing dashboard KPIs instead of replacing them",
+            value=False, key="delta_load"
+        )
+
         if st.button("✨ Run Preprocessing & Predict"):
             if returns_file is None and sales_file is None:
                 st.error("Please upload at least one file (Returns or Sales)")
                 return
 
-            # Initialize geospatial processor
-            processor = GeospatialProcessor()
-
-            # Save uploaded files temporarily
-            returns_path = None
-            sales_path = None
-
-            if returns_file is not None:
-                returns_path = os.path.join("temp_returns.xlsx")
-                with open(returns_path, "wb") as f:
-                    f.write(returns_file.getbuffer())
-
-            if sales_file is not None:
-                sales_path = os.path.join("temp_sales.xlsx")
-                with open(sales_path, "wb") as f:
-                    f.write(sales_file.getbuffer())
-
-            # Process data
-            if processor.load_and_process_data(returns_path, sales_path):
-                # Store geospatial results in session state
-                st.session_state.geospatial_data = processor.processed_data
-
-                # Process weather analysis if both files are available
-                if returns_path and sales_path:
-                    weather_processor = WeatherProcessor()
-                    if weather_processor.load_and_process_data(returns_path, sales_path):
-                        st.session_state.weather_data = weather_processor.processed_data
-                        st.session_state.weather_processed = True
-
-                # Process demand matching if both files are available
-                if returns_path and sales_path:
-                    demand_processor = DemandProcessor()
-                    if demand_processor.load_and_process_data(returns_path, sales_path):
-                        st.session_state.demand_data = demand_processor.processed_data
-                        st.session_state.demand_processed = True
-
-                # Process channel analysis if both files are available
-                if returns_path and sales_path:
-                    channel_processor = ChannelProcessor()
-                    if channel_processor.load_and_process_data(returns_path, sales_path):
-                        st.session_state.channel_data = channel_processor.processed_data
-                        st.session_state.channel_processed = True
-
-                # Process smart forecast if both files are available
-                if returns_path and sales_path:
-                    forecast_processor = SmartForecastProcessor()
-                    if forecast_processor.load_and_process_data(returns_path, sales_path):
-                        st.session_state.forecast_data = forecast_processor.processed_data
-                        st.session_state.forecast_processed = True
-
-                # Process segmentation if both files are available
-                if returns_path and sales_path:
-                    segmentation_processor = SegmentationProcessor()
-                    if segmentation_processor.load_and_process_data(returns_path, sales_path):
-                        st.session_state.segmentation_data = segmentation_processor.processed_data
-                        st.session_state.segmentation_processed = True
-
-                # Process product lifecycle if sales file is available
-                if sales_path:
-                    lifecycle_processor = ProductLifecycleProcessor()
-                    if lifecycle_processor.load_and_process_data(None, sales_path):
-                        st.session_state.lifecycle_data = lifecycle_processor.processed_data
-                        st.session_state.lifecycle_processed = True
-
-                # Process price sensitivity if sales file is available
-                if sales_path:
-                    sensitivity_processor = PriceSensitivityProcessor()
-                    if sensitivity_processor.load_and_process_data(None, sales_path):
-                        st.session_state.sensitivity_data = sensitivity_processor.processed_data
-                        st.session_state.sensitivity_processed = True
-
-                # Train manual viability processor if sales data is available
-                if sales_path:
-                    viability_processor = ManualViabilityProcessor()
-                    if viability_processor.load_and_train_models(pd.read_excel(sales_path) if sales_path.endswith('.xlsx') else pd.read_csv(sales_path)):
-                        st.session_state.manual_viability_processor = viability_processor
-                        st.session_state.viability_trained = True
-
-                st.session_state.data_processed = True
-
-                success_msg = "✅ Data processing complete! "
-                features = []
-                if True:  # geospatial always processed
-                    features.append("Geospatial analysis")
-                if sales_path and st.session_state.get('viability_trained', False):
-                    features.append("manual viability check models")
-                if returns_path and sales_path and st.session_state.get('weather_processed', False):
-                    features.append("weather trends analysis")
-                if returns_path and sales_path and st.session_state.get('demand_processed', False):
-                    features.append("demand matching analysis")
-                if returns_path and sales_path and st.session_state.get('channel_processed', False):
-                    features.append("channel performance analysis")
-                if returns_path and sales_path and st.session_state.get('forecast_processed', False):
-                    features.append("smart forecast analysis")
-                if returns_path and sales_path and st.session_state.get('segmentation_processed', False):
-                    features.append("customer & location segmentation")
-                if sales_path and st.session_state.get('lifecycle_processed', False):
-                    features.append("product lifecycle analysis")
-                if sales_path and st.session_state.get('sensitivity_processed', False):
-                    features.append("price sensitivity analysis")
-
-                if features:
-                    success_msg += f"{' and '.join(features)} are now available."
+            # Stage-level timing/memory instrumentation for this run
+            profiler = RunProfiler()
+
+            # Stage the uploads once; every processor reads these frames
+            try:
+                pipeline = AnalyticsPipeline.stage(returns_file, sales_file, profiler=profiler,
+                                                    cache=get_result_cache())
+            except Exception as e:
+                pipeline = None
+                st.error(f"Failed to read the uploaded files: {e}")
+
+            if pipeline is not None:
+                reset_pipeline(pipeline)
+                if pipeline.sales_df is not None:
+                    shared_pool().warm()   # Prophet workers start importing while the rest runs
+                update_weather_store(pipeline)
+                update_kpi_snapshot(pipeline, returns_file, sales_file, delta=delta_load)
+                update_feature_store(pipeline, sales_file, delta=delta_load)
+
+                available = [name for name in PROCESSORS if pipeline.available(name)]
+
+                if lazy_mode:
+                    features = [FEATURE_LABELS[name] for name in available]
+                    st.success(
+                        "✅ Data staged! " + " and ".join(features) +
+                        " will be computed when you first open their pages."
+                    )
+                    st.toast("Pipeline Completed Successfully!")
                 else:
-                    success_msg += "Geospatial analysis results are now available in the Geospatial Demand Analysis page."
+                    # Eager mode: run every available processor now
+                    for name in available:
+                        ensure_processed(name, prefetch=False)
+
+                    features = [FEATURE_LABELS[name] for name in available if pipeline.results.get(name) is not None]
+                    if features:
+                        st.success(f"✅ Data processing complete! {' and '.join(features)} are now available.")
+                        st.toast("Pipeline Completed Successfully!")
+                    else:
+                        st.error("Failed to process data. Please check file formats and column names.")
 
-                st.success(success_msg)
+                st.session_state.run_report_path = profiler.save()
 
-                # Clean up temporary files
-                if returns_path and os.path.exists(returns_path):
-                    os.remove(returns_path)
-                if sales_path and os.path.exists(sales_path):
-                    os.remove(sales_path)
+    # Run Report Panel (shown after "Pipeline Completed"); lazily computed
+    # pages keep adding their stages to the same report
+    pipeline = st.session_state.get('analytics_pipeline')
+    if pipeline is not None and pipeline.profiler is not None and pipeline.profiler.stages:
+        show_run_report(pipeline.profiler.report(), st.session_state.get('run_report_path'))
+    if pipeline is not None:
+        show_sql_queries(pipeline)
 
-                st.toast("Pipeline Completed Successfully!")
-            else:
-                st.error("Failed to process data. Please check file formats and column names.")
+    if pipeline is not None and pipeline.cache is not None:
+        stats = pipeline.cache.stats()
+        st.caption(
+            f"♻️ Shared result cache: {stats['entries']} entries, {stats['size_mb']:.1f} / {stats['max_mb']:.0f} MB, "
+            f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions"
+        )
 
     # Footer Info
     st.markdown("""
@@ -281,3 +388,49 @@ def show():
         </div>
     </div>
     """, unsafe_allow_html=True)
+
+
+def show_run_report(report, report_path=None):
+    """Render the stage-level timing/memory report of the last pipeline run"""
+    stages = pd.DataFrame(report.get("stages", []))
+    if stages.empty:
+        return
+
+    with st.expander(f"⏱️ Pipeline Run Report — {report.get('total_wall_s', 0):.2f}s total", expanded=False):
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Wall Time", f"{stages['wall_s'].sum():.2f}s")
+        m2.metric("CPU Time", f"{stages['cpu_s'].sum():.2f}s")
+        m3.metric("Peak Stage Memory", f"{stages['peak_mem_mb'].max():.1f} MB")
+
+        st.markdown("**Per-processor totals**")
+        totals = pd.DataFrame.from_dict(report.get("processors", {}), orient="index")
+        st.dataframe(totals.sort_values("wall_s", ascending=False), use_container_width=True)
+
+        st.markdown("**Stage breakdown**")
+        st.dataframe(stages, use_container_width=True, hide_index=True)
+
+        if report_path:
+            st.caption(f"Report saved to `{report_path}`")
+
+
+def show_sql_queries(pipeline):
+    """Run the Databricks queries from all_SQL_queries locally on the staged data"""
+    import sql_engine
+
+    with st.expander("🦆 SQL Queries (local DuckDB)", expanded=False):
+        if sql_engine.duckdb is None:
+            st.info("Install DuckDB to run the all_SQL_queries set locally: `pip install duckdb`")
+            return
+
+        query_name = st.selectbox("Query", sql_engine.available_queries(), key="sql_query_name")
+        if st.button("▶️ Run Query", key="sql_run"):
+            try:
+                with st.spinner(f"Running {query_name}.sql..."):
+                    st.session_state.sql_result = (query_name, pipeline.sql(query_name))
+            except Exception as e:
+                st.error(f"Query failed: {e}")
+
+        if st.session_state.get('sql_result') and st.session_state.sql_result[0] == query_name:
+            result = st.session_state.sql_result[1]
+            st.caption(f"{len(result):,} rows")
+            st.dataframe(result, use_container_width=True, hide_index=True)
@@ -1,6 +1,10 @@
 import streamlit as st
+import ingestion
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("viability")
+
     # Check if data has been processed and viability models trained
     if not st.session_state.get('viability_trained', False):
         st.warning("⚠️ Please upload sales data first using the 'Ingest Data' page to train the viability models.")
@@ -174,6 +178,8 @@ def show():
         <div><span style="color: #8b949e;">Weather Impact:</span> <span style="color: white;">{result['weather_impact']}</span></div>
         <div><span style="color: #8b949e;">Market Price:</span> <span style="color: white;">{result['predicted_market_price']}</span></div>
         <div><span style="color: #8b949e;">Price OK:</span> <span style="color: white;">{result['price_acceptable']}</span></div>
+        <div><span style="color: #8b949e;">Sales Velocity:</span> <span style="color: white;">{result.get('sales_velocity', 'N/A')}</span></div>
+        <div><span style="color: #8b949e;">Velocity Trend:</span> <span style="color: white;">{result.get('velocity_trend', 'N/A')}</span></div>
     </div>
 </div>
 <div class="rec-box">
@@ -3,8 +3,12 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
+import ingestion
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("sensitivity")
+
     # Check if data has been processed
     if not st.session_state.get('sensitivity_processed', False):
         st.warning("⚠️ Please upload sales data first using the 'Ingest Data' page to see price sensitivity analysis.")
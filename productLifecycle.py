@@ -3,8 +3,12 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
+import ingestion
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("lifecycle")
+
     # Check if data has been processed
     if not st.session_state.get('lifecycle_processed', False):
         st.warning("⚠️ Please upload sales data first using the 'Ingest Data' page to see product lifecycle analysis.")
@@ -73,11 +77,9 @@ def show():
         # Convert back to DataFrame
         trend_df = pd.DataFrame.from_dict(trend_chart_data, orient='index')
 
-        # Create month labels
-        month_names = {1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
-                      7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'}
-
-        months = [month_names.get(m, str(m)) for m in trend_df.index]
+        # Create month labels (index is year-month, e.g. 2024-06 -> Jun 2024)
+        months = pd.to_datetime(trend_df.index, format='%Y-%m', errors='coerce').strftime('%b %Y')
+        months = [m if isinstance(m, str) else str(k) for m, k in zip(months, trend_df.index)]
 
         # Create line chart
         fig_trends = go.Figure()
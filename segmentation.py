@@ -6,8 +6,13 @@ import numpy as np
 import folium
 from folium import plugins
 from streamlit.components.v1 import html
+import ingestion
+import spatialDrill
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("segmentation")
+
     # Check if data has been processed
     if not st.session_state.get('segmentation_processed', False):
         st.warning("⚠️ Please upload both returns and sales data first using the 'Ingest Data' page to see customer & location segmentation.")
@@ -114,6 +119,21 @@ def show():
     # Create Folium map centered on India
     m = folium.Map(location=[20.5937, 78.9629], zoom_start=5, tiles='CartoDB positron')
 
+    # Optional supply/demand density underlay from the precomputed rasters
+    pipeline = st.session_state.get('analytics_pipeline')
+    if pipeline is not None and st.checkbox("🔥 Show sales vs. returns density", value=False, key="seg_heatmap"):
+        heat = pipeline.heatmap()
+        if heat:
+            for name, layer in heat["layers"].items():
+                folium.raster_layers.ImageOverlay(
+                    image=layer["image"],
+                    bounds=heat["bounds"],
+                    mercator_project=True,
+                    opacity=0.6,
+                    name=f"{name.title()} density",
+                ).add_to(m)
+            folium.LayerControl(collapsed=True).add_to(m)
+
     # Add markers for each city
     for _, city in df.iterrows():
         # Calculate marker size based on total_sales (normalized)
@@ -244,6 +264,12 @@ def show():
 
     st.markdown("---")
 
+    # Geohash drill-down (aggregated once at ingestion, no distance recomputation)
+    st.subheader("Regional Drill-down")
+    spatialDrill.show(segmentation_data.get('regional_cells'), key="seg_drill")
+
+    st.markdown("---")
+
     # Get top performing cities for insight
     if city_cluster_map:
         df_temp = pd.DataFrame(city_cluster_map)
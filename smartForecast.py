@@ -1,7 +1,12 @@
 import streamlit as st
 import plotly.graph_objects as go
+import pandas as pd
+import ingestion
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("forecast")
+
     # Check if data has been processed
     if not st.session_state.get('forecast_processed', False):
         st.warning("⚠️ Please upload both returns and sales data first using the 'Ingest Data' page to see smart forecast analysis.")
@@ -271,3 +276,59 @@ def show():
             """, unsafe_allow_html=True)
 
     st.markdown('</div>', unsafe_allow_html=True)
+
+
+    # -----------------------------------------------------
+    # SECTION 3: 30-DAY SKU FORECAST (every SKU, method-tagged)
+    # -----------------------------------------------------
+    sku_forecasts = pd.DataFrame(forecast_data.get('sku_forecasts', []))
+    if not sku_forecasts.empty:
+        st.markdown('<div class="sf-card">', unsafe_allow_html=True)
+        st.markdown("""
+            <div class="sf-title">30-Day SKU Forecast</div>
+            <div class="sf-subtitle">Prophet for the top sellers, seasonal-naive / SES / Croston for the long tail.</div>
+        """, unsafe_allow_html=True)
+        method_counts = sku_forecasts['method'].value_counts()
+        st.caption(" • ".join(f"{method}: {count}" for method, count in method_counts.items()))
+        st.dataframe(sku_forecasts, use_container_width=True, hide_index=True)
+
+        # Reconciled roll-ups: sparse SKUs take a share of their category forecast,
+        # so category, city and total figures add up
+        hierarchy = forecast_data.get('hierarchical_forecast', {})
+        if hierarchy.get('total'):
+            total = hierarchy['total'][0]
+            st.caption(f"Reconciled 30-day total: {total['forecast_30d']:,.0f} units "
+                       f"(direct total forecast {total['base_30d']:,.0f})")
+        c1, c2 = st.columns(2)
+        for col, level, title in ((c1, 'category', 'By category'), (c2, 'city', 'By city')):
+            if hierarchy.get(level):
+                with col:
+                    st.markdown(f"**{title}**")
+                    level_df = pd.DataFrame(hierarchy[level]).sort_values('forecast_30d', ascending=False)
+                    st.dataframe(level_df, use_container_width=True, hide_index=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+    # -----------------------------------------------------
+    # SECTION 4: FORECAST BACKTEST (rolling-origin accuracy)
+    # -----------------------------------------------------
+    pipeline = st.session_state.get('analytics_pipeline')
+    backtest = pipeline.backtest() if pipeline is not None else None
+    if backtest:
+        st.markdown('<div class="sf-card">', unsafe_allow_html=True)
+        st.markdown(f"""
+            <div class="sf-title">Forecast Backtest</div>
+            <div class="sf-subtitle">{backtest['folds']} rolling-origin folds of {backtest['horizon']} days over
+            {backtest['skus']:,} SKUs • production tier WAPE <b>{backtest['wape_pct']}%</b> on {backtest['horizon']}-day totals
+            (daily {backtest['daily_wape_pct']}%), MAPE {backtest['mape_pct']}%</div>
+        """, unsafe_allow_html=True)
+        if not backtest['complete']:
+            st.caption(f"⏱️ Time budget reached: {backtest['tasks_done']}/{backtest['tasks_total']} tasks scored")
+        c1, c2 = st.columns(2)
+        with c1:
+            st.markdown("**By method**")
+            st.dataframe(backtest['by_method'], use_container_width=True, hide_index=True)
+        with c2:
+            st.markdown("**By category (production tier)**")
+            st.dataframe(backtest['by_category'], use_container_width=True, hide_index=True)
+        st.markdown('</div>', unsafe_allow_html=True)
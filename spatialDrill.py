@@ -0,0 +1,60 @@
+import streamlit as st
+import plotly.graph_objects as go
+
+DRILL_PATH = ["country", "region", "city", "district", "neighborhood"]
+
+
+def show(buckets, key="drill"):
+    """Country → region → city → district → neighborhood drill-down over geohash cells"""
+    if buckets is None or buckets.cells.empty:
+        st.info("No located returns or sales to bucket.")
+        return
+
+    def cell_label(cells):
+        return {row.cell: f"{row.label} · {row.cell} ({int(row.sales):,} sales / {int(row.returns):,} returns)"
+                for row in cells.itertuples(index=False)}
+
+    # Each selection narrows the next level to the children of the chosen cell
+    parent, level = None, DRILL_PATH[0]
+    selectors = st.columns(len(DRILL_PATH) - 1)
+    for i, current in enumerate(DRILL_PATH[:-1]):
+        cells = buckets.drill(current, parent)
+        labels = cell_label(cells)
+        with selectors[i]:
+            choice = st.selectbox(
+                current.title(),
+                ["All"] + list(labels),
+                format_func=lambda c, labels=labels: "All" if c == "All" else labels[c],
+                key=f"{key}_{current}_{parent or 'root'}"
+            )
+        if choice == "All":
+            level = current
+            break
+        parent, level = choice, DRILL_PATH[i + 1]
+
+    cells = buckets.drill(level, parent)
+    st.caption(f"{len(cells)} {level} cells" + (f" inside `{parent}`" if parent else ""))
+
+    top = cells.head(15)
+    names = [f"{row.label} · {row.cell}" for row in top.itertuples(index=False)]
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(y=names, x=top["returns"], name='Returns', orientation='h', marker_color='#FF5252',
+                         hovertemplate="<span style='color:#FF5252'>Returns : %{x}</span><extra></extra>"))
+    fig.add_trace(go.Bar(y=names, x=top["sales"], name='Sales', orientation='h', marker_color='#00E676',
+                         hovertemplate="<span style='color:#00E676'>Sales : %{x}</span><extra></extra>"))
+    fig.update_layout(barmode='group', paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                      font=dict(color='white', size=10), margin=dict(t=10, b=10, l=10, r=10),
+                      height=max(250, 28 * len(top)), yaxis=dict(autorange="reversed"),
+                      legend=dict(orientation="h", y=1.05), hovermode="y unified")
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        cells[["cell", "label", "sales", "qty", "returns", "resellable", "return_pct", "avg_confidence"]]
+        .rename(columns={"cell": "Geohash", "label": "Main City", "sales": "Sales", "qty": "Units",
+                         "returns": "Returns", "resellable": "Resellable", "return_pct": "Return %",
+                         "avg_confidence": "Avg Confidence"})
+        .round(1),
+        use_container_width=True,
+        hide_index=True
+    )
@@ -2,8 +2,12 @@ import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
 import generateLabel
+import ingestion
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("weather")
+
     # Check if data has been processed
     if not st.session_state.get('weather_processed', False):
         st.warning("⚠️ Please upload both returns and sales data first using the 'Ingest Data' page to see weather analysis.")
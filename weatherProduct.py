@@ -2,8 +2,12 @@ import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
 import generateLabel
+import ingestion
 
 def show():
+    # Compute this page's analysis on first visit (lazy pipeline)
+    ingestion.ensure_processed("weather")
+
     # Check if data has been processed
     if not st.session_state.get('weather_processed', False):
         st.warning("⚠️ Please upload both returns and sales data first using the 'Ingest Data' page to see weather-product analysis.")
@@ -91,6 +95,7 @@ def show():
             .wp-header { color: #8b949e; font-size: 10px; font-weight: bold; text-transform: uppercase; letter-spacing: 0.5px; }
             .wp-cell { font-size: 13px; color: #e6edf3; padding: 12px 0; }
             .trend-positive { color: #00E676; font-weight: bold; font-size: 12px; }
+            .trend-negative { color: #FF5252; font-weight: bold; font-size: 12px; }
             .stock-tag { color: #8b949e; font-size: 12px; }
             .action-link { color: #536DFE; font-size: 12px; font-weight: bold; cursor: pointer; text-decoration: none; }
             .action-link:hover { text-decoration: underline; color: #7C4DFF; }
@@ -101,7 +106,7 @@ def show():
         h1, h2, h3, h4, h5 = st.columns([2, 1.5, 1.5, 2, 1.5])
         h1.markdown('<div class="wp-header">PRODUCT CATEGORY</div>', unsafe_allow_html=True)
         h2.markdown('<div class="wp-header">SALES COUNT</div>', unsafe_allow_html=True)
-        h3.markdown('<div class="wp-header">TREND VS AVG</div>', unsafe_allow_html=True)
+        h3.markdown('<div class="wp-header">WEATHER UPLIFT</div>', unsafe_allow_html=True)
         h4.markdown('<div class="wp-header">RECOMMENDED STOCK</div>', unsafe_allow_html=True)
         h5.markdown('<div class="wp-header">ACTION</div>', unsafe_allow_html=True)
         st.markdown("<div style='border-bottom: 1px solid #30363d; margin-top: 5px;'></div>", unsafe_allow_html=True)
@@ -111,7 +116,10 @@ def show():
             
             c1.markdown(f'<div class="wp-cell" style="font-weight: 600;">{cat}</div>', unsafe_allow_html=True)
             c2.markdown(f'<div class="wp-cell">{count}</div>', unsafe_allow_html=True)
-            c3.markdown(f'<div class="wp-cell trend-positive">📈 +{trend}%</div>', unsafe_allow_html=True)
+            if trend >= 0:
+                c3.markdown(f'<div class="wp-cell trend-positive">📈 +{trend}%</div>', unsafe_allow_html=True)
+            else:
+                c3.markdown(f'<div class="wp-cell trend-negative">📉 {trend}%</div>', unsafe_allow_html=True)
             c4.markdown(f'<div class="wp-cell stock-tag">{stock}</div>', unsafe_allow_html=True)
             
             if c5.button("View Products", key=key_id):
@@ -126,7 +134,7 @@ def show():
             for idx, row in weather_table.iterrows():
                 cat = row['category']
                 count = int(row['sales_count'])
-                trend = abs(float(row['trend_vs_avg']))  # Show absolute value for display
+                trend = float(row['trend_vs_avg'])  # learned uplift vs the category's usual share
                 stock = row['recommended_stock']
                 key_id = f"btn_{cat.lower()}_{idx}"
 